@@ -7,62 +7,46 @@ import argparse
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-import matplotlib.pyplot as plt
-import mysql.connector
-from matplotlib.backends.backend_pdf import PdfPages
-
-CONFIG_PATH = Path(__file__).resolve().parents[1] / 'config' / 'database.json'
-FRONTEND_REPORTS_DIR = Path(__file__).resolve().parents[3] / 'frontend' / 'reports'
-
-
-def load_db_config() -> Dict[str, Any]:
-    if not CONFIG_PATH.exists():
-        raise SystemExit(f'Missing database config at {CONFIG_PATH}')
-    data = json.loads(CONFIG_PATH.read_text())
-    connection = data.get('connection', {})
-    return {
-        'host': connection.get('host', '127.0.0.1'),
-        'port': connection.get('port', 3306),
-        'user': connection.get('user', 'root'),
-        'password': connection.get('password', ''),
-        'database': connection.get('database')
-    }
+import report_cache
+from report_db import connect_db
+from report_output import OUTPUT_FORMATS, emit_data, open_pdf
+from report_output import pyplot as plt
+from report_timing import PhaseTimer, timed_run
+from sales_rollup import SALES_SOURCES, aggregate_rows, default_sales_source, fetch_sales, open_sales_snapshot
 
+if TYPE_CHECKING:
+    from matplotlib.backends.backend_pdf import PdfPages
 
-def connect_db():
-    params = load_db_config()
-    if not params['database']:
-        raise SystemExit('Database name is missing from config.')
-    try:
-        return mysql.connector.connect(**params)
-    except mysql.connector.Error as exc:
-        raise SystemExit(f"Unable to connect to the database: {exc}") from exc
+FRONTEND_REPORTS_DIR = Path(__file__).resolve().parents[3] / 'frontend' / 'reports'
+CACHE_TABLES = ('Orders', 'Inventory')
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='Render loyalty engagement report for admins.')
     parser.add_argument('--from', dest='start_date', required=True, help='Start date (YYYY-MM-DD)')
     parser.add_argument('--to', dest='end_date', required=True, help='End date (YYYY-MM-DD)')
     parser.add_argument('--output', help='Optional output path for the PDF.')
-    return parser.parse_args()
-
-
-def fetch_monthly_loyalty(cursor, start_date: str, end_date: str) -> List[Dict[str, Any]]:
-    cursor.execute("""
-        SELECT DATE_FORMAT(o.order_date, '%Y-%m-01') AS month_start,
-               SUM(o.loyalty_points_used) AS points_redeemed,
-               SUM(GREATEST(FLOOR((inv.price * o.quantity - IFNULL(o.loyalty_points_used, 0)) / 100), 0)) AS points_earned,
-               COUNT(o.order_id) AS orders_count,
-               SUM(inv.price * o.quantity) AS gross_sales
-        FROM Orders AS o
-        JOIN Inventory AS inv ON o.batch_id = inv.batch_id
-        WHERE o.order_date BETWEEN %s AND %s
-        GROUP BY month_start
-        ORDER BY month_start ASC
-    """, (start_date, end_date))
-    return list(cursor.fetchall())
+    parser.add_argument('--no-cache', action='store_true', help='Render even if a cached PDF is still current.')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='pdf',
+                        help='pdf renders the report; json and csv emit the dataset without loading matplotlib.')
+    parser.add_argument('--profile', action='store_true', help='Write a cProfile dump and the peak traced memory next to the output.')
+    parser.add_argument('--source', choices=SALES_SOURCES, default=default_sales_source(),
+                        help='Read sales from the database or the order_facts.py snapshot (default: REPORT_SALES_SOURCE or db).')
+    return parser.parse_args(argv)
+
+
+def fetch_monthly_loyalty(source, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+    rows = aggregate_rows(fetch_sales(source, start_date, end_date), ('month_start',))
+    rows.sort(key=lambda row: row['month_start'])
+    return [{
+        'month_start': row['month_start'],
+        'points_redeemed': row['points_redeemed'],
+        'points_earned': row['points_earned'],
+        'orders_count': row['orders_count'],
+        'gross_sales': row['total_revenue']
+    } for row in rows]
 
 
 def safe_number(value: Any, fallback: str = '0') -> str:
@@ -175,31 +159,59 @@ def page_table(pdf: PdfPages, rows: List[Dict[str, Any]]):
     plt.close(fig)
 
 
-def main():
-    args = parse_args()
+def generate(args: argparse.Namespace, conn, timer: PhaseTimer) -> Dict[str, Any]:
     filters = {
         'startDateFrom': args.start_date,
         'startDateTo': args.end_date
     }
-    conn = connect_db()
+    with timer.phase('fetch'):
+        snapshot = open_sales_snapshot(args.source)
+    # Everything this report reads is in the snapshot, so it needs no connection at all.
+    owns_connection = conn is None and snapshot is None
+    if owns_connection:
+        conn = connect_db()
     try:
-        cursor = conn.cursor(dictionary=True)
-        rows = fetch_monthly_loyalty(cursor, args.start_date, args.end_date)
+        cursor = conn.cursor(dictionary=True) if snapshot is None else None
+        with timer.phase('cache'):
+            cache_key, cached = report_cache.check(cursor, 'admin-loyalty', filters, CACHE_TABLES if cursor else (),
+                                                   enabled=args.format == 'pdf' and not args.no_cache and not args.output,
+                                                   extra=snapshot and snapshot.watermark())
+        if cached:
+            return cached
+        rows = timer.fetch(fetch_monthly_loyalty, snapshot or cursor, args.start_date, args.end_date)
+        if cursor:
+            cursor.close()
     finally:
-        conn.close()
-    summary = build_summary(rows)
+        if owns_connection:
+            conn.close()
+    with timer.phase('build'):
+        summary = build_summary(rows)
+    if args.format != 'pdf':
+        csv_path = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"admin-loyalty-report-{args.start_date}-{args.end_date}.csv"
+        with timer.phase('write'):
+            return emit_data(args.format, {'filters': filters, 'summary': summary, 'months': rows}, rows, csv_path)
 
     FRONTEND_REPORTS_DIR.mkdir(parents=True, exist_ok=True)
     output_path = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"admin-loyalty-report-{args.start_date}-{args.end_date}.pdf"
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with PdfPages(output_path) as pdf:
+    with timer.render(open_pdf, output_path) as pdf:
         page_hero(pdf, filters, summary)
         page_charts(pdf, rows)
         page_table(pdf, rows)
-    print(json.dumps({
+    return report_cache.finish(cache_key, {
         'path': str(output_path.resolve()),
         'publicUrl': f"/reports/{output_path.name}"
-    }))
+    })
+
+
+def run(argv: Optional[List[str]] = None, conn=None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    profile_path = FRONTEND_REPORTS_DIR / f"admin-loyalty-report-{args.start_date}-{args.end_date}.prof"
+    return timed_run(lambda timer: generate(args, conn, timer), args.profile, profile_path)
+
+
+def main():
+    print(json.dumps(run()))
 
 
 if __name__ == '__main__':
@@ -7,46 +7,34 @@ import argparse
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import matplotlib.pyplot as plt
-import mysql.connector
-from matplotlib.backends.backend_pdf import PdfPages
-
-CONFIG_PATH = Path(__file__).resolve().parents[1] / 'config' / 'database.json'
-FRONTEND_REPORTS_DIR = Path(__file__).resolve().parents[3] / 'frontend' / 'reports'
+import report_cache
+from report_db import connect_db
+from report_output import OUTPUT_FORMATS, emit_data, open_pdf
+from report_output import pyplot as plt
+from report_timing import PhaseTimer, timed_run
+from sales_rollup import SALES_SOURCES, default_sales_source, fetch_sales, open_sales_snapshot
 
+if TYPE_CHECKING:
+    from matplotlib.backends.backend_pdf import PdfPages
 
-def load_db_config() -> Dict[str, Any]:
-    if not CONFIG_PATH.exists():
-        raise SystemExit(f'Missing database config at {CONFIG_PATH}')
-    data = json.loads(CONFIG_PATH.read_text())
-    connection = data.get('connection', {})
-    return {
-        'host': connection.get('host', '127.0.0.1'),
-        'port': connection.get('port', 3306),
-        'user': connection.get('user', 'root'),
-        'password': connection.get('password', ''),
-        'database': connection.get('database')
-    }
-
-
-def connect_db():
-    params = load_db_config()
-    if not params['database']:
-        raise SystemExit('Database name is missing from config.')
-    try:
-        return mysql.connector.connect(**params)
-    except mysql.connector.Error as exc:
-        raise SystemExit(f"Unable to connect to the database: {exc}") from exc
+FRONTEND_REPORTS_DIR = Path(__file__).resolve().parents[3] / 'frontend' / 'reports'
+CACHE_TABLES = ('Orders', 'Inventory', 'RawProduct')
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='Render product sales report by product type.')
     parser.add_argument('--from', dest='start_date', required=True, help='Start date (YYYY-MM-DD)')
     parser.add_argument('--to', dest='end_date', required=True, help='End date (YYYY-MM-DD)')
     parser.add_argument('--output', help='Optional output path for the PDF.')
-    return parser.parse_args()
+    parser.add_argument('--no-cache', action='store_true', help='Render even if a cached PDF is still current.')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='pdf',
+                        help='pdf renders the report; json and csv emit the dataset without loading matplotlib.')
+    parser.add_argument('--profile', action='store_true', help='Write a cProfile dump and the peak traced memory next to the output.')
+    parser.add_argument('--source', choices=SALES_SOURCES, default=default_sales_source(),
+                        help='Read sales from the database or the order_facts.py snapshot (default: REPORT_SALES_SOURCE or db).')
+    return parser.parse_args(argv)
 
 
 def month_range(start_date: str, end_date: str) -> List[str]:
@@ -88,23 +76,12 @@ def format_month(value: str) -> str:
         return value or 'Unknown'
 
 
-def fetch_monthly_product_sales(cursor, start_date: str, end_date: str):
-    cursor.execute("""
-        SELECT DATE_FORMAT(o.order_date, '%Y-%m-01') AS month_start,
-               COALESCE(rp.product_type, 'Uncategorized') AS product_type,
-               SUM(o.quantity) AS total_quantity,
-               SUM(o.quantity * inv.price) AS total_revenue
-        FROM Orders AS o
-        JOIN Inventory AS inv ON o.batch_id = inv.batch_id
-        JOIN RawProduct AS rp ON inv.product_id = rp.product_id
-        WHERE o.order_date BETWEEN %s AND %s
-        GROUP BY month_start, product_type
-        ORDER BY month_start ASC, product_type ASC
-    """, (start_date, end_date))
-    return cursor.fetchall()
+def fetch_monthly_product_sales(source, start_date: str, end_date: str) -> Iterator[Dict[str, Any]]:
+    # Month x farm x product rows; build_sales_dataset folds them into month x type as they stream.
+    return fetch_sales(source, start_date, end_date)
 
 
-def build_sales_dataset(rows: List[Dict[str, Any]], months: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, float]], List[str]]:
+def build_sales_dataset(rows: Iterable[Dict[str, Any]], months: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, float]], List[str]]:
     month_entries: Dict[str, Dict[str, Any]] = {
         month: {
             'month': month,
@@ -277,32 +254,72 @@ def page_table(pdf: PdfPages, month_entries: List[Dict[str, Any]], ordered_types
     plt.close(fig)
 
 
-def main():
-    args = parse_args()
+def generate(args: argparse.Namespace, conn, timer: PhaseTimer) -> Dict[str, Any]:
     filters = {
         'startDateFrom': args.start_date,
         'startDateTo': args.end_date
     }
     months = month_range(args.start_date, args.end_date)
-    conn = connect_db()
+    with timer.phase('fetch'):
+        snapshot = open_sales_snapshot(args.source)
+    # Product names and types travel with the snapshot, so it needs no connection at all.
+    owns_connection = conn is None and snapshot is None
+    if owns_connection:
+        conn = connect_db()
     try:
-        cursor = conn.cursor(dictionary=True)
-        rows = fetch_monthly_product_sales(cursor, args.start_date, args.end_date)
+        cursor = conn.cursor(dictionary=True) if snapshot is None else None
+        with timer.phase('cache'):
+            cache_key, cached = report_cache.check(cursor, 'admin-product-sales', filters, CACHE_TABLES if cursor else (),
+                                                   enabled=args.format == 'pdf' and not args.no_cache and not args.output,
+                                                   extra=snapshot and snapshot.watermark())
+        if cached:
+            return cached
+        rows = timer.fetch(fetch_monthly_product_sales, snapshot or cursor, args.start_date, args.end_date)
+        with timer.phase('build'):
+            month_entries, type_totals, ordered_types = build_sales_dataset(rows, months)
+        if cursor:
+            cursor.close()
     finally:
-        conn.close()
-    month_entries, type_totals, ordered_types = build_sales_dataset(rows, months)
-    summary = build_summary(month_entries, type_totals, ordered_types)
+        if owns_connection:
+            conn.close()
+    with timer.phase('build'):
+        summary = build_summary(month_entries, type_totals, ordered_types)
+    if args.format != 'pdf':
+        csv_path = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"admin-product-sales-report-{args.start_date}-{args.end_date}.csv"
+        csv_rows = [
+            {'month': entry['month'], 'productType': product_type, **totals}
+            for entry in month_entries
+            for product_type, totals in entry['types'].items()
+        ]
+        with timer.phase('write'):
+            return emit_data(args.format, {
+                'filters': filters,
+                'summary': summary,
+                'months': month_entries,
+                'typeTotals': type_totals,
+                'types': ordered_types
+            }, csv_rows, csv_path)
     FRONTEND_REPORTS_DIR.mkdir(parents=True, exist_ok=True)
     output_path = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"admin-product-sales-report-{args.start_date}-{args.end_date}.pdf"
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with PdfPages(output_path) as pdf:
+    with timer.render(open_pdf, output_path) as pdf:
         page_hero(pdf, filters, summary)
         page_charts(pdf, month_entries, ordered_types, type_totals)
         page_table(pdf, month_entries, ordered_types)
-    print(json.dumps({
+    return report_cache.finish(cache_key, {
         'path': str(output_path.resolve()),
         'publicUrl': f"/reports/{output_path.name}"
-    }))
+    })
+
+
+def run(argv: Optional[List[str]] = None, conn=None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    profile_path = FRONTEND_REPORTS_DIR / f"admin-product-sales-report-{args.start_date}-{args.end_date}.prof"
+    return timed_run(lambda timer: generate(args, conn, timer), args.profile, profile_path)
+
+
+def main():
+    print(json.dumps(run()))
 
 
 if __name__ == '__main__':
@@ -4,49 +4,42 @@
 from __future__ import annotations
 
 import argparse
+import heapq
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional
 
-import matplotlib.pyplot as plt
-import mysql.connector
-from matplotlib.backends.backend_pdf import PdfPages
+import numpy as np
 
-CONFIG_PATH = Path(__file__).resolve().parents[1] / 'config' / 'database.json'
-FRONTEND_REPORTS_DIR = Path(__file__).resolve().parents[3] / 'frontend' / 'reports'
-
-
-def load_db_config() -> Dict[str, Any]:
-    if not CONFIG_PATH.exists():
-        raise SystemExit(f'Missing database config at {CONFIG_PATH}')
-    data = json.loads(CONFIG_PATH.read_text())
-    connection = data.get('connection', {})
-    return {
-        'host': connection.get('host', '127.0.0.1'),
-        'port': connection.get('port', 3306),
-        'user': connection.get('user', 'root'),
-        'password': connection.get('password', ''),
-        'database': connection.get('database')
-    }
+import report_cache
+from report_db import connect_db, stream_rows
+from report_output import OUTPUT_FORMATS, emit_data, open_pdf
+from report_output import pyplot as plt
+from report_timing import PhaseTimer, timed_run
+from sales_rollup import SALES_SOURCES, default_sales_source, fetch_sales, open_sales_snapshot
 
+if TYPE_CHECKING:
+    from matplotlib.backends.backend_pdf import PdfPages
 
-def connect_db():
-    params = load_db_config()
-    if not params['database']:
-        raise SystemExit('Database name is missing from config.')
-    try:
-        return mysql.connector.connect(**params)
-    except mysql.connector.Error as exc:
-        raise SystemExit(f"Unable to connect to the database: {exc}") from exc
+FRONTEND_REPORTS_DIR = Path(__file__).resolve().parents[3] / 'frontend' / 'reports'
+CACHE_TABLES = ('Orders', 'Inventory', 'FarmProduct', 'RawProduct', 'Farm')
+# With --source snapshot, Orders is only read through the snapshot, which has its own watermark.
+SNAPSHOT_CACHE_TABLES = ('Inventory', 'FarmProduct', 'RawProduct', 'Farm')
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='Render farm productivity PDF for admins.')
     parser.add_argument('--from', dest='start_date', required=True, help='Start date (YYYY-MM-DD)')
     parser.add_argument('--to', dest='end_date', required=True, help='End date (YYYY-MM-DD)')
     parser.add_argument('--output', help='Optional output path for the PDF.')
-    return parser.parse_args()
+    parser.add_argument('--no-cache', action='store_true', help='Render even if a cached PDF is still current.')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='pdf',
+                        help='pdf renders the report; json and csv emit the dataset without loading matplotlib.')
+    parser.add_argument('--profile', action='store_true', help='Write a cProfile dump and the peak traced memory next to the output.')
+    parser.add_argument('--source', choices=SALES_SOURCES, default=default_sales_source(),
+                        help='Read sales from the database or the order_facts.py snapshot (default: REPORT_SALES_SOURCE or db).')
+    return parser.parse_args(argv)
 
 
 def month_range(start_date: str, end_date: str) -> List[str]:
@@ -80,8 +73,8 @@ def safe_number(value: Any) -> str:
     return f'{number:.1f}'
 
 
-def fetch_product_farms(cursor):
-    cursor.execute("""
+def fetch_product_farms(cursor) -> Iterator[Dict[str, Any]]:
+    return stream_rows(cursor, """
         SELECT fp.product_id,
                rp.product_name,
                rp.product_type,
@@ -93,11 +86,10 @@ def fetch_product_farms(cursor):
         JOIN RawProduct AS rp ON fp.product_id = rp.product_id
         LEFT JOIN Farm AS f ON fp.farm_id = f.farm_id
     """)
-    return cursor.fetchall()
 
 
-def fetch_inventory_per_product(cursor, start_date: str, end_date: str):
-    cursor.execute("""
+def fetch_inventory_per_product(cursor, start_date: str, end_date: str) -> Iterator[Dict[str, Any]]:
+    return stream_rows(cursor, """
         SELECT inv.product_id,
                inv.farm_id,
                DATE_FORMAT(inv.exp_date, '%Y-%m-01') AS month_start,
@@ -106,122 +98,162 @@ def fetch_inventory_per_product(cursor, start_date: str, end_date: str):
         WHERE inv.exp_date BETWEEN %s AND %s
         GROUP BY inv.product_id, inv.farm_id, month_start
     """, (start_date, end_date))
-    return cursor.fetchall()
-
-
-def fetch_sales_per_product(cursor, start_date: str, end_date: str):
-    cursor.execute("""
-        SELECT rp.product_id,
-               DATE_FORMAT(o.order_date, '%Y-%m-01') AS month_start,
-               SUM(o.quantity) AS total_quantity,
-               SUM(o.quantity * inv.price) AS total_revenue
-        FROM Orders AS o
-        JOIN Inventory AS inv ON o.batch_id = inv.batch_id
-        JOIN RawProduct AS rp ON inv.product_id = rp.product_id
-        WHERE o.order_date BETWEEN %s AND %s
-        GROUP BY rp.product_id, month_start
-    """, (start_date, end_date))
-    return cursor.fetchall()
 
 
-def build_product_dataset(product_rows, inventory_rows, sales_rows, months: List[str]):
-    products: Dict[str, Dict[str, Any]] = {}
-    product_lookup: Dict[int, str] = {}
+def fetch_sales_per_product(source, start_date: str, end_date: str) -> Iterator[Dict[str, Any]]:
+    # Farm-level rows; build_product_dataset sums them per product and month.
+    return fetch_sales(source, start_date, end_date)
+
+
+class ProductDataset:
+    """Product x farm x month productivity cube plus product x month sales totals."""
+
+    def __init__(self, products: List[Dict[str, Any]], farm_names: List[str], months: List[str],
+                 productivity: np.ndarray, sales_qty: np.ndarray, sales_revenue: np.ndarray):
+        self.products = products
+        self.farm_names = farm_names
+        self.months = months
+        # NaN marks a farm without inventory (or population) for that product and month.
+        self.productivity = productivity
+        self.sales_qty = sales_qty
+        self.sales_revenue = sales_revenue
+        present = ~np.isnan(productivity)
+        counts = present.sum(axis=1)
+        totals = np.where(present, productivity, 0.0).sum(axis=1)
+        self.has_farms = counts > 0
+        self.avg_productivity = np.divide(totals, counts, out=np.zeros(totals.shape), where=self.has_farms)
+        self.metrics = self.product_metrics(present)
+
+    def product_metrics(self, present: np.ndarray) -> List[Dict[str, Any]]:
+        monthly = self.avg_productivity
+        active_months = (monthly != 0).sum(axis=1)
+        averages = np.divide(monthly.sum(axis=1), active_months, out=np.zeros(active_months.shape), where=active_months > 0)
+        farm_months = present.sum(axis=2)
+        farm_totals = np.where(present, self.productivity, 0.0).sum(axis=2)
+        farm_avgs = np.divide(farm_totals, farm_months, out=np.zeros(farm_totals.shape), where=farm_months > 0)
+        has_values = farm_months > 0
+        if farm_avgs.shape[1]:
+            best = np.where(has_values, farm_avgs, -np.inf).argmax(axis=1)
+            worst = np.where(has_values, farm_avgs, np.inf).argmin(axis=1)
+        else:
+            best = worst = np.zeros(len(self.products), dtype=int)
+        sales_qty = self.sales_qty.sum(axis=1)
+        sales_revenue = self.sales_revenue.sum(axis=1)
+        metrics = []
+        for index in range(len(self.products)):
+            rated = has_values[index].any()
+            metrics.append({
+                'avgProductivity': float(averages[index]),
+                'salesQty': float(sales_qty[index]),
+                'salesRevenue': float(sales_revenue[index]),
+                'bestFarm': {'name': self.farm_names[best[index]], 'avg': float(farm_avgs[index, best[index]])} if rated else None,
+                'worstFarm': {'name': self.farm_names[worst[index]], 'avg': float(farm_avgs[index, worst[index]])} if rated else None
+            })
+        return metrics
+
+    def top_products(self, count: int) -> List[int]:
+        return heapq.nlargest(count, range(len(self.products)), key=lambda index: self.metrics[index]['avgProductivity'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        products = []
+        for index, product in enumerate(self.products):
+            metrics = self.metrics[index]
+            best = metrics['bestFarm'] or {}
+            worst = metrics['worstFarm'] or {}
+            products.append({
+                **product,
+                'avgProductivity': metrics['avgProductivity'],
+                'salesQty': metrics['salesQty'],
+                'salesRevenue': metrics['salesRevenue'],
+                'bestFarm': best.get('name'),
+                'bestFarmAvg': best.get('avg'),
+                'worstFarm': worst.get('name'),
+                'worstFarmAvg': worst.get('avg'),
+                'monthly': {
+                    'avgProductivity': self.avg_productivity[index],
+                    'salesQty': self.sales_qty[index],
+                    'salesRevenue': self.sales_revenue[index]
+                }
+            })
+        return {'months': self.months, 'farms': self.farm_names, 'products': products}
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+
+def build_product_dataset(product_rows: Iterable[Dict[str, Any]], inventory_rows: Iterable[Dict[str, Any]],
+                          sales_rows: Iterable[Dict[str, Any]], months: List[str]) -> ProductDataset:
+    products: List[Dict[str, Any]] = []
+    product_index: Dict[str, int] = {}
+    product_lookup: Dict[int, int] = {}
+    farm_index: Dict[int, int] = {}
+    farm_names: List[str] = []
+    population_cells: List[tuple] = []
     for row in product_rows:
         base_name = row.get('product_name') or f"Product #{row['product_id']}"
         type_name = row.get('product_type') or 'Uncategorized'
         key = f"{base_name}|{type_name}"
-        product_lookup[row['product_id']] = key
-        product = products.setdefault(key, {
-            'productId': key,
-            'name': base_name,
-            'type': type_name,
-            'farms': {},
-            'months': {
-                month: {
-                    'farmProductivity': {},
-                    'avgProductivity': 0.0,
-                    'salesQty': 0.0,
-                    'salesRevenue': 0.0,
-                    'best': None,
-                    'low': None
-                } for month in months
-            },
-            'totalSalesQty': 0.0,
-            'totalSalesRevenue': 0.0
-        })
-        farm_id = row['farm_id']
-        farm = product['farms'].setdefault(farm_id, {
-            'population': 0.0,
-            'name': row.get('farm_name') or f"Farm #{farm_id}"
-        })
-        farm['population'] += float(row.get('population') or 0)
-
-    for row in inventory_rows:
-        key = product_lookup.get(row['product_id'])
-        if not key:
-            continue
-        product = products.get(key)
-        if not product:
-            continue
-        month = row.get('month_start')
-        if month not in product['months']:
-            continue
+        index = product_index.get(key)
+        if index is None:
+            index = product_index[key] = len(products)
+            products.append({'productId': key, 'name': base_name, 'type': type_name})
+        product_lookup[row['product_id']] = index
         farm_id = row['farm_id']
-        population = product['farms'].get(farm_id, {}).get('population', 0)
-        if population:
-            productivity = float(row.get('total_quantity') or 0) / population
-            product['months'][month]['farmProductivity'][farm_id] = {
-                'value': productivity,
-                'name': product['farms'].get(farm_id, {}).get('name')
-            }
-
-    for row in sales_rows:
-        key = product_lookup.get(row['product_id'])
-        if not key:
-            continue
-        product = products.get(key)
-        if not product:
-            continue
-        month = row.get('month_start')
-        if month not in product['months']:
-            continue
-        qty = float(row.get('total_quantity') or 0)
-        revenue = float(row.get('total_revenue') or 0)
-        product['months'][month]['salesQty'] += qty
-        product['months'][month]['salesRevenue'] += revenue
-        product['totalSalesQty'] += qty
-        product['totalSalesRevenue'] += revenue
-
-    dataset = []
-    for product in products.values():
-        for month in months:
-            entry = product['months'][month]
-            values = list(entry['farmProductivity'].values())
-            if values:
-                avg = sum(item['value'] for item in values) / len(values)
-                entry['avgProductivity'] = avg
-                entry['best'] = max(values, key=lambda item: item['value'])
-                entry['low'] = min(values, key=lambda item: item['value'])
-        dataset.append(product)
-
-    dataset.sort(key=lambda item: item['name'])
-    return dataset
-
-
-def average_productivity(product: Dict[str, Any], months: List[str]) -> float:
-    values = [
-        product['months'][month]['avgProductivity']
-        for month in months
-        if product['months'][month]['avgProductivity']
+        if farm_id not in farm_index:
+            farm_index[farm_id] = len(farm_names)
+            farm_names.append(row.get('farm_name') or f"Farm #{farm_id}")
+        population_cells.append((index, farm_index[farm_id], float(row.get('population') or 0)))
+
+    month_index = {month: position for position, month in enumerate(months)}
+    shape = (len(products), len(farm_names), len(months))
+    population = np.zeros(shape[:2])
+    if population_cells:
+        rows, cols, values = zip(*population_cells)
+        np.add.at(population, (list(rows), list(cols)), values)
+
+    inventory_cells = [
+        (product_lookup[row['product_id']], farm_index[row['farm_id']], month_index[row.get('month_start')],
+         float(row.get('total_quantity') or 0))
+        for row in inventory_rows
+        if row['product_id'] in product_lookup and row['farm_id'] in farm_index and row.get('month_start') in month_index
     ]
-    if not values:
-        return 0.0
-    return sum(values) / len(values)
-
-
-def build_summary(products: List[Dict[str, Any]], months: List[str]) -> Dict[str, Any]:
-    if not products:
+    quantity = np.zeros(shape)
+    seen = np.zeros(shape, dtype=bool)
+    if inventory_cells:
+        rows, cols, slots, values = zip(*inventory_cells)
+        cells = (list(rows), list(cols), list(slots))
+        np.add.at(quantity, cells, values)
+        seen[cells] = True
+    farm_population = population[:, :, np.newaxis]
+    productivity = np.full(shape, np.nan)
+    np.divide(quantity, farm_population, out=productivity, where=seen & (farm_population > 0))
+
+    sales_qty = np.zeros((shape[0], shape[2]))
+    sales_revenue = np.zeros((shape[0], shape[2]))
+    sales_cells = [
+        (product_lookup[row['product_id']], month_index[row.get('month_start')],
+         float(row.get('total_quantity') or 0), float(row.get('total_revenue') or 0))
+        for row in sales_rows
+        if row['product_id'] in product_lookup and row.get('month_start') in month_index
+    ]
+    if sales_cells:
+        rows, slots, qty, revenue = zip(*sales_cells)
+        np.add.at(sales_qty, (list(rows), list(slots)), qty)
+        np.add.at(sales_revenue, (list(rows), list(slots)), revenue)
+
+    order = sorted(range(len(products)), key=lambda index: products[index]['name'])
+    return ProductDataset(
+        [products[index] for index in order],
+        farm_names,
+        months,
+        productivity[order],
+        sales_qty[order],
+        sales_revenue[order]
+    )
+
+
+def build_summary(dataset: ProductDataset) -> Dict[str, Any]:
+    if not dataset:
         return {
             'totalProducts': 0,
             'avgProductivity': 0,
@@ -229,16 +261,18 @@ def build_summary(products: List[Dict[str, Any]], months: List[str]) -> Dict[str
             'lowProduct': None,
             'topSalesProduct': None
         }
-    top_product = max(products, key=lambda product: average_productivity(product, months))
-    low_product = min(products, key=lambda product: average_productivity(product, months))
-    top_sales = max(products, key=lambda item: item['totalSalesQty'], default=top_product)
-    overall_avg = sum(average_productivity(product, months) for product in products) / len(products)
+    metrics = dataset.metrics
+    indexes = range(len(dataset))
+    top_index = max(indexes, key=lambda index: metrics[index]['avgProductivity'])
+    low_index = min(indexes, key=lambda index: metrics[index]['avgProductivity'])
+    top_sales_index = max(indexes, key=lambda index: metrics[index]['salesQty'])
+    overall_avg = sum(item['avgProductivity'] for item in metrics) / len(metrics)
     return {
-        'totalProducts': len(products),
+        'totalProducts': len(dataset),
         'avgProductivity': overall_avg,
-        'topProduct': {'name': top_product['name'], 'value': average_productivity(top_product, months)},
-        'lowProduct': {'name': low_product['name'], 'value': average_productivity(low_product, months)},
-        'topSalesProduct': top_sales['name'] if top_sales else None
+        'topProduct': {'name': dataset.products[top_index]['name'], 'value': metrics[top_index]['avgProductivity']},
+        'lowProduct': {'name': dataset.products[low_index]['name'], 'value': metrics[low_index]['avgProductivity']},
+        'topSalesProduct': dataset.products[top_sales_index]['name']
     }
 
 
@@ -271,43 +305,37 @@ def page_hero(pdf: PdfPages, filters: Dict[str, str], summary: Dict[str, Any]):
     plt.close(fig)
 
 
-def month_average_productivity(products: List[Dict[str, Any]], month: str) -> float:
-    values = [
-        product['months'][month]['avgProductivity']
-        for product in products
-        if product['months'][month]['avgProductivity']
-    ]
-    if not values:
-        return 0.0
-    return sum(values) / len(values)
+def month_average_productivity(dataset: ProductDataset) -> np.ndarray:
+    averages = dataset.avg_productivity
+    counts = (averages != 0).sum(axis=0)
+    return np.divide(averages.sum(axis=0), counts, out=np.zeros(counts.shape), where=counts > 0)
 
 
-def page_charts(pdf: PdfPages, products: List[Dict[str, Any]], months: List[str]):
-    if not products:
+def page_charts(pdf: PdfPages, dataset: ProductDataset):
+    if not dataset:
         fig = plt.figure(figsize=(8.5, 11))
         fig.text(0.3, 0.5, 'No productivity data available for the selected window.', fontsize=14, color='#6b5b53')
         pdf.savefig(fig)
         plt.close(fig)
         return
 
-    month_labels = [format_month_label(month) for month in months]
-    top_products = sorted(products, key=lambda item: average_productivity(item, months), reverse=True)[:5]
+    month_labels = [format_month_label(month) for month in dataset.months]
+    top_indexes = dataset.top_products(5)
 
     fig, axes = plt.subplots(2, 1, figsize=(8.5, 11))
     fig.subplots_adjust(hspace=0.45)
 
-    for product in top_products:
-        series = [product['months'][month]['avgProductivity'] or 0 for month in months]
-        axes[0].plot(month_labels, series, marker='o', label=product['name'])
+    for index in top_indexes:
+        axes[0].plot(month_labels, dataset.avg_productivity[index], marker='o', label=dataset.products[index]['name'])
     axes[0].set_title('Average productivity per product (top 5)')
     axes[0].set_ylabel('Inventory ÷ population')
     axes[0].tick_params(axis='x', rotation=45)
     axes[0].grid(alpha=0.2)
-    if top_products:
+    if top_indexes:
         axes[0].legend(loc='upper left', fontsize=8)
 
-    sales_qty = [sum(product['months'][month]['salesQty'] for product in products) for month in months]
-    avg_prod = [month_average_productivity(products, month) for month in months]
+    sales_qty = dataset.sales_qty.sum(axis=0)
+    avg_prod = month_average_productivity(dataset)
     axes[1].bar(month_labels, sales_qty, color='#4a90e2', label='Units sold')
     axes[1].set_title('Productivity vs sales volume per month')
     axes[1].set_ylabel('Units sold')
@@ -326,36 +354,17 @@ def page_charts(pdf: PdfPages, products: List[Dict[str, Any]], months: List[str]
     plt.close(fig)
 
 
-def summarize_farm_performance(product: Dict[str, Any]):
-    stats: Dict[int, Dict[str, Any]] = {}
-    for entry in product['months'].values():
-        for farm_id, info in entry['farmProductivity'].items():
-            record = stats.setdefault(farm_id, {'name': info['name'], 'values': []})
-            record['values'].append(info['value'])
-    best = None
-    worst = None
-    for record in stats.values():
-        if not record['values']:
-            continue
-        avg_value = sum(record['values']) / len(record['values'])
-        payload = {'name': record['name'], 'avg': avg_value}
-        if not best or avg_value > best['avg']:
-            best = payload
-        if not worst or avg_value < worst['avg']:
-            worst = payload
-    return best, worst
-
-
-def page_table(pdf: PdfPages, products: List[Dict[str, Any]], months: List[str]):
+def page_table(pdf: PdfPages, dataset: ProductDataset):
     fig = plt.figure(figsize=(8.5, 11))
     fig.subplots_adjust(left=0.05, right=0.97, top=0.92)
     ax = fig.add_subplot(111)
     ax.axis('off')
     columns = ['Product', 'Best performing farm', 'Needs support']
     table_data = []
-    for product in products:
+    for index, product in enumerate(dataset.products):
         label = f"{product['name']} ({product.get('type') or 'Type'})"
-        best, worst = summarize_farm_performance(product)
+        best = dataset.metrics[index]['bestFarm']
+        worst = dataset.metrics[index]['worstFarm']
         best_text = f"{best['name']} ({safe_number(best['avg'])})" if best else '—'
         worst_text = f"{worst['name']} ({safe_number(worst['avg'])})" if worst else '—'
         table_data.append([label, best_text, worst_text])
@@ -368,36 +377,66 @@ def page_table(pdf: PdfPages, products: List[Dict[str, Any]], months: List[str])
     plt.close(fig)
 
 
-def main():
-    args = parse_args()
+def generate(args: argparse.Namespace, conn, timer: PhaseTimer) -> Dict[str, Any]:
     filters = {
         'startDateFrom': args.start_date,
         'startDateTo': args.end_date
     }
     months = month_range(args.start_date, args.end_date)
-    conn = connect_db()
+    with timer.phase('fetch'):
+        snapshot = open_sales_snapshot(args.source)
+    owns_connection = conn is None
+    if owns_connection:
+        conn = connect_db()
     try:
         cursor = conn.cursor(dictionary=True)
-        product_rows = fetch_product_farms(cursor)
-        inventory_rows = fetch_inventory_per_product(cursor, args.start_date, args.end_date)
-        sales_rows = fetch_sales_per_product(cursor, args.start_date, args.end_date)
+        with timer.phase('cache'):
+            cache_key, cached = report_cache.check(cursor, 'admin-productivity', filters,
+                                                   CACHE_TABLES if snapshot is None else SNAPSHOT_CACHE_TABLES,
+                                                   enabled=args.format == 'pdf' and not args.no_cache and not args.output,
+                                                   extra=snapshot and snapshot.watermark())
+        if cached:
+            return cached
+        # The fetchers are lazy; build_product_dataset drains them one query at a time, in order.
+        product_rows = timer.fetch(fetch_product_farms, cursor)
+        inventory_rows = timer.fetch(fetch_inventory_per_product, cursor, args.start_date, args.end_date)
+        sales_rows = timer.fetch(fetch_sales_per_product, snapshot or cursor, args.start_date, args.end_date)
+        with timer.phase('build'):
+            dataset = build_product_dataset(product_rows, inventory_rows, sales_rows, months)
+        cursor.close()
     finally:
-        conn.close()
+        if owns_connection:
+            conn.close()
 
-    dataset = build_product_dataset(product_rows, inventory_rows, sales_rows, months)
-    summary = build_summary(dataset, months)
+    with timer.phase('build'):
+        summary = build_summary(dataset)
+    if args.format != 'pdf':
+        csv_path = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"admin-productivity-report-{args.start_date}-{args.end_date}.csv"
+        with timer.phase('write'):
+            data = dataset.to_dict()
+            return emit_data(args.format, {'filters': filters, 'summary': summary, **data}, data['products'], csv_path)
 
     FRONTEND_REPORTS_DIR.mkdir(parents=True, exist_ok=True)
     output_path = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"admin-productivity-report-{args.start_date}-{args.end_date}.pdf"
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with PdfPages(output_path) as pdf:
+    with timer.render(open_pdf, output_path) as pdf:
         page_hero(pdf, filters, summary)
-        page_charts(pdf, dataset, months)
-        page_table(pdf, dataset, months)
-    print(json.dumps({
+        page_charts(pdf, dataset)
+        page_table(pdf, dataset)
+    return report_cache.finish(cache_key, {
         'path': str(output_path.resolve()),
         'publicUrl': f"/reports/{output_path.name}"
-    }))
+    })
+
+
+def run(argv: Optional[List[str]] = None, conn=None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    profile_path = FRONTEND_REPORTS_DIR / f"admin-productivity-report-{args.start_date}-{args.end_date}.prof"
+    return timed_run(lambda timer: generate(args, conn, timer), args.profile, profile_path)
+
+
+def main():
+    print(json.dumps(run()))
 
 
 if __name__ == '__main__':
@@ -5,108 +5,95 @@ from __future__ import annotations
 
 import argparse
 import json
+import math
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-import matplotlib.pyplot as plt
-import mysql.connector
-from matplotlib.backends.backend_pdf import PdfPages
-
-CONFIG_PATH = Path(__file__).resolve().parents[1] / 'config' / 'database.json'
-FRONTEND_REPORTS_DIR = Path(__file__).resolve().parents[3] / 'frontend' / 'reports'
-
-
-def load_db_config() -> Dict[str, Any]:
-    if not CONFIG_PATH.exists():
-        raise SystemExit(f'Missing database config at {CONFIG_PATH}')
-    data = json.loads(CONFIG_PATH.read_text())
-    connection = data.get('connection', {})
-    return {
-        'host': connection.get('host', '127.0.0.1'),
-        'port': connection.get('port', 3306),
-        'user': connection.get('user', 'root'),
-        'password': connection.get('password', ''),
-        'database': connection.get('database')
-    }
+import report_cache
+from report_db import connect_db, in_clause, stream_rows
+from report_output import OUTPUT_FORMATS, emit_data, merge_pdfs, open_pdf, pdf_merge_available, render_workers
+from report_output import pyplot as plt
+from report_timing import PhaseTimer, farm_set_label, timed_run
+from sales_rollup import aggregate_rows, fetch_sales_rollup
 
+if TYPE_CHECKING:
+    from matplotlib.backends.backend_pdf import PdfPages
 
-def connect_db():
-    params = load_db_config()
-    if not params['database']:
-        raise SystemExit('Database name is missing from config.')
-    try:
-        return mysql.connector.connect(**params)
-    except mysql.connector.Error as exc:
-        raise SystemExit(f"Unable to connect to the database: {exc}") from exc
+FRONTEND_REPORTS_DIR = Path(__file__).resolve().parents[3] / 'frontend' / 'reports'
+CACHE_TABLES = ('Orders', 'Inventory', 'RawProduct', 'Farm')
+# Below this many product pages a process pool costs more than it saves.
+PARALLEL_MIN_PRODUCTS = 8
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='Render on-demand sales report for a farm.')
-    parser.add_argument('--farm-id', type=int, required=True)
+    farms = parser.add_mutually_exclusive_group(required=True)
+    farms.add_argument('--farm-id', type=int, help='ID of the farm.')
+    farms.add_argument('--farm-ids', type=parse_farm_ids, help='Comma-separated farm IDs to render in one pass.')
+    farms.add_argument('--all-farms', action='store_true', help='Render a report for every farm in one pass.')
     parser.add_argument('--from', dest='start_date', required=True, help='Start date (YYYY-MM-DD)')
     parser.add_argument('--to', dest='end_date', required=True, help='End date (YYYY-MM-DD)')
     parser.add_argument('--output', help='Optional output path for the PDF.')
-    return parser.parse_args()
+    parser.add_argument('--no-cache', action='store_true', help='Render even if a cached PDF is still current.')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='pdf',
+                        help='pdf renders the report; json and csv emit the dataset without loading matplotlib.')
+    parser.add_argument('--workers', type=int,
+                        help='Processes used to render product pages (default: REPORT_RENDER_WORKERS or up to 4).')
+    parser.add_argument('--profile', action='store_true', help='Write a cProfile dump and the peak traced memory next to the output.')
+    return parser.parse_args(argv)
 
 
-def fetch_farm(cursor, farm_id: int) -> Optional[Dict[str, Any]]:
-    cursor.execute("""
+def parse_farm_ids(value: str) -> List[int]:
+    try:
+        return list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise argparse.ArgumentTypeError('Expected a comma-separated list of farm IDs.')
+
+
+def fetch_farms(cursor, farm_ids: Optional[List[int]]) -> Dict[int, Dict[str, Any]]:
+    condition, params = in_clause('f.farm_id', farm_ids)
+    rows = stream_rows(cursor, f"""
         SELECT f.farm_id, f.name as farm_name, loc.street, loc.city, loc.state, loc.country
         FROM Farm AS f
         LEFT JOIN Location AS loc ON f.location_id = loc.location_id
-        WHERE f.farm_id = %s
-    """, (farm_id,))
-    row = cursor.fetchone()
-    if not row:
-        return None
-    parts = [row.get('street'), row.get('city'), row.get('state'), row.get('country')]
-    return {
-        'farmId': row['farm_id'],
-        'name': row.get('farm_name'),
-        'locationLabel': ', '.join([part for part in parts if part]) or None
-    }
+        WHERE {condition}
+        ORDER BY f.farm_id
+    """, params)
+    farms: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        parts = [row.get('street'), row.get('city'), row.get('state'), row.get('country')]
+        farms[row['farm_id']] = {
+            'farmId': row['farm_id'],
+            'name': row.get('farm_name'),
+            'locationLabel': ', '.join([part for part in parts if part]) or None
+        }
+    return farms
 
 
-def fetch_order_breakdown(cursor, farm_id: int, start_date: str, end_date: str):
-    cursor.execute("""
-        SELECT rp.product_id,
-               rp.product_name,
-               rp.product_type,
-               rp.grade,
-               SUM(o.quantity) AS total_quantity,
-               SUM(o.quantity * inv.price) AS total_revenue,
-               COUNT(o.order_id) AS orders_count
-        FROM Orders AS o
-        JOIN Inventory AS inv ON o.batch_id = inv.batch_id
-        JOIN RawProduct AS rp ON inv.product_id = rp.product_id
-        WHERE inv.farm_id = %s
-          AND o.order_date BETWEEN %s AND %s
-        GROUP BY rp.product_id, rp.product_name, rp.product_type, rp.grade
-        ORDER BY total_quantity DESC
-    """, (farm_id, start_date, end_date))
-    return list(cursor.fetchall())
-
-
-def fetch_monthly_order_breakdown(cursor, farm_id: int, start_date: str, end_date: str):
-    cursor.execute("""
-        SELECT rp.product_id,
-               rp.product_name,
-               rp.product_type,
-               rp.grade,
-               DATE_FORMAT(o.order_date, '%Y-%m-01') AS month_start,
-               SUM(o.quantity) AS total_quantity,
-               SUM(o.quantity * inv.price) AS total_revenue,
-               COUNT(o.order_id) AS orders_count
-        FROM Orders AS o
-        JOIN Inventory AS inv ON o.batch_id = inv.batch_id
-        JOIN RawProduct AS rp ON inv.product_id = rp.product_id
-        WHERE inv.farm_id = %s
-          AND o.order_date BETWEEN %s AND %s
-        GROUP BY rp.product_id, rp.product_name, rp.product_type, rp.grade, month_start
-        ORDER BY rp.product_name ASC, month_start ASC
-    """, (farm_id, start_date, end_date))
-    return list(cursor.fetchall())
+def fetch_monthly_order_breakdown(cursor, farm_ids: Optional[List[int]], start_date: str, end_date: str) -> Dict[int, List[Dict[str, Any]]]:
+    rows = aggregate_rows(
+        fetch_sales_rollup(cursor, start_date, end_date, farm_ids=farm_ids),
+        ('farm_id', 'product_id', 'product_name', 'product_type', 'grade', 'month_start'),
+        ('total_quantity', 'total_revenue', 'orders_count')
+    )
+    rows.sort(key=lambda row: (row['product_name'] or '', row['month_start']))
+    grouped: Dict[int, List[Dict[str, Any]]] = {}
+    for row in rows:
+        grouped.setdefault(row.pop('farm_id'), []).append(row)
+    return grouped
+
+
+def summarize_products(monthly_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    products = aggregate_rows(
+        monthly_rows,
+        ('product_id', 'product_name', 'product_type', 'grade'),
+        ('total_quantity', 'total_revenue', 'orders_count')
+    )
+    products.sort(key=lambda row: row['total_quantity'], reverse=True)
+    return products
 
 
 def safe_number(value: Any, fallback: str = '0') -> str:
@@ -240,42 +227,126 @@ def page_product_breakdowns(pdf: PdfPages, products: List[Dict[str, Any]], month
         return
     month_labels = [format_month_label(month) for month in months]
     for product in products:
-        data = monthly_dataset.get(product['product_id']) or {'months': {month: {'revenue': 0, 'quantity': 0, 'orders': 0} for month in months}}
-        fig = plt.figure(figsize=(8.5, 11))
-        fig.subplots_adjust(top=0.9)
-        title = f"{product.get('product_name') or 'Product'} · {product.get('product_type') or 'Type'}"
-        fig.suptitle(title, fontsize=16, weight='bold')
-        gs = fig.add_gridspec(2, 1, height_ratios=[1, 1])
-        ax_table = fig.add_subplot(gs[0])
-        ax_chart = fig.add_subplot(gs[1])
-        ax_table.axis('off')
-        columns = ['Month', 'Orders', 'Units', 'Revenue']
-        rows = []
-        chart_values = []
-        for month, label in zip(months, month_labels):
-            entry = data['months'].get(month, {'orders': 0, 'quantity': 0, 'revenue': 0})
-            rows.append([
-                label,
-                safe_number(entry.get('orders')),
-                safe_number(entry.get('quantity')),
-                safe_currency(entry.get('revenue'))
-            ])
-            chart_values.append(entry.get('revenue', 0))
-        table = ax_table.table(cellText=rows, colLabels=columns, loc='center', cellLoc='center')
-        table.auto_set_font_size(False)
-        table.set_fontsize(9)
-        table.scale(1, 1.2)
-        ax_chart.plot(month_labels, chart_values, marker='o', color='#4a90e2')
-        ax_chart.set_title('Monthly revenue trend')
-        ax_chart.set_ylabel('Revenue (₱)')
-        ax_chart.tick_params(axis='x', rotation=45)
-        ax_chart.grid(alpha=0.2)
-        pdf.savefig(fig)
-        plt.close(fig)
+        page_product(pdf, product, monthly_dataset.get(product['product_id']), months, month_labels)
 
 
-def main():
-    args = parse_args()
+def page_product(pdf: PdfPages, product: Dict[str, Any], data: Optional[Dict[str, Any]], months: List[str], month_labels: List[str]):
+    data = data or {'months': {month: {'revenue': 0, 'quantity': 0, 'orders': 0} for month in months}}
+    fig = plt.figure(figsize=(8.5, 11))
+    fig.subplots_adjust(top=0.9)
+    title = f"{product.get('product_name') or 'Product'} · {product.get('product_type') or 'Type'}"
+    fig.suptitle(title, fontsize=16, weight='bold')
+    gs = fig.add_gridspec(2, 1, height_ratios=[1, 1])
+    ax_table = fig.add_subplot(gs[0])
+    ax_chart = fig.add_subplot(gs[1])
+    ax_table.axis('off')
+    columns = ['Month', 'Orders', 'Units', 'Revenue']
+    rows = []
+    chart_values = []
+    for month, label in zip(months, month_labels):
+        entry = data['months'].get(month, {'orders': 0, 'quantity': 0, 'revenue': 0})
+        rows.append([
+            label,
+            safe_number(entry.get('orders')),
+            safe_number(entry.get('quantity')),
+            safe_currency(entry.get('revenue'))
+        ])
+        chart_values.append(entry.get('revenue', 0))
+    table = ax_table.table(cellText=rows, colLabels=columns, loc='center', cellLoc='center')
+    table.auto_set_font_size(False)
+    table.set_fontsize(9)
+    table.scale(1, 1.2)
+    ax_chart.plot(month_labels, chart_values, marker='o', color='#4a90e2')
+    ax_chart.set_title('Monthly revenue trend')
+    ax_chart.set_ylabel('Revenue (₱)')
+    ax_chart.tick_params(axis='x', rotation=45)
+    ax_chart.grid(alpha=0.2)
+    pdf.savefig(fig)
+    plt.close(fig)
+
+
+def render_product_fragment(path: str, products: List[Dict[str, Any]], monthly_dataset: Dict[int, Dict[str, Any]], months: List[str]) -> str:
+    with open_pdf(Path(path)) as pdf:
+        page_product_breakdowns(pdf, products, monthly_dataset, months)
+    return path
+
+
+# Product pages are split into contiguous chunks, one PDF fragment each, and merged
+# back in chunk order so the document matches a sequential render page for page.
+def render_parallel(output_path: Path, farm: Dict[str, Any], filters: Dict[str, Any], summary: Dict[str, Any],
+                    products: List[Dict[str, Any]], monthly_dataset: Dict[int, Dict[str, Any]], months: List[str], workers: int,
+                    timer: PhaseTimer):
+    chunk_size = math.ceil(len(products) / workers)
+    chunks = [products[start:start + chunk_size] for start in range(0, len(products), chunk_size)]
+    with tempfile.TemporaryDirectory(dir=output_path.parent) as scratch:
+        head = Path(scratch) / 'head.pdf'
+        fragments = [Path(scratch) / f'products-{index:04d}.pdf' for index in range(len(chunks))]
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            futures = [
+                pool.submit(
+                    render_product_fragment,
+                    str(fragment),
+                    chunk,
+                    {product['product_id']: monthly_dataset.get(product['product_id']) for product in chunk},
+                    months
+                )
+                for fragment, chunk in zip(fragments, chunks)
+            ]
+            with open_pdf(head) as pdf:
+                page_hero(pdf, farm, filters, summary)
+                page_charts(pdf, products)
+            for future in futures:
+                future.result()
+        with timer.phase('write'):
+            merge_pdfs([head, *fragments], output_path)
+
+
+def render_farm_report(args: argparse.Namespace, farm: Dict[str, Any], filters: Dict[str, Any], months: List[str],
+                       monthly_rows: List[Dict[str, Any]], cache_key: Optional[str], timer: PhaseTimer) -> Dict[str, Any]:
+    farm_id = farm['farmId']
+    with timer.phase('build'):
+        products = summarize_products(monthly_rows)
+        total_orders = sum(item.get('orders_count') or 0 for item in products)
+        total_quantity = sum(item.get('total_quantity') or 0 for item in products)
+        total_revenue = sum(item.get('total_revenue') or 0 for item in products)
+    summary = {
+        'totalOrders': total_orders,
+        'totalQuantity': total_quantity,
+        'totalRevenue': total_revenue,
+        'productCount': len(products)
+    }
+    if args.format != 'pdf':
+        csv_path = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"order-sales-report-{farm_id}-{args.start_date}-{args.end_date}.csv"
+        with timer.phase('write'):
+            return emit_data(args.format, {
+                'farm': farm,
+                'filters': filters,
+                'summary': summary,
+                'products': products,
+                'months': monthly_rows
+            }, monthly_rows, csv_path)
+    FRONTEND_REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    output_path = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"order-sales-report-{farm_id}-{args.start_date}-{args.end_date}.pdf"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with timer.phase('build'):
+        monthly_dataset = build_monthly_dataset(products, monthly_rows, months)
+    workers = render_workers(args.workers)
+    if workers > 1 and len(products) >= PARALLEL_MIN_PRODUCTS and pdf_merge_available():
+        # Pool workers' CPU time is not counted; the render wall time covers them.
+        with timer.phase('render'):
+            render_parallel(output_path, farm, filters, summary, products, monthly_dataset, months, workers, timer)
+    else:
+        with timer.render(open_pdf, output_path) as pdf:
+            page_hero(pdf, farm, filters, summary)
+            page_charts(pdf, products)
+            page_product_breakdowns(pdf, products, monthly_dataset, months)
+    return report_cache.finish(cache_key, {
+        'path': str(output_path.resolve()),
+        'publicUrl': f"/reports/{output_path.name}"
+    })
+
+
+def generate(args: argparse.Namespace, conn, timer: PhaseTimer) -> Dict[str, Any]:
     filters = {
         'startDateFrom': args.start_date,
         'startDateTo': args.end_date
@@ -283,37 +354,61 @@ def main():
     months = month_range(args.start_date, args.end_date)
     if not months:
         months = [args.start_date]
-    conn = connect_db()
+    farm_ids = [args.farm_id] if args.farm_id is not None else args.farm_ids
+    farms: Optional[Dict[int, Dict[str, Any]]] = None
+    monthly_rows: Dict[int, List[Dict[str, Any]]] = {}
+    pending: List[int] = []
+    owns_connection = conn is None
+    if owns_connection:
+        conn = connect_db()
     try:
         cursor = conn.cursor(dictionary=True)
-        farm = fetch_farm(cursor, args.farm_id)
-        if not farm:
-            raise SystemExit('Farm not found.')
-        products = fetch_order_breakdown(cursor, args.farm_id, args.start_date, args.end_date)
-        monthly_rows = fetch_monthly_order_breakdown(cursor, args.farm_id, args.start_date, args.end_date)
+        if args.all_farms:
+            farms = timer.fetch(fetch_farms, cursor, None)
+            farm_ids = list(farms)
+        with timer.phase('cache'):
+            checks = report_cache.check_many(cursor, 'farmer-orders', [{**filters, 'farmId': farm_id} for farm_id in farm_ids],
+                                             CACHE_TABLES, enabled=args.format == 'pdf' and not args.no_cache and not args.output)
+        cache_keys = {farm_id: key for farm_id, (key, _) in zip(farm_ids, checks)}
+        results: Dict[int, Dict[str, Any]] = {farm_id: cached for farm_id, (_, cached) in zip(farm_ids, checks) if cached}
+        pending = [farm_id for farm_id in farm_ids if farm_id not in results]
+        if pending:
+            if farms is None:
+                farms = timer.fetch(fetch_farms, cursor, pending)
+            pending = [farm_id for farm_id in pending if farm_id in farms]
+            # With every farm pending, an unfiltered scan beats a long IN list.
+            scope = None if args.all_farms and len(pending) == len(farm_ids) else pending
+            monthly_rows = timer.fetch(fetch_monthly_order_breakdown, cursor, scope, args.start_date, args.end_date)
+        cursor.close()
     finally:
-        conn.close()
-    total_orders = sum(item.get('orders_count') or 0 for item in products)
-    total_quantity = sum(item.get('total_quantity') or 0 for item in products)
-    total_revenue = sum(item.get('total_revenue') or 0 for item in products)
-    summary = {
-        'totalOrders': total_orders,
-        'totalQuantity': total_quantity,
-        'totalRevenue': total_revenue,
-        'productCount': len(products)
+        if owns_connection:
+            conn.close()
+    for farm_id in pending:
+        results[farm_id] = render_farm_report(args, farms[farm_id], filters, months, monthly_rows.get(farm_id, []), cache_keys[farm_id], timer)
+    if args.farm_id is not None:
+        if args.farm_id not in results:
+            raise SystemExit('Farm not found.')
+        return results[args.farm_id]
+    return {
+        'reports': [
+            {'farmId': farm_id, **results[farm_id]} if farm_id in results else {'farmId': farm_id, 'error': 'Farm not found.'}
+            for farm_id in farm_ids
+        ]
     }
-    FRONTEND_REPORTS_DIR.mkdir(parents=True, exist_ok=True)
-    output_path = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"order-sales-report-{args.farm_id}-{args.start_date}-{args.end_date}.pdf"
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    monthly_dataset = build_monthly_dataset(products, monthly_rows, months)
-    with PdfPages(output_path) as pdf:
-        page_hero(pdf, farm, filters, summary)
-        page_charts(pdf, products)
-        page_product_breakdowns(pdf, products, monthly_dataset, months)
-    print(json.dumps({
-        'path': str(output_path.resolve()),
-        'publicUrl': f"/reports/{output_path.name}"
-    }))
+
+
+def run(argv: Optional[List[str]] = None, conn=None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    if args.output and args.farm_id is None:
+        raise SystemExit('--output can only be used with --farm-id.')
+    # Fan-out runs time every farm together, so their profile is named for the window and the farm set.
+    farm_ids = [args.farm_id] if args.farm_id is not None else (None if args.all_farms else args.farm_ids)
+    profile_path = FRONTEND_REPORTS_DIR / f"order-sales-report-{farm_set_label(farm_ids)}-{args.start_date}-{args.end_date}.prof"
+    return timed_run(lambda timer: generate(args, conn, timer), args.profile, profile_path)
+
+
+def main():
+    print(json.dumps(run()))
 
 
 if __name__ == '__main__':
@@ -7,97 +7,105 @@ import argparse
 import json
 import math
 import sys
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict, List, Mapping, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Mapping, Optional
 
-import mysql.connector
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
-
-CONFIG_PATH = Path(__file__).resolve().parents[1] / 'config' / 'database.json'
-FRONTEND_REPORTS_DIR = Path(__file__).resolve().parents[3] / 'frontend' / 'reports'
+import report_cache
+from report_db import connect_db, in_clause, stream_rows
+from report_output import OUTPUT_FORMATS, emit_data, open_pdf
+from report_output import pyplot as plt
+from report_timing import PhaseTimer, farm_set_label, timed_run
 
+if TYPE_CHECKING:
+    from matplotlib.backends.backend_pdf import PdfPages
 
-def load_db_config() -> Dict[str, Any]:
-    if not CONFIG_PATH.exists():
-        raise SystemExit(f'Missing database config at {CONFIG_PATH}')
-    data = json.loads(CONFIG_PATH.read_text())
-    connection = data.get('connection', {})
-    return {
-        'host': connection.get('host', '127.0.0.1'),
-        'port': connection.get('port', 3306),
-        'user': connection.get('user', 'root'),
-        'password': connection.get('password', ''),
-        'database': connection.get('database')
-    }
+FRONTEND_REPORTS_DIR = Path(__file__).resolve().parents[3] / 'frontend' / 'reports'
+CACHE_TABLES = ('Subscription', 'Inventory', 'FarmProduct', 'RawProduct', 'Farm', 'Client')
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='Render a PDF report for a farmer.')
-    parser.add_argument('--farm-id', type=int, required=True, help='ID of the farm.')
+    farms = parser.add_mutually_exclusive_group(required=True)
+    farms.add_argument('--farm-id', type=int, help='ID of the farm.')
+    farms.add_argument('--farm-ids', type=parse_farm_ids, help='Comma-separated farm IDs to render in one pass.')
+    farms.add_argument('--all-farms', action='store_true', help='Render a report for every farm in one pass.')
     parser.add_argument('--from', dest='start_date', required=True, help='Start date (YYYY-MM-DD)')
     parser.add_argument('--to', dest='end_date', required=True, help='End date (YYYY-MM-DD)')
     parser.add_argument('--product-id', type=int, help='Optional product filter.')
     parser.add_argument('--output', help='Optional path for the resulting PDF.')
-    return parser.parse_args()
+    parser.add_argument('--no-cache', action='store_true', help='Render even if a cached PDF is still current.')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='pdf',
+                        help='pdf renders the report; json and csv emit the dataset without loading matplotlib.')
+    parser.add_argument('--profile', action='store_true', help='Write a cProfile dump and the peak traced memory next to the output.')
+    return parser.parse_args(argv)
 
 
-def connect_db():
-    params = load_db_config()
-    if not params['database']:
-        raise SystemExit('Database name is missing from config.')
+def parse_farm_ids(value: str) -> List[int]:
     try:
-        return mysql.connector.connect(**params)
-    except mysql.connector.Error as exc:
-        raise SystemExit(f"Unable to connect to the database: {exc}") from exc
+        return list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise argparse.ArgumentTypeError('Expected a comma-separated list of farm IDs.')
 
 
-def fetch_farm(cursor, farm_id: int) -> Optional[Dict[str, Any]]:
-    cursor.execute("""
+def group_by_farm(rows: Iterable[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+    grouped: Dict[int, List[Dict[str, Any]]] = {}
+    for row in rows:
+        grouped.setdefault(row['farm_id'], []).append(row)
+    return grouped
+
+
+def fetch_farms(cursor, farm_ids: Optional[List[int]]) -> Dict[int, Dict[str, Any]]:
+    condition, params = in_clause('f.farm_id', farm_ids)
+    rows = stream_rows(cursor, f"""
         SELECT f.farm_id, f.name as farm_name, loc.street, loc.city, loc.state, loc.country
         FROM Farm AS f
         LEFT JOIN Location AS loc ON f.location_id = loc.location_id
-        WHERE f.farm_id = %s
-    """, (farm_id,))
-    row = cursor.fetchone()
-    if not row:
-        return None
-    parts = [row.get('street'), row.get('city'), row.get('state'), row.get('country')]
-    location = ', '.join([part for part in parts if part])
-    return {
-        'farmId': row['farm_id'],
-        'name': row.get('farm_name'),
-        'locationLabel': location or None
-    }
+        WHERE {condition}
+        ORDER BY f.farm_id
+    """, params)
+    farms: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        parts = [row.get('street'), row.get('city'), row.get('state'), row.get('country')]
+        location = ', '.join([part for part in parts if part])
+        farms[row['farm_id']] = {
+            'farmId': row['farm_id'],
+            'name': row.get('farm_name'),
+            'locationLabel': location or None
+        }
+    return farms
 
 
-def fetch_offerings(cursor, farm_id: int) -> List[Dict[str, Any]]:
-    cursor.execute("""
-        SELECT fp.product_id, rp.product_name, rp.product_type, rp.grade
+def fetch_offerings(cursor, farm_ids: Optional[List[int]]) -> Dict[int, List[Dict[str, Any]]]:
+    condition, params = in_clause('fp.farm_id', farm_ids)
+    return group_by_farm(stream_rows(cursor, f"""
+        SELECT fp.farm_id, fp.product_id, rp.product_name, rp.product_type, rp.grade
         FROM FarmProduct AS fp
         JOIN RawProduct AS rp ON fp.product_id = rp.product_id
-        WHERE fp.farm_id = %s
+        WHERE {condition}
         ORDER BY rp.product_name
-    """, (farm_id,))
-    return list(cursor.fetchall())
+    """, params))
 
 
-def fetch_inventory(cursor, farm_id: int, product_id: Optional[int]) -> List[Dict[str, Any]]:
-    sql = """
-        SELECT inv.product_id, inv.price, inv.weight, inv.quantity
+def fetch_inventory(cursor, farm_ids: Optional[List[int]], product_id: Optional[int]) -> Iterator[Dict[str, Any]]:
+    condition, params = in_clause('inv.farm_id', farm_ids)
+    sql = f"""
+        SELECT inv.farm_id, inv.product_id, inv.price, inv.weight, inv.quantity
         FROM Inventory AS inv
-        WHERE inv.farm_id = %s AND inv.price IS NOT NULL AND inv.weight IS NOT NULL AND inv.weight > 0
+        WHERE {condition} AND inv.price IS NOT NULL AND inv.weight IS NOT NULL AND inv.weight > 0
     """
-    params: List[Any] = [farm_id]
     if product_id:
         sql += " AND inv.product_id = %s"
         params.append(product_id)
-    cursor.execute(sql, tuple(params))
-    return list(cursor.fetchall())
+    return stream_rows(cursor, sql, params)
 
 
-def fetch_subscriptions(cursor, farm_id: int, start_date: str, end_date: str, product_id: Optional[int]) -> List[Dict[str, Any]]:
-    sql = """
+# Ordered by farm so callers can group the stream without buffering it.
+def fetch_subscriptions(cursor, farm_ids: Optional[List[int]], start_date: str, end_date: str,
+                        product_id: Optional[int]) -> Iterator[Dict[str, Any]]:
+    condition, params = in_clause('s.farm_id', farm_ids)
+    sql = f"""
     SELECT s.program_id, s.product_id, s.client_id, s.farm_id, s.order_interval_days,
            s.start_date, s.quantity, s.price, s.status,
            c.first_name, c.last_name, c.company_name,
@@ -105,17 +113,15 @@ def fetch_subscriptions(cursor, farm_id: int, start_date: str, end_date: str, pr
         FROM Subscription AS s
         JOIN Client AS c ON s.client_id = c.client_id
         JOIN RawProduct AS rp ON s.product_id = rp.product_id
-        WHERE s.farm_id = %s
+        WHERE {condition}
           AND s.start_date BETWEEN %s AND %s
     """
-    params: List[Any] = [farm_id, start_date, end_date]
+    params.extend([start_date, end_date])
     if product_id:
         sql += " AND s.product_id = %s"
         params.append(product_id)
-    sql += " ORDER BY rp.product_name, s.start_date"
-    cursor.execute(sql, tuple(params))
-    rows = cursor.fetchall()
-    return [
+    sql += " ORDER BY s.farm_id, rp.product_name, s.start_date"
+    return (
         {
             'programId': row['program_id'],
             'productId': row['product_id'],
@@ -132,8 +138,8 @@ def fetch_subscriptions(cursor, farm_id: int, start_date: str, end_date: str, pr
             'productType': row.get('product_type'),
             'grade': row.get('grade')
         }
-        for row in rows
-    ]
+        for row in stream_rows(cursor, sql, params)
+    )
 
 
 def to_number(value: Any) -> Optional[float]:
@@ -147,29 +153,37 @@ def to_number(value: Any) -> Optional[float]:
         return None
 
 
-def average(values: List[float]) -> Optional[float]:
-    filtered = [value for value in values if value is not None]
-    if not filtered:
+# Running [total, count] pairs keep averages flat in memory however many rows stream past.
+def add_sample(sample: List[float], value: Optional[float]):
+    if value is not None:
+        sample[0] += value
+        sample[1] += 1
+
+
+def sample_average(sample: List[float]) -> Optional[float]:
+    if not sample[1]:
         return None
-    return round(sum(filtered) / len(filtered), 2)
+    return round(sample[0] / sample[1], 2)
 
 
-def build_inventory_lookup(rows: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
-    lookup: Dict[int, Dict[str, Any]] = {}
+def build_inventory_lookups(rows: Iterable[Dict[str, Any]]) -> Dict[int, Dict[int, Dict[str, Any]]]:
+    lookup: Dict[int, Dict[int, Dict[str, Any]]] = {}
     for row in rows:
-        pid = row['product_id']
-        entry = lookup.setdefault(pid, {'unitPrices': [], 'availableUnits': 0})
+        entry = lookup.setdefault(row['farm_id'], {}).setdefault(row['product_id'], {'unitPrices': [0.0, 0], 'availableUnits': 0})
         price = to_number(row.get('price'))
         weight = to_number(row.get('weight'))
         if price is not None and weight:
-            entry['unitPrices'].append(price / weight)
+            add_sample(entry['unitPrices'], price / weight)
         entry['availableUnits'] += row.get('quantity') or 0
     return {
-        pid: {
-            'avgPrice': to_number(average(values['unitPrices'])),
-            'availableUnits': values['availableUnits']
+        farm_id: {
+            pid: {
+                'avgPrice': to_number(sample_average(values['unitPrices'])),
+                'availableUnits': values['availableUnits']
+            }
+            for pid, values in products.items()
         }
-        for pid, values in lookup.items()
+        for farm_id, products in lookup.items()
     }
 
 
@@ -193,7 +207,7 @@ def to_number(value: Any) -> Optional[float]:
 
 
 def build_report(farm: Dict[str, Any], filters: Mapping[str, Any], offerings: List[Dict[str, Any]],
-                 subscriptions: List[Dict[str, Any]], inventory_lookup: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+                 subscriptions: Iterable[Dict[str, Any]], inventory_lookup: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
     entry_map: Dict[int, Dict[str, Any]] = {}
     for offer in offerings:
         entry_map[offer['product_id']] = {
@@ -201,15 +215,15 @@ def build_report(farm: Dict[str, Any], filters: Mapping[str, Any], offerings: Li
             'productName': offer['product_name'],
             'productType': offer['product_type'],
             'grade': offer['grade'],
-            'subscriptions': [],
+            'clients': [],
             'clientIds': set(),
             'activeCount': 0,
             'cancelledCount': 0,
             'awaitingCount': 0,
-            'priceSamples': [],
-            'intervalSamples': [],
-            'quantitySamples': [],
-            'monthlyRevenue': []
+            'priceSamples': [0.0, 0],
+            'intervalSamples': [0.0, 0],
+            'quantitySamples': [0.0, 0],
+            'monthlyRevenue': 0.0
         }
     for sub in subscriptions:
         pid = sub['productId']
@@ -218,17 +232,24 @@ def build_report(farm: Dict[str, Any], filters: Mapping[str, Any], offerings: Li
             'productName': sub['productName'],
             'productType': sub['productType'],
             'grade': sub['grade'],
-            'subscriptions': [],
+            'clients': [],
             'clientIds': set(),
             'activeCount': 0,
             'cancelledCount': 0,
             'awaitingCount': 0,
-            'priceSamples': [],
-            'intervalSamples': [],
-            'quantitySamples': [],
-            'monthlyRevenue': []
+            'priceSamples': [0.0, 0],
+            'intervalSamples': [0.0, 0],
+            'quantitySamples': [0.0, 0],
+            'monthlyRevenue': 0.0
+        })
+        entry['clients'].append({
+            'clientName': sub['clientName'],
+            'status': sub['status'],
+            'statusLabel': STATUS_LABELS.get((sub['status'] or '').upper(), sub['status'] or 'Unknown'),
+            'quantity': sub['quantity'],
+            'intervalDays': sub['intervalDays'],
+            'price': sub['price']
         })
-        entry['subscriptions'].append(sub)
         entry['clientIds'].add(sub['clientId'])
         status = (sub['status'] or 'AWAITING_QUOTE').upper()
         if status == 'ACTIVE':
@@ -238,29 +259,27 @@ def build_report(farm: Dict[str, Any], filters: Mapping[str, Any], offerings: Li
         else:
             entry['awaitingCount'] += 1
         price = to_number(sub.get('price'))
-        if price is not None:
-            entry['priceSamples'].append(price)
+        add_sample(entry['priceSamples'], price)
         quantity = to_number(sub.get('quantity'))
-        if quantity is not None:
-            entry['quantitySamples'].append(quantity)
+        add_sample(entry['quantitySamples'], quantity)
         interval_days = to_number(sub.get('intervalDays'))
         if interval_days and status == 'ACTIVE':
-            entry['intervalSamples'].append(interval_days)
+            add_sample(entry['intervalSamples'], interval_days)
             if price is not None and interval_days > 0:
                 units = quantity if quantity is not None else 1
-                entry['monthlyRevenue'].append((30 / interval_days) * price * units)
+                entry['monthlyRevenue'] += (30 / interval_days) * price * units
     offerings_list = []
     for entry in entry_map.values():
-        avg_subscription_price = average(entry['priceSamples'])
-        avg_interval = average(entry['intervalSamples'])
-        avg_quantity = average(entry['quantitySamples'])
-        projected_monthly = sum(entry['monthlyRevenue'])
+        avg_subscription_price = sample_average(entry['priceSamples'])
+        avg_interval = sample_average(entry['intervalSamples'])
+        avg_quantity = sample_average(entry['quantitySamples'])
+        projected_monthly = entry['monthlyRevenue']
         inventory = inventory_lookup.get(entry['productId'], {})
         on_demand_price = to_number(inventory.get('avgPrice'))
         price_delta = None
         if avg_subscription_price is not None and on_demand_price is not None:
             price_delta = round(avg_subscription_price - on_demand_price, 2)
-        total_programs = len(entry['subscriptions'])
+        total_programs = len(entry['clients'])
         churn_rate = None
         denominator = entry['activeCount'] + entry['cancelledCount'] + entry['awaitingCount']
         if denominator:
@@ -284,14 +303,7 @@ def build_report(farm: Dict[str, Any], filters: Mapping[str, Any], offerings: Li
             'priceDeltaPercent': round(price_delta / on_demand_price * 100, 1) if price_delta is not None and on_demand_price else None,
             'availableUnits': inventory.get('availableUnits', 0),
             'churnRate': churn_rate,
-            'clients': [{
-                'clientName': client['clientName'],
-                'status': client['status'],
-                'statusLabel': STATUS_LABELS.get((client['status'] or '').upper(), client['status'] or 'Unknown'),
-                'quantity': client['quantity'],
-                'intervalDays': client['intervalDays'],
-                'price': client['price']
-            } for client in entry['subscriptions']]
+            'clients': entry['clients']
         })
     offerings_list.sort(key=lambda item: (-item['activeCount'], item['productName'] or ''))
     summary = {
@@ -467,37 +479,97 @@ def page_clients(pdf: PdfPages, report: Dict[str, Any]):
     plt.close(fig)
 
 
-def main() -> None:
-    args = parse_args()
+def render_farm_report(args: argparse.Namespace, report: Dict[str, Any], cache_key: Optional[str], timer: PhaseTimer) -> Dict[str, Any]:
+    farm_id = report['farm']['farmId']
+    if args.format != 'pdf':
+        csv_path = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"farmer-report-{farm_id}-{args.start_date}-{args.end_date}.csv"
+        with timer.phase('write'):
+            return emit_data(args.format, report, report['offerings'], csv_path)
+    FRONTEND_REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    filename = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"farmer-report-{farm_id}-{args.start_date}-{args.end_date}.pdf"
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    with timer.render(open_pdf, filename) as pdf:
+        page_hero(pdf, report)
+        page_charts(pdf, report)
+        page_table(pdf, report)
+        page_clients(pdf, report)
+    return report_cache.finish(cache_key, {'path': str(filename.resolve()), 'publicUrl': f"/reports/{filename.name}"})
+
+
+def generate(args: argparse.Namespace, conn, timer: PhaseTimer) -> Dict[str, Any]:
     filters = {
         'startDateFrom': args.start_date,
         'startDateTo': args.end_date
     }
     if args.product_id:
         filters['productId'] = args.product_id
-    conn = connect_db()
+    farm_ids = [args.farm_id] if args.farm_id is not None else args.farm_ids
+    farms: Optional[Dict[int, Dict[str, Any]]] = None
+    reports: List[Dict[str, Any]] = []
+    owns_connection = conn is None
+    if owns_connection:
+        conn = connect_db()
     try:
         cursor = conn.cursor(dictionary=True)
-        farm = fetch_farm(cursor, args.farm_id)
-        if not farm:
-            raise SystemExit('Farm not found.')
-        offerings = fetch_offerings(cursor, args.farm_id)
-        inventory = fetch_inventory(cursor, args.farm_id, args.product_id)
-        subscriptions = fetch_subscriptions(cursor, args.farm_id, args.start_date, args.end_date, args.product_id)
-        inventory_lookup = build_inventory_lookup(inventory)
-        report = build_report(farm, filters, offerings, subscriptions, inventory_lookup)
+        if args.all_farms:
+            farms = timer.fetch(fetch_farms, cursor, None)
+            farm_ids = list(farms)
+        with timer.phase('cache'):
+            checks = report_cache.check_many(cursor, 'farmer-subscriptions', [{**filters, 'farmId': farm_id} for farm_id in farm_ids],
+                                             CACHE_TABLES, enabled=args.format == 'pdf' and not args.no_cache and not args.output)
+        cache_keys = {farm_id: key for farm_id, (key, _) in zip(farm_ids, checks)}
+        results: Dict[int, Dict[str, Any]] = {farm_id: cached for farm_id, (_, cached) in zip(farm_ids, checks) if cached}
+        pending = [farm_id for farm_id in farm_ids if farm_id not in results]
+        if pending:
+            if farms is None:
+                farms = timer.fetch(fetch_farms, cursor, pending)
+            pending = [farm_id for farm_id in pending if farm_id in farms]
+            # With every farm pending, an unfiltered scan beats a long IN list.
+            scope = None if args.all_farms and len(pending) == len(farm_ids) else pending
+            offerings = timer.fetch(fetch_offerings, cursor, scope)
+            inventory_rows = timer.fetch(fetch_inventory, cursor, scope, args.product_id)
+            subscriptions = timer.fetch(fetch_subscriptions, cursor, scope, args.start_date, args.end_date, args.product_id)
+            with timer.phase('build'):
+                inventory_lookups = build_inventory_lookups(inventory_rows)
+                built: Dict[int, Dict[str, Any]] = {}
+                for farm_id, farm_subscriptions in groupby(subscriptions, key=itemgetter('farmId')):
+                    if farm_id in farms:
+                        built[farm_id] = build_report(farms[farm_id], filters, offerings.get(farm_id, []),
+                                                      farm_subscriptions, inventory_lookups.get(farm_id, {}))
+                for farm_id in pending:
+                    reports.append(built.get(farm_id) or build_report(farms[farm_id], filters, offerings.get(farm_id, []),
+                                                                      (), inventory_lookups.get(farm_id, {})))
+        cursor.close()
     finally:
-        conn.close()
-    FRONTEND_REPORTS_DIR.mkdir(parents=True, exist_ok=True)
-    filename = Path(args.output) if args.output else FRONTEND_REPORTS_DIR / f"farmer-report-{args.farm_id}-{args.start_date}-{args.end_date}.pdf"
-    filename.parent.mkdir(parents=True, exist_ok=True)
-    with PdfPages(filename) as pdf:
-        page_hero(pdf, report)
-        page_charts(pdf, report)
-        page_table(pdf, report)
-        page_clients(pdf, report)
-    result = {'path': str(filename.resolve()), 'publicUrl': f"/reports/{filename.name}"}
-    print(json.dumps(result))
+        if owns_connection:
+            conn.close()
+    for report in reports:
+        farm_id = report['farm']['farmId']
+        results[farm_id] = render_farm_report(args, report, cache_keys[farm_id], timer)
+    if args.farm_id is not None:
+        if args.farm_id not in results:
+            raise SystemExit('Farm not found.')
+        return results[args.farm_id]
+    return {
+        'reports': [
+            {'farmId': farm_id, **results[farm_id]} if farm_id in results else {'farmId': farm_id, 'error': 'Farm not found.'}
+            for farm_id in farm_ids
+        ]
+    }
+
+
+def run(argv: Optional[List[str]] = None, conn=None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    if args.output and args.farm_id is None:
+        raise SystemExit('--output can only be used with --farm-id.')
+    # Fan-out runs time every farm together, so their profile is named for the window and the farm set.
+    farm_ids = [args.farm_id] if args.farm_id is not None else (None if args.all_farms else args.farm_ids)
+    profile_path = FRONTEND_REPORTS_DIR / f"farmer-report-{farm_set_label(farm_ids)}-{args.start_date}-{args.end_date}.prof"
+    return timed_run(lambda timer: generate(args, conn, timer), args.profile, profile_path)
+
+
+def main() -> None:
+    print(json.dumps(run()))
 
 
 if __name__ == '__main__':
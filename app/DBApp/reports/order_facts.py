@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Export Orders as a denormalized, month-partitioned columnar snapshot that reports memory-map instead of querying."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from report_db import connect_db, stream_rows
+from sales_rollup import month_start, next_month
+
+SNAPSHOT_DIR = Path(os.environ.get('REPORT_SNAPSHOT_DIR') or Path(__file__).resolve().parent / '.cache' / 'order_facts')
+
+# Bump when the column layout changes; older snapshots must be re-exported.
+FORMAT_VERSION = 1
+
+# One <column>.npy file per partition. product_type indexes manifest['dictionaries']['product_type'].
+COLUMNS = {
+    'order_id': 'u4',
+    'order_date': 'datetime64[D]',
+    'farm_id': 'u4',
+    'product_id': 'u4',
+    'product_type': 'u2',
+    'client_id': 'u4',
+    'quantity': 'u4',
+    'price_cents': 'i8',
+    'points_used': 'u4',
+    'points_earned': 'i8'
+}
+
+FACT_SQL = """
+    SELECT o.order_id,
+           o.order_date,
+           inv.farm_id,
+           inv.product_id,
+           o.client_id,
+           o.quantity,
+           inv.price,
+           IFNULL(o.loyalty_points_used, 0) AS points_used
+    FROM Orders AS o
+    JOIN Inventory AS inv ON o.batch_id = inv.batch_id
+    WHERE o.order_date BETWEEN %s AND %s
+"""
+
+PRODUCTS_SQL = 'SELECT product_id, product_name, product_type, grade FROM RawProduct'
+
+RANGE_SQL = 'SELECT MIN(order_date) AS first_order, MAX(order_date) AS last_order FROM Orders'
+
+# Per-month watermark from data the triggers maintain, so checking every closed month reads no Orders rows.
+# The rollup totals move when orders are added, removed, re-priced or moved to another farm or product;
+# the Orders version slots (YYYYMM) count any other edit to a month's orders.
+MONTH_ROLLUP_SQL = """
+    SELECT DATE_FORMAT(month_start, '%Y-%m') AS month,
+           CONCAT_WS(':', SUM(orders_count), SUM(total_quantity), SUM(total_revenue), SUM(points_redeemed),
+                     SUM(farm_id * total_quantity), SUM(product_id * total_quantity)) AS mark
+    FROM MonthlySalesRollup
+    GROUP BY month
+"""
+
+MONTH_VERSION_SQL = "SELECT slot, version FROM ReportDataVersion WHERE table_name = 'Orders'"
+
+EPOCH = date(1970, 1, 1)
+
+
+def as_date(value: Any) -> date:
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def partition_key(month: date) -> str:
+    return month.strftime('%Y-%m')
+
+
+def partition_dir(root: Path, key: str) -> Path:
+    return root / f'month={key}'
+
+
+def month_keys(start: date, end: date) -> List[str]:
+    keys = []
+    month = month_start(start)
+    while month <= end:
+        keys.append(partition_key(month))
+        month = next_month(month)
+    return keys
+
+
+def month_watermarks(cursor) -> Dict[str, str]:
+    cursor.execute(MONTH_ROLLUP_SQL)
+    marks = {row['month']: row['mark'] for row in cursor.fetchall()}
+    cursor.execute(MONTH_VERSION_SQL)
+    for row in cursor.fetchall():
+        key = f"{int(row['slot']) // 100:04d}-{int(row['slot']) % 100:02d}"
+        marks[key] = f"{marks.get(key) or ''}:v{row['version']}"
+    return marks
+
+
+def empty_manifest() -> Dict[str, Any]:
+    return {'version': FORMAT_VERSION, 'columns': COLUMNS, 'dictionaries': {'product_type': []}, 'products': {}, 'partitions': {}}
+
+
+def read_manifest(root: Path) -> Dict[str, Any]:
+    try:
+        manifest = json.loads((root / 'manifest.json').read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return empty_manifest()
+    if manifest.get('version') != FORMAT_VERSION:
+        raise SystemExit(f'{root} holds a version {manifest.get("version")} snapshot; re-export it with order_facts.py export --from <first month>.')
+    return manifest
+
+
+def write_manifest(root: Path, manifest: Dict[str, Any]):
+    root.mkdir(parents=True, exist_ok=True)
+    target = root / 'manifest.json'
+    temp = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+    temp.write_text(json.dumps(manifest, indent=1), encoding='utf-8')
+    os.replace(temp, target)
+
+
+def write_partition(cursor, root: Path, month: date, type_codes: Dict[int, int]) -> int:
+    columns: Dict[str, List[int]] = {name: [] for name in COLUMNS}
+    last_day = next_month(month) - timedelta(days=1)
+    for row in stream_rows(cursor, FACT_SQL, (month.isoformat(), last_day.isoformat())):
+        quantity = int(row['quantity'])
+        points_used = int(row['points_used'])
+        price_cents = int(round(row['price'] * 100))
+        columns['order_id'].append(row['order_id'])
+        columns['order_date'].append((as_date(row['order_date']) - EPOCH).days)
+        columns['farm_id'].append(row['farm_id'])
+        columns['product_id'].append(row['product_id'])
+        columns['product_type'].append(type_codes[row['product_id']])
+        columns['client_id'].append(row['client_id'])
+        columns['quantity'].append(quantity)
+        columns['price_cents'].append(price_cents)
+        columns['points_used'].append(points_used)
+        # GREATEST(FLOOR((price * quantity - points_used) / 100), 0) in whole cents, so it matches the SQL exactly.
+        columns['points_earned'].append(max((price_cents * quantity - points_used * 100) // 10000, 0))
+
+    key = partition_key(month)
+    target = partition_dir(root, key)
+    temp = root / f'.{target.name}.{os.getpid()}.tmp'
+    shutil.rmtree(temp, ignore_errors=True)
+    temp.mkdir(parents=True)
+    for name, dtype in COLUMNS.items():
+        if dtype.startswith('datetime64'):
+            values = np.array(columns[name], dtype='i8').astype(dtype)
+        else:
+            values = np.array(columns[name], dtype=dtype)
+        np.save(temp / f'{name}.npy', values)
+    # Swap the whole directory so a reader never maps a mix of old and new columns.
+    previous = root / f'.{target.name}.{os.getpid()}.old'
+    if target.exists():
+        os.replace(target, previous)
+    os.replace(temp, target)
+    shutil.rmtree(previous, ignore_errors=True)
+    return len(columns['order_id'])
+
+
+def export(conn, root: Path, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, Any]:
+    started = time.perf_counter()
+    today = date.today()
+    manifest = read_manifest(root)
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(PRODUCTS_SQL)
+    products = cursor.fetchall()
+    # Codes already written to partitions must keep their meaning, so new types are appended.
+    types = manifest['dictionaries']['product_type']
+    for product_type in sorted({row['product_type'] for row in products} - set(types)):
+        types.append(product_type)
+    type_codes = {row['product_id']: types.index(row['product_type']) for row in products}
+    manifest['products'] = {
+        str(row['product_id']): {'name': row['product_name'], 'type': row['product_type'], 'grade': row['grade']}
+        for row in products
+    }
+    write_manifest(root, manifest)
+
+    cursor.execute(RANGE_SQL)
+    bounds = cursor.fetchone()
+    # Read before any partition is written, so an order added meanwhile leaves the mark stale and the month is redone next run.
+    marks = month_watermarks(cursor)
+    exported: List[str] = []
+    changed: List[str] = []
+    skipped = 0
+    rows = 0
+    if bounds['first_order'] is not None:
+        refresh = start is not None or end is not None
+        first = month_start(as_date(bounds['first_order']))
+        # Months before the first order are known to be empty, so readers may treat them as covered.
+        manifest['firstMonth'] = partition_key(first)
+        month = month_start(start or first)
+        # Through the current month, so the snapshot's extent says how fresh it is.
+        last = month_start(end or max(as_date(bounds['last_order']), today))
+        while month <= last:
+            key = partition_key(month)
+            partition = manifest['partitions'].get(key, {})
+            # Closed months are kept until their watermark moves; the open month is refreshed on every run.
+            if not refresh and partition.get('complete') and partition.get('watermark') == marks.get(key):
+                skipped += 1
+            else:
+                if partition.get('complete') and not refresh:
+                    changed.append(key)
+                count = write_partition(cursor, root, month, type_codes)
+                manifest['partitions'][key] = {
+                    'rows': count,
+                    'complete': next_month(month) <= today,
+                    'watermark': marks.get(key),
+                    'exportedAt': datetime.now().isoformat(timespec='seconds')
+                }
+                manifest['partitions'] = dict(sorted(manifest['partitions'].items()))
+                write_manifest(root, manifest)
+                exported.append(key)
+                rows += count
+            month = next_month(month)
+    cursor.close()
+    return {
+        'path': str(root.resolve()),
+        'exported': exported,
+        'changed': changed,
+        'skipped': skipped,
+        'rows': rows,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+class FactSnapshot:
+    """Read side of an export: partitions are memory-mapped, so only the pages a report touches are read."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.manifest = read_manifest(root)
+        if not self.manifest['partitions']:
+            raise SystemExit(f'No order snapshot in {root}; create one with order_facts.py export.')
+
+    def watermark(self) -> Dict[str, Any]:
+        return {'orderFacts': self.manifest['partitions']}
+
+    # A window with any month the export has not written would silently lose that month's sales.
+    def check_coverage(self, start: date, end: date):
+        partitions = self.manifest['partitions']
+        last_key = max(partitions)
+        if partition_key(end) > last_key:
+            raise SystemExit(f'The order snapshot ends at {last_key}; run order_facts.py export to cover {end.isoformat()}.')
+        # Months before the first order are empty rather than missing; older manifests without firstMonth must cover every month.
+        first_key = self.manifest.get('firstMonth')
+        missing = [key for key in month_keys(start, end) if key not in partitions and (first_key is None or key >= first_key)]
+        if missing:
+            months = ', '.join(missing) if len(missing) <= 3 else f'{len(missing)} months from {missing[0]} to {missing[-1]}'
+            raise SystemExit(f'The order snapshot has no partition for {months}; '
+                             f'run order_facts.py export --from {missing[0]}-01 --to {missing[-1]}-01.')
+
+    def column(self, key: str, name: str) -> np.ndarray:
+        return np.load(partition_dir(self.root, key) / f'{name}.npy', mmap_mode='r')
+
+    def sales_rows(self, start_date: str, end_date: str, farm_ids: Optional[Sequence[int]] = None) -> Iterator[Dict[str, Any]]:
+        start = as_date(start_date)
+        end = as_date(end_date)
+        self.check_coverage(start, end)
+        first_day = np.datetime64(start.isoformat(), 'D')
+        last_day = np.datetime64(end.isoformat(), 'D')
+        products = self.manifest['products']
+        for key, partition in self.manifest['partitions'].items():
+            if not partition_key(start) <= key <= partition_key(end) or not partition['rows']:
+                continue
+            order_date = self.column(key, 'order_date')
+            farm = self.column(key, 'farm_id')
+            mask = (order_date >= first_day) & (order_date <= last_day)
+            if farm_ids is not None:
+                mask &= np.isin(farm, np.asarray(farm_ids, dtype='u4'))
+            if not mask.any():
+                continue
+            groups, inverse = np.unique(
+                (farm[mask].astype('u8') << np.uint64(32)) | self.column(key, 'product_id')[mask],
+                return_inverse=True
+            )
+            quantity = self.column(key, 'quantity')[mask].astype('i8')
+            # Integer sums: bincount's float weights would lose cents on large partitions.
+            totals = np.zeros((len(groups), 4), dtype='i8')
+            np.add.at(totals, inverse, np.column_stack((
+                quantity,
+                quantity * self.column(key, 'price_cents')[mask],
+                self.column(key, 'points_earned')[mask],
+                self.column(key, 'points_used')[mask]
+            )))
+            counts = np.bincount(inverse, minlength=len(groups))
+            for index, group in enumerate(groups.tolist()):
+                product_id = group & 0xFFFFFFFF
+                product = products.get(str(product_id), {})
+                total_quantity, revenue_cents, earned, redeemed = totals[index].tolist()
+                yield {
+                    'month_start': f'{key}-01',
+                    'farm_id': group >> 32,
+                    'product_id': product_id,
+                    'product_name': product.get('name'),
+                    'product_type': product.get('type'),
+                    'grade': product.get('grade'),
+                    'total_quantity': total_quantity,
+                    'total_revenue': revenue_cents / 100,
+                    'orders_count': int(counts[index]),
+                    'points_earned': earned,
+                    'points_redeemed': redeemed
+                }
+
+
+def open_snapshot(root: Optional[Path] = None) -> FactSnapshot:
+    return FactSnapshot(root or SNAPSHOT_DIR)
+
+
+def describe(root: Path) -> Dict[str, Any]:
+    manifest = read_manifest(root)
+    partitions = manifest['partitions']
+    size = sum(path.stat().st_size for path in root.glob('month=*/*.npy'))
+    return {
+        'path': str(root.resolve()),
+        'partitions': len(partitions),
+        'first': min(partitions, default=None),
+        'last': max(partitions, default=None),
+        'open': [key for key, partition in partitions.items() if not partition['complete']],
+        'rows': sum(partition['rows'] for partition in partitions.values()),
+        'bytes': size
+    }
+
+
+def parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f'Invalid date: {value}') from exc
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Maintain the columnar Orders snapshot read by --source snapshot.')
+    parser.add_argument('--dir', type=Path, default=SNAPSHOT_DIR, help='Snapshot directory (default: REPORT_SNAPSHOT_DIR or .cache/order_facts).')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help='Write new and still-open month partitions.')
+    export_parser.add_argument('--from', dest='start_date', type=parse_date,
+                               help='Re-export every month from this one (YYYY-MM-DD), including closed ones.')
+    export_parser.add_argument('--to', dest='end_date', type=parse_date, help='Last month to re-export (YYYY-MM-DD).')
+    subparsers.add_parser('info', help='Summarize the partitions on disk.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == 'info':
+        print(json.dumps(describe(args.dir)))
+        return
+    conn = connect_db()
+    try:
+        print(json.dumps(export(conn, args.dir, args.start_date, args.end_date)))
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
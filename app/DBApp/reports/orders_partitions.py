@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Maintain the monthly range partitions of Orders and check that the admin report queries prune them."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from admin_loyalty_report_pdf import fetch_monthly_loyalty
+from admin_product_sales_report_pdf import fetch_monthly_product_sales
+from admin_productivity_report_pdf import fetch_sales_per_product
+from report_db import connect_db, report_backend
+from report_plans import DEFAULT_WINDOW, capture_statements, explain_cursor, mysql_plan
+from sales_rollup import month_start, next_month
+
+PARTITIONS_SQL = """
+    SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound, TABLE_ROWS AS row_estimate
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Orders' AND PARTITION_NAME IS NOT NULL
+    ORDER BY PARTITION_ORDINAL_POSITION
+"""
+
+CATCH_ALL = 'pmax'
+DEFAULT_AHEAD = 3
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# The Orders reads of each admin report; every one goes through fetch_sales.
+ADMIN_FETCHERS = (
+    ('admin loyalty', fetch_monthly_loyalty),
+    ('admin product sales', fetch_monthly_product_sales),
+    ('admin productivity', fetch_sales_per_product)
+)
+
+
+def partition_name(month: date) -> str:
+    return f'p{month:%Y%m}'
+
+
+def fetch_partitions(cursor) -> List[Dict[str, Any]]:
+    cursor.execute(PARTITIONS_SQL)
+    partitions = []
+    lower = None
+    for row in cursor.fetchall():
+        bound = row['bound'].strip("'")
+        upper = None if bound == 'MAXVALUE' else date.fromisoformat(bound)
+        partitions.append({'name': row['name'], 'from': lower, 'to': upper, 'rowEstimate': row['row_estimate']})
+        lower = upper
+    if not partitions:
+        raise SystemExit('Orders is not partitioned; run partitioning.sql first.')
+    if partitions[-1]['name'] != CATCH_ALL or partitions[-1]['to'] is not None:
+        raise SystemExit(f'The last Orders partition must be {CATCH_ALL} VALUES LESS THAN (MAXVALUE).')
+    return partitions
+
+
+def describe(partition: Dict[str, Any]) -> Dict[str, Any]:
+    # Bounds are [from, to); from is None for the first partition, to is None for the catch-all.
+    return {
+        'name': partition['name'],
+        'from': partition['from'].isoformat() if partition['from'] else None,
+        'to': partition['to'].isoformat() if partition['to'] else None,
+        'rowEstimate': partition['rowEstimate']
+    }
+
+
+def extend(conn, ahead: int, today: date, dry_run: bool) -> Dict[str, Any]:
+    cursor = explain_cursor(conn, 'mysql')
+    partitions = fetch_partitions(cursor)
+    bounded = [partition for partition in partitions if partition['to'] is not None]
+    month = bounded[-1]['to'] if bounded else month_start(today)
+    target = month_start(today)
+    for _ in range(ahead + 1):
+        target = next_month(target)
+    added = []
+    while month < target:
+        added.append((partition_name(month), next_month(month)))
+        month = next_month(month)
+    statements = []
+    if added:
+        # Splitting the empty catch-all is instant; it only moves the rows of orders dated past the last month.
+        definitions = ', '.join(f"PARTITION {name} VALUES LESS THAN ('{upper.isoformat()}')" for name, upper in added)
+        statements.append(f'ALTER TABLE Orders REORGANIZE PARTITION {CATCH_ALL} INTO '
+                          f'({definitions}, PARTITION {CATCH_ALL} VALUES LESS THAN (MAXVALUE))')
+    if not dry_run:
+        for statement in statements:
+            cursor.execute(statement)
+    cursor.close()
+    return {'added': [name for name, _ in added], 'until': target.isoformat(), 'dryRun': dry_run, 'statements': statements}
+
+
+def archive(conn, before: date, today: date, dry_run: bool) -> Dict[str, Any]:
+    cutoff = month_start(before)
+    if cutoff > month_start(today):
+        raise SystemExit('Only months before the current one can be archived.')
+    cursor = explain_cursor(conn, 'mysql')
+    archived = []
+    statements = []
+    for partition in fetch_partitions(cursor):
+        if partition['to'] is None or partition['to'] > cutoff:
+            break
+        table = f"OrdersArchive_{partition['name'][1:]}"
+        cursor.execute('SELECT COUNT(*) AS found FROM information_schema.TABLES '
+                       'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', (table,))
+        if cursor.fetchone()['found']:
+            raise SystemExit(f'{table} already exists; move it away before archiving {partition["name"]} again.')
+        # EXCHANGE swaps the month into a plain table without copying rows; DROP then removes the empty range.
+        # Neither fires the rollup triggers, so MonthlySalesRollup keeps the archived months' totals.
+        steps = [
+            f'CREATE TABLE {table} LIKE Orders',
+            f'ALTER TABLE {table} REMOVE PARTITIONING',
+            f"ALTER TABLE Orders EXCHANGE PARTITION {partition['name']} WITH TABLE {table}",
+            f"ALTER TABLE Orders DROP PARTITION {partition['name']}"
+        ]
+        statements.extend(steps)
+        rows = partition['rowEstimate']
+        if not dry_run:
+            for statement in steps:
+                cursor.execute(statement)
+            cursor.execute(f'SELECT COUNT(*) AS archived FROM {table}')
+            rows = cursor.fetchone()['archived']
+        archived.append({'partition': partition['name'], 'table': table, 'rows': rows})
+    cursor.close()
+    return {'before': cutoff.isoformat(), 'archived': archived, 'dryRun': dry_run, 'statements': statements}
+
+
+def expected_partitions(partitions: List[Dict[str, Any]], first: date, last: date) -> List[str]:
+    return [
+        partition['name'] for partition in partitions
+        if (partition['from'] is None or partition['from'] <= last) and (partition['to'] is None or partition['to'] > first)
+    ]
+
+
+def check_pruning(conn, start_date: str, end_date: str) -> Dict[str, Any]:
+    cursor = explain_cursor(conn, 'mysql')
+    partitions = fetch_partitions(cursor)
+    queries = []
+    for report, fetcher in ADMIN_FETCHERS:
+        for index, (sql, params) in enumerate(capture_statements(fetcher, start_date, end_date), start=1):
+            dates = sorted(date.fromisoformat(value) for value in params if isinstance(value, str) and DATE_PATTERN.fullmatch(value))
+            tables, _ = mysql_plan(cursor, sql, params)
+            for table in tables:
+                if table['table'] != 'Orders':
+                    continue
+                expected = expected_partitions(partitions, dates[0], dates[-1])
+                read = table['partitions'] or []
+                queries.append({
+                    'name': f'{report} #{index}',
+                    'window': [dates[0].isoformat(), dates[-1].isoformat()],
+                    'partitions': read,
+                    'expected': expected,
+                    'pruned': set(read) <= set(expected)
+                })
+    cursor.close()
+    return {
+        'window': [start_date, end_date],
+        'partitionCount': len(partitions),
+        'failures': sum(1 for query in queries if not query['pruned']),
+        'queries': queries
+    }
+
+
+def parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f'Invalid date: {value}') from exc
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Maintain the monthly Orders partitions created by partitioning.sql.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('status', help='List the partitions with their bounds and estimated rows.')
+    extend_parser = subparsers.add_parser('extend', help='Add monthly partitions ahead of the calendar.')
+    extend_parser.add_argument('--ahead', type=int, default=DEFAULT_AHEAD, help='Months past the current one to cover (default 3).')
+    extend_parser.add_argument('--dry-run', action='store_true', help='Print the DDL without running it.')
+    archive_parser = subparsers.add_parser('archive', help='Move whole months out of Orders into OrdersArchive_YYYYMM tables.')
+    archive_parser.add_argument('--before', type=parse_date, required=True, help='Archive every month that ends before this date (YYYY-MM-DD).')
+    archive_parser.add_argument('--dry-run', action='store_true', help='Print the DDL without running it.')
+    check = subparsers.add_parser('check', help='EXPLAIN the admin report queries and fail if one reads partitions outside its window.')
+    check.add_argument('--from', dest='start_date', default=DEFAULT_WINDOW[0], help='Window start (YYYY-MM-DD).')
+    check.add_argument('--to', dest='end_date', default=DEFAULT_WINDOW[1], help='Window end (YYYY-MM-DD).')
+    check.add_argument('--live', action='store_true', help='Check with the rollup off, so the whole window is read from Orders.')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if report_backend() != 'mysql':
+        raise SystemExit('Orders partitioning needs MySQL; unset REPORT_DB_BACKEND.')
+    if args.command == 'check' and args.live:
+        os.environ['REPORT_USE_ROLLUP'] = '0'
+    conn = connect_db()
+    try:
+        if args.command == 'status':
+            cursor = explain_cursor(conn, 'mysql')
+            result = {'partitions': [describe(partition) for partition in fetch_partitions(cursor)]}
+            cursor.close()
+        elif args.command == 'extend':
+            result = extend(conn, args.ahead, date.today(), args.dry_run)
+        elif args.command == 'archive':
+            result = archive(conn, args.before, date.today(), args.dry_run)
+        else:
+            result = check_pruning(conn, args.start_date, args.end_date)
+    finally:
+        conn.close()
+    print(json.dumps(result, indent=2))
+    if args.command == 'check':
+        sys.exit(1 if result['failures'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Benchmark the report pipeline: builder micro-benchmarks and end-to-end runs at several data scales."""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from report_db import BACKENDS, REPO_ROOT, sql_statements, table_statements
+from report_sqlite import build_database, connect_sqlite
+
+REPORT_SCRIPTS = (
+    'admin_loyalty_report_pdf',
+    'admin_product_sales_report_pdf',
+    'admin_productivity_report_pdf',
+    'farmer_orders_report_pdf',
+    'farmer_report_pdf'
+)
+FARMER_SCRIPTS = ('farmer_orders_report_pdf', 'farmer_report_pdf')
+
+GENERATOR = REPO_ROOT / 'generate_dummy.py'
+
+DEFAULT_SPAN = (date(2024, 6, 1), date(2025, 11, 30))
+
+
+def time_report(script: str, argv: List[str], conn, repeat: int) -> Dict[str, Any]:
+    module = importlib.import_module(script)
+    runs = [module.run(argv, conn=conn)['timings'] for _ in range(repeat)]
+    best = min(runs, key=lambda timings: timings['wallSeconds'])
+    return {
+        'best': best['wallSeconds'],
+        'median': round(statistics.median(timings['wallSeconds'] for timings in runs), 6),
+        'cpu': best['cpuSeconds'],
+        'phases': {name: phase['wallSeconds'] for name, phase in best['phases'].items()},
+        'rows': best['rows']
+    }
+
+
+def time_callable(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return {'best': round(min(samples), 6), 'median': round(statistics.median(samples), 6)}
+
+
+def month_starts(count: int) -> List[str]:
+    months = []
+    current = date(2024, 1, 1)
+    for _ in range(count):
+        months.append(current.isoformat())
+        current = (current + timedelta(days=32)).replace(day=1)
+    return months
+
+
+def synthetic_sales_rows(rng: random.Random, size: int, months: List[str], products: int, farms: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            'month_start': rng.choice(months),
+            'farm_id': rng.randint(1, farms),
+            'product_id': product_id,
+            'product_name': f'Product {product_id}',
+            'product_type': f'Type {product_id % 8}',
+            'grade': 'SR',
+            'total_quantity': rng.randint(1, 500),
+            'total_revenue': round(rng.uniform(10, 50000), 2),
+            'orders_count': rng.randint(1, 40),
+            'points_earned': rng.randint(0, 400),
+            'points_redeemed': rng.randint(0, 100)
+        }
+        for product_id in (rng.randint(1, products) for _ in range(size))
+    ]
+
+
+def micro_productivity(rng: random.Random, size: int) -> Callable[[], Any]:
+    from admin_productivity_report_pdf import build_product_dataset
+    months = month_starts(24)
+    farms = max(10, size // 500)
+    products = 60
+    product_rows = [
+        {'product_id': product_id, 'product_name': f'Product {product_id}', 'product_type': f'Type {product_id % 8}',
+         'grade': 'SR', 'farm_id': farm_id, 'population': rng.randint(50, 100), 'farm_name': f'Farm {farm_id}'}
+        for farm_id in range(1, farms + 1)
+        for product_id in rng.sample(range(1, products + 1), 3)
+    ]
+    inventory_rows = [
+        {'product_id': row['product_id'], 'farm_id': row['farm_id'], 'month_start': rng.choice(months),
+         'total_quantity': rng.randint(10, 500)}
+        for row in (rng.choice(product_rows) for _ in range(size // 2))
+    ]
+    sales_rows = synthetic_sales_rows(rng, size // 2, months, products, farms)
+    return lambda: build_product_dataset(product_rows, inventory_rows, sales_rows, months)
+
+
+def micro_sales(rng: random.Random, size: int) -> Callable[[], Any]:
+    from admin_product_sales_report_pdf import build_sales_dataset
+    months = month_starts(24)
+    rows = synthetic_sales_rows(rng, size, months, 60, max(10, size // 500))
+    return lambda: build_sales_dataset(rows, months)
+
+
+def micro_farmer(rng: random.Random, size: int) -> Callable[[], Any]:
+    from farmer_report_pdf import build_report
+    products = 30
+    offerings = [
+        {'product_id': product_id, 'product_name': f'Product {product_id}', 'product_type': f'Type {product_id % 8}', 'grade': 'SR'}
+        for product_id in range(1, products + 1)
+    ]
+    statuses = ('ACTIVE', 'ACTIVE', 'CANCELLED', 'AWAITING_QUOTE', 'QUOTED')
+    subscriptions = [
+        {
+            'programId': index,
+            'productId': product_id,
+            'farmId': 1,
+            'clientId': rng.randint(1, max(10, size // 10)),
+            'clientName': f'Client {index % 997}',
+            'companyName': None,
+            'startDate': '2025-01-01',
+            'quantity': rng.randint(1, 5),
+            'intervalDays': rng.choice((7, 14, 30)),
+            'price': round(rng.uniform(80, 250), 2),
+            'status': rng.choice(statuses),
+            'productName': f'Product {product_id}',
+            'productType': f'Type {product_id % 8}',
+            'grade': 'SR'
+        }
+        for index, product_id in enumerate((rng.randint(1, products) for _ in range(size)), start=1)
+    ]
+    lookup = {product_id: {'avgPrice': round(rng.uniform(2, 20), 2), 'availableUnits': rng.randint(0, 900)}
+              for product_id in range(1, products + 1)}
+    farm = {'farmId': 1, 'name': 'Farm 1'}
+    filters = {'startDateFrom': '2025-01-01', 'startDateTo': '2025-12-31'}
+    return lambda: build_report(farm, filters, offerings, subscriptions, lookup)
+
+
+def micro_orders(rng: random.Random, size: int) -> Callable[[], Any]:
+    from farmer_orders_report_pdf import build_monthly_dataset
+    months = month_starts(24)
+    rows = synthetic_sales_rows(rng, size, months, 60, 1)
+    products = [
+        {'product_id': product_id, 'product_name': f'Product {product_id}', 'product_type': f'Type {product_id % 8}', 'grade': 'SR'}
+        for product_id in range(1, 61)
+    ]
+    return lambda: build_monthly_dataset(products, rows, months)
+
+
+MICRO_BENCHMARKS = {
+    'build_product_dataset': micro_productivity,
+    'build_sales_dataset': micro_sales,
+    'build_report': micro_farmer,
+    'build_monthly_dataset': micro_orders
+}
+
+
+def run_micro(sizes: Sequence[int], repeat: int, names: Sequence[str]) -> List[Dict[str, Any]]:
+    results = []
+    for name in names:
+        for size in sizes:
+            func = MICRO_BENCHMARKS[name](random.Random(size), size)
+            timing = time_callable(func, repeat)
+            results.append({
+                'name': name,
+                'size': size,
+                'repeat': repeat,
+                **timing,
+                'rowsPerSecond': round(size / timing['best']) if timing['best'] else None
+            })
+    return results
+
+
+def generate_dataset(scale: int, span: Tuple[date, date], directory: Path) -> Dict[str, int]:
+    completed = subprocess.run(
+        [sys.executable, str(GENERATOR), '--scale', str(scale), '--format', 'tsv', '-o', str(directory),
+         '--start', span[0].isoformat(), '--end', span[1].isoformat()],
+        check=True, capture_output=True, text=True
+    )
+    counts = {}
+    for part in completed.stderr.splitlines()[0].split(', '):
+        table, count = part.split(': ')
+        counts[table] = int(count)
+    return counts
+
+
+def load_dataset(conn, directory: Path):
+    from sales_rollup import rebuild
+    cursor = conn.cursor()
+    cursor.execute('SET FOREIGN_KEY_CHECKS = 0')
+    for statement in table_statements():
+        cursor.execute(statement)
+    for statement in sql_statements((directory / 'load.sql').read_text(encoding='utf-8')):
+        if statement.startswith('LOAD DATA'):
+            cursor.execute(statement)
+    cursor.execute('SET FOREIGN_KEY_CHECKS = 1')
+    conn.commit()
+    cursor.close()
+    rebuild(conn, None, None)
+
+
+def connect_bench(database: str):
+    import mysql.connector
+    from report_db import load_db_config
+    params = {**load_db_config(), 'database': None}
+    try:
+        conn = mysql.connector.connect(allow_local_infile=True, consume_results=True, **params)
+    except mysql.connector.Error as exc:
+        raise SystemExit(f"Unable to connect to the database: {exc}") from exc
+    cursor = conn.cursor()
+    cursor.execute(f'CREATE DATABASE IF NOT EXISTS `{database}`')
+    cursor.execute(f'USE `{database}`')
+    cursor.close()
+    return conn
+
+
+def report_windows(span: Tuple[date, date]) -> Dict[str, Tuple[str, str]]:
+    first_month_end = (span[0].replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return {
+        'short': (span[0].isoformat(), first_month_end.isoformat()),
+        'long': (span[0].isoformat(), span[1].isoformat())
+    }
+
+
+def run_e2e(scales: Sequence[int], backend: str, database: str, repeat: int, scripts: Sequence[str],
+            span: Tuple[date, date]) -> List[Dict[str, Any]]:
+    results = []
+    conn = connect_bench(database) if backend == 'mysql' else None
+    try:
+        with tempfile.TemporaryDirectory(prefix='kfp-bench-') as temp_dir:
+            for scale in scales:
+                started = time.perf_counter()
+                if backend == 'sqlite':
+                    if conn is not None:
+                        conn.close()
+                    path = Path(temp_dir) / f'scale-{scale}.sqlite'
+                    counts = build_database(path, ['--scale', str(scale), '--start', span[0].isoformat(), '--end', span[1].isoformat()])['tables']
+                    conn = connect_sqlite(path)
+                else:
+                    data_dir = Path(temp_dir) / f'scale-{scale}'
+                    counts = generate_dataset(scale, span, data_dir)
+                    load_dataset(conn, data_dir)
+                load_seconds = round(time.perf_counter() - started, 3)
+                for window, (start, end) in report_windows(span).items():
+                    for script in scripts:
+                        argv = ['--from', start, '--to', end, '--no-cache', '--output', str(Path(temp_dir) / f'{script}.pdf')]
+                        if script in FARMER_SCRIPTS:
+                            argv += ['--farm-id', '1']
+                        results.append({
+                            'backend': backend,
+                            'scale': scale,
+                            'orders': counts.get('Orders', 0),
+                            'loadSeconds': load_seconds,
+                            'script': script,
+                            'window': window,
+                            'from': start,
+                            'to': end,
+                            'repeat': repeat,
+                            **time_report(script, argv, conn, repeat)
+                        })
+    finally:
+        if conn is not None:
+            conn.close()
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                   check=True, capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip()
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        'createdAt': datetime.utcnow().isoformat() + 'Z',
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+
+def result_key(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    if 'script' in record:
+        return ('e2e', record.get('backend', 'mysql'), record['scale'], record['script'], record['window'])
+    return ('micro', record['name'], record['size'])
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    previous = {result_key(record): record for section in ('micro', 'e2e') for record in baseline.get(section, [])}
+    rows = []
+    for section in ('micro', 'e2e'):
+        for record in current.get(section, []):
+            before = previous.get(result_key(record))
+            if not before or not before['best']:
+                continue
+            ratio = record['best'] / before['best']
+            rows.append({
+                'benchmark': ' '.join(str(part) for part in result_key(record)),
+                'baseline': before['best'],
+                'current': record['best'],
+                'ratio': round(ratio, 3),
+                'regressed': ratio > 1 + threshold
+            })
+    return {'threshold': threshold, 'regressions': sum(row['regressed'] for row in rows), 'results': rows}
+
+
+def parse_list(value: str) -> List[int]:
+    try:
+        numbers = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f'Invalid list: {value}') from exc
+    if not numbers or min(numbers) < 1:
+        raise argparse.ArgumentTypeError(f'Invalid list: {value}')
+    return numbers
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmark the report pipeline.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    micro = subparsers.add_parser('micro', help='Time the dataset builders on synthetic rows (CPU only, no database).')
+    micro.add_argument('--sizes', type=parse_list, default=[1000, 10000, 100000], help='Comma-separated row counts.')
+    micro.add_argument('--repeat', type=int, default=5)
+    micro.add_argument('--only', choices=sorted(MICRO_BENCHMARKS), action='append', help='Run only these builders.')
+    micro.add_argument('-o', '--output', type=Path, help='Write the results JSON here as well as to stdout.')
+
+    e2e = subparsers.add_parser('e2e', help='Generate, load and report on datasets at several scales.')
+    e2e.add_argument('--scales', type=parse_list, default=[1, 10], help='Comma-separated generate_dummy.py --scale values.')
+    e2e.add_argument('--backend', choices=BACKENDS, default='mysql',
+                     help='mysql loads each scale into --database; sqlite builds a temporary embedded database and needs no server.')
+    e2e.add_argument('--database', help='Scratch database to (re)create the tables in. Defaults to <configured db>_bench.')
+    e2e.add_argument('--repeat', type=int, default=3)
+    e2e.add_argument('--only', choices=REPORT_SCRIPTS, action='append', help='Run only these report scripts.')
+    e2e.add_argument('-o', '--output', type=Path, help='Write the results JSON here as well as to stdout.')
+
+    comparison = subparsers.add_parser('compare', help='Compare a results file against a baseline.')
+    comparison.add_argument('baseline', type=Path)
+    comparison.add_argument('current', type=Path)
+    comparison.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown before flagging (0.10 = 10%%).')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.command == 'compare':
+        report = compare(json.loads(args.baseline.read_text()), json.loads(args.current.read_text()), args.threshold)
+        print(json.dumps(report, indent=2))
+        sys.exit(1 if report['regressions'] else 0)
+    results: Dict[str, Any] = {'environment': environment()}
+    if args.command == 'micro':
+        results['micro'] = run_micro(args.sizes, args.repeat, args.only or list(MICRO_BENCHMARKS))
+    else:
+        database = args.database
+        if args.backend == 'mysql' and not database:
+            from report_db import load_db_config
+            database = f"{load_db_config()['database']}_bench"
+        results['e2e'] = run_e2e(args.scales, args.backend, database, args.repeat, args.only or list(REPORT_SCRIPTS), DEFAULT_SPAN)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
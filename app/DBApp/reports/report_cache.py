@@ -0,0 +1,120 @@
+"""Reuse rendered reports while their inputs and the underlying data are unchanged."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Kept outside frontend/ so the static server never exposes cache entries.
+CACHE_DIR = Path(os.environ.get('REPORT_CACHE_DIR') or Path(__file__).resolve().parent / '.cache')
+
+# Bump when a change to the scripts alters the PDFs they render.
+CACHE_VERSION = 1
+
+# Primary key per table: COUNT(*) and MAX(pk) catch inserts from an index-only scan.
+WATERMARK_KEYS: Dict[str, str] = {
+    'Orders': 'order_id',
+    'Inventory': 'batch_id',
+    'Subscription': 'program_id',
+    'FarmProduct': 'farm_id',
+    'RawProduct': 'product_id',
+    'Farm': 'farm_id',
+    'Client': 'client_id'
+}
+
+# Tables whose rows change in place; the rollups.sql triggers count their updates and deletes
+# in ReportDataVersion, so the watermark needs no scan of the rows themselves.
+VERSIONED_TABLES = ('Orders', 'Inventory', 'Subscription', 'FarmProduct')
+
+VERSION_SQL = "(SELECT IFNULL(SUM(version), 0) FROM ReportDataVersion WHERE table_name = '{table}')"
+
+
+def cache_enabled() -> bool:
+    return os.environ.get('REPORT_CACHE', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def fetch_watermark(cursor, tables: Iterable[str]) -> Dict[str, Any]:
+    selects = []
+    for table in tables:
+        columns = ['COUNT(*)', f'MAX({WATERMARK_KEYS[table]})']
+        if table in VERSIONED_TABLES:
+            columns.append(VERSION_SQL.format(table=table))
+        selects.append(f"SELECT '{table}' AS table_name, CONCAT_WS(':', {', '.join(columns)}) AS mark FROM {table}")
+    cursor.execute(' UNION ALL '.join(selects))
+    return {row['table_name']: row['mark'] for row in cursor.fetchall()}
+
+
+def cache_key(report: str, params: Dict[str, Any], watermark: Dict[str, Any]) -> str:
+    payload = json.dumps({
+        'version': CACHE_VERSION,
+        'report': report,
+        'params': params,
+        'watermark': watermark
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def entry_path(key: str) -> Path:
+    return CACHE_DIR / f'{key}.json'
+
+
+def lookup(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        entry = json.loads(entry_path(key).read_text())
+    except (OSError, ValueError):
+        return None
+    try:
+        stats = Path(entry['path']).stat()
+    except (KeyError, OSError):
+        return None
+    # The PDF may have been re-rendered for a newer watermark under the same name.
+    if stats.st_size != entry.get('size') or stats.st_mtime_ns != entry.get('mtimeNs'):
+        return None
+    return {
+        'path': entry['path'],
+        'publicUrl': entry['publicUrl'],
+        'cache': {'status': 'hit', 'key': key}
+    }
+
+
+def store(key: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    stats = Path(result['path']).stat()
+    entry = {
+        'path': result['path'],
+        'publicUrl': result['publicUrl'],
+        'size': stats.st_size,
+        'mtimeNs': stats.st_mtime_ns
+    }
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    target = entry_path(key)
+    temp = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+    temp.write_text(json.dumps(entry))
+    os.replace(temp, target)
+    return {**result, 'cache': {'status': 'miss', 'key': key}}
+
+
+def check(cursor, report: str, params: Dict[str, Any], tables: Iterable[str], enabled: bool = True,
+          extra: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    return check_many(cursor, report, [params], tables, enabled, extra)[0]
+
+
+# Fan-out runs share one watermark query across every parameter set. extra carries the
+# watermark of inputs that are not tables, such as the order snapshot's manifest.
+def check_many(cursor, report: str, params_list: Sequence[Dict[str, Any]], tables: Iterable[str],
+               enabled: bool = True, extra: Optional[Dict[str, Any]] = None) -> List[Tuple[Optional[str], Optional[Dict[str, Any]]]]:
+    if not enabled or not cache_enabled():
+        return [(None, None) for _ in params_list]
+    tables = tuple(tables)
+    watermark = fetch_watermark(cursor, tables) if tables else {}
+    watermark.update(extra or {})
+    keys = [cache_key(report, params, watermark) for params in params_list]
+    return [(key, lookup(key)) for key in keys]
+
+
+def finish(key: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+    if key is None:
+        return {**result, 'cache': {'status': 'bypass'}}
+    return store(key, result)
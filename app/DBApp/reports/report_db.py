@@ -0,0 +1,379 @@
+"""Shared, pooled database access for the report scripts."""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import mysql.connector
+except ImportError:  # REPORT_DB_BACKEND=sqlite needs only the standard library.
+    mysql = None
+
+CONFIG_PATH = Path(__file__).resolve().parents[1] / 'config' / 'database.json'
+REPO_ROOT = Path(__file__).resolve().parents[3]
+SCHEMA_FILE = REPO_ROOT / 'schema.sql'
+ROLLUP_FILE = REPO_ROOT / 'rollups.sql'
+INDEX_FILE = REPO_ROOT / 'indexes.sql'
+BACKENDS = ('mysql', 'sqlite')
+DEFAULT_SQLITE_PATH = Path(__file__).resolve().parent / '.cache' / 'reports.sqlite'
+
+DEFAULT_POOL_CONFIG = {
+    'size': 4,
+    'checkoutTimeoutSeconds': 10,
+    'healthCheck': 'ping',
+    'healthCheckIntervalSeconds': 30,
+    'preparedStatements': True,
+    # Per connection. in_clause gives each IN-list length its own SQL text, so the cache must be bounded
+    # to stay clear of the server's max_prepared_stmt_count.
+    'statementCacheSize': 64
+}
+
+_config: Optional[Dict[str, Any]] = None
+_pool: Optional['ConnectionPool'] = None
+_pool_lock = threading.Lock()
+
+
+def read_config_file() -> Dict[str, Any]:
+    global _config
+    if _config is None:
+        if not CONFIG_PATH.exists():
+            raise SystemExit(f'Missing database config at {CONFIG_PATH}')
+        _config = json.loads(CONFIG_PATH.read_text())
+    return _config
+
+
+def load_db_config() -> Dict[str, Any]:
+    connection = read_config_file().get('connection', {})
+    return {
+        'host': connection.get('host', '127.0.0.1'),
+        'port': connection.get('port', 3306),
+        'user': connection.get('user', 'root'),
+        'password': connection.get('password', ''),
+        'database': connection.get('database')
+    }
+
+
+def env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ('0', 'false', 'no', 'off', '')
+
+
+def load_pool_config() -> Dict[str, Any]:
+    config = dict(DEFAULT_POOL_CONFIG)
+    config.update(read_config_file().get('reportPool') or {})
+    if os.environ.get('REPORT_DB_POOL_SIZE'):
+        config['size'] = int(os.environ['REPORT_DB_POOL_SIZE'])
+    if os.environ.get('REPORT_DB_HEALTH_CHECK'):
+        config['healthCheck'] = os.environ['REPORT_DB_HEALTH_CHECK']
+    config['preparedStatements'] = env_flag('REPORT_DB_PREPARED', bool(config['preparedStatements']))
+    config['size'] = max(1, int(config['size']))
+    config['statementCacheSize'] = max(1, int(config['statementCacheSize']))
+    return config
+
+
+def report_backend() -> str:
+    backend = (os.environ.get('REPORT_DB_BACKEND') or 'mysql').strip().lower()
+    if backend not in BACKENDS:
+        raise SystemExit(f"Unknown REPORT_DB_BACKEND {backend!r}; expected one of {', '.join(BACKENDS)}.")
+    return backend
+
+
+def sqlite_path() -> Path:
+    return Path(os.environ.get('REPORT_SQLITE_PATH') or DEFAULT_SQLITE_PATH)
+
+
+def sql_statements(text: str) -> Iterator[str]:
+    for statement in text.split(';'):
+        lines = [line for line in statement.splitlines() if line.strip() and not line.strip().startswith('--')]
+        if lines:
+            yield '\n'.join(lines)
+
+
+def table_statements() -> List[str]:
+    """DROP/CREATE TABLE statements for schema.sql plus the rollups.sql tables and the report indexes, in MySQL syntax.
+
+    Tables only: the Orders triggers would reject historical generated data, and the
+    rollup is rebuilt in one pass after loading instead of row by row.
+    """
+    statements = [
+        statement for statement in sql_statements(SCHEMA_FILE.read_text(encoding='utf-8'))
+        if not re.match(r'\s*(CREATE SCHEMA|USE)\b', statement, re.I)
+    ]
+    rollups = ROLLUP_FILE.read_text(encoding='utf-8')
+    for table in ('MonthlySalesRollup', 'ReportDataVersion'):
+        create = re.search(rf'CREATE TABLE (?:IF NOT EXISTS )?{table}\b.*?\) ENGINE=InnoDB', rollups, re.S)
+        statements.append(f'DROP TABLE IF EXISTS {table}')
+        statements.append(create.group(0))
+    statements.extend(index_statements())
+    return statements
+
+
+def index_statements() -> List[str]:
+    """CREATE INDEX statements for the indexes.sql migration, for freshly created tables."""
+    return [
+        f'CREATE INDEX {name} ON {table} ({columns})'
+        for table, name, columns in re.findall(r'ALTER TABLE (\w+) ADD INDEX (\w+) \(([^)]*)\)',
+                                               INDEX_FILE.read_text(encoding='utf-8'))
+    ]
+
+
+def in_clause(column: str, values: Optional[Sequence[Any]]) -> Tuple[str, List[Any]]:
+    """SQL condition limiting column to values; None means no limit."""
+    if values is None:
+        return '1 = 1', []
+    if not values:
+        return '1 = 0', []
+    return f"{column} IN ({', '.join(['%s'] * len(values))})", list(values)
+
+
+def stream_rows(cursor, operation: str, params: Sequence[Any] = ()) -> Iterator[Dict[str, Any]]:
+    """Yield rows one at a time from the unbuffered cursor instead of materializing them.
+
+    The query runs on first iteration. Consume the rows before the next query on the
+    same connection; anything left unread is discarded by consume_results.
+    """
+    cursor.execute(operation, tuple(params))
+    yield from cursor
+
+
+def decode_value(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    return value
+
+
+class StatementCursor:
+    """Dictionary cursor that runs each distinct SQL text through a cached prepared statement."""
+
+    def __init__(self, lease: 'PooledConnection'):
+        self._lease = lease
+        self._active = None
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._active.column_names) if self._active is not None else []
+
+    def execute(self, operation: str, params: Any = ()):
+        operation, statement = self._lease.statement(operation)
+        self._active = statement
+        # Passing the cached string object keeps mysql.connector from re-preparing it.
+        statement.execute(operation, tuple(params or ()))
+
+    def _to_dict(self, row) -> Dict[str, Any]:
+        return {name: decode_value(value) for name, value in zip(self._active.column_names, row)}
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        row = self._active.fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return [self._to_dict(row) for row in self._active.fetchall()]
+
+    def __iter__(self):
+        row = self.fetchone()
+        while row is not None:
+            yield row
+            row = self.fetchone()
+
+    def close(self):
+        # Prepared statements belong to the connection and are reused by later cursors.
+        self._active = None
+
+
+class PooledConnection:
+    """Checked-out connection; close() hands it back to the pool instead of disconnecting."""
+
+    def __init__(self, pool: 'ConnectionPool', raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name: str):
+        return getattr(self._raw, name)
+
+    def statement(self, operation: str):
+        cache = self._pool.statements_for(self._raw)
+        entry = cache.get(operation)
+        if entry is not None:
+            cache.move_to_end(operation)
+            return entry
+        while len(cache) >= self._pool.statement_cache_size:
+            # Closing the cursor deallocates its statement on the server.
+            _, (_, evicted) = cache.popitem(last=False)
+            try:
+                evicted.close()
+            except mysql.connector.Error:
+                pass
+        entry = (operation, self._raw.cursor(prepared=True))
+        cache[operation] = entry
+        return entry
+
+    def cursor(self, *args, **kwargs):
+        if self._pool.prepared and kwargs.get('dictionary') and not args and set(kwargs) == {'dictionary'}:
+            return StatementCursor(self)
+        return self._raw.cursor(*args, **kwargs)
+
+    def close(self):
+        if self._raw is not None:
+            self._pool.release(self._raw)
+            self._raw = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, params: Dict[str, Any], config: Dict[str, Any]):
+        self.params = params
+        self.size = config['size']
+        self.checkout_timeout = float(config['checkoutTimeoutSeconds'])
+        self.health_check = str(config['healthCheck']).lower()
+        self.health_interval = float(config['healthCheckIntervalSeconds'])
+        self.prepared = bool(config['preparedStatements'])
+        self.statement_cache_size = int(config['statementCacheSize'])
+        self._idle: List[Any] = []
+        self._last_used: Dict[int, float] = {}
+        self._statements: Dict[int, 'OrderedDict[str, Any]'] = {}
+        self._leases: Dict[int, PooledConnection] = {}
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        try:
+            return mysql.connector.connect(consume_results=True, **self.params)
+        except mysql.connector.Error as exc:
+            raise SystemExit(f"Unable to connect to the database: {exc}") from exc
+
+    def _discard(self, raw):
+        self._statements.pop(id(raw), None)
+        self._last_used.pop(id(raw), None)
+        try:
+            raw.close()
+        except mysql.connector.Error:
+            pass
+
+    def _is_healthy(self, raw) -> bool:
+        if self.health_check == 'none':
+            return True
+        if time.monotonic() - self._last_used.get(id(raw), 0.0) < self.health_interval:
+            return True
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def checkout(self) -> PooledConnection:
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._cond:
+            while True:
+                while self._idle:
+                    raw = self._idle.pop()
+                    if self._is_healthy(raw):
+                        return self._lease(raw)
+                    self._discard(raw)
+                    self._open -= 1
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SystemExit('Timed out waiting for a database connection.')
+                self._cond.wait(remaining)
+        try:
+            raw = self._connect()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            return self._lease(raw)
+
+    def _lease(self, raw) -> PooledConnection:
+        lease = PooledConnection(self, raw)
+        self._leases[id(raw)] = lease
+        return lease
+
+    def release(self, raw):
+        # End the lease's transaction: a REPEATABLE READ snapshot left open would serve the next checkout
+        # stale rows and hold metadata locks that block partition maintenance.
+        reusable = raw.is_connected()
+        if reusable:
+            try:
+                raw.rollback()
+            except mysql.connector.Error:
+                reusable = False
+        with self._cond:
+            self._leases.pop(id(raw), None)
+            if reusable:
+                self._last_used[id(raw)] = time.monotonic()
+                self._idle.append(raw)
+            else:
+                self._discard(raw)
+                self._open -= 1
+            self._cond.notify()
+
+    def statements_for(self, raw) -> 'OrderedDict[str, Any]':
+        return self._statements.setdefault(id(raw), OrderedDict())
+
+    def reclaim(self) -> int:
+        """Check in every connection still leased, ending its transaction; returns how many there were."""
+        with self._cond:
+            leases = list(self._leases.values())
+        for lease in leases:
+            lease.close()
+        return len(leases)
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop())
+                self._open -= 1
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if mysql is None:
+                raise SystemExit('mysql-connector-python is not installed; install it or set REPORT_DB_BACKEND=sqlite.')
+            params = load_db_config()
+            if not params['database']:
+                raise SystemExit('Database name is missing from config.')
+            _pool = ConnectionPool(params, load_pool_config())
+        return _pool
+
+
+def connect_db():
+    if report_backend() == 'sqlite':
+        # Opening an embedded database is cheap enough that it needs no pool.
+        from report_sqlite import connect_sqlite
+        return connect_sqlite(sqlite_path())
+    return get_pool().checkout()
+
+
+def reclaim_connections() -> int:
+    """Check in connections a finished request left open, so none carries its transaction into the next one."""
+    with _pool_lock:
+        pool = _pool
+    return pool.reclaim() if pool is not None else 0
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
@@ -0,0 +1,113 @@
+"""Output handling shared by the report scripts: rendered PDFs or data-only JSON/CSV."""
+
+from __future__ import annotations
+
+import csv
+import importlib
+import math
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from pypdf import PdfWriter
+except ImportError:  # optional: without it every report renders in a single process
+    PdfWriter = None
+
+OUTPUT_FORMATS = ('pdf', 'json', 'csv')
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+# json/csv runs never touch these, so they never pay for importing matplotlib.
+pyplot = LazyModule('matplotlib.pyplot')
+
+
+def open_pdf(path: Path):
+    from matplotlib.backends.backend_pdf import PdfPages
+    return PdfPages(path)
+
+
+def render_workers(requested: Optional[int] = None) -> int:
+    if requested is None:
+        requested = int(os.environ.get('REPORT_RENDER_WORKERS') or min(4, os.cpu_count() or 1))
+    return max(1, requested)
+
+
+def pdf_merge_available() -> bool:
+    return PdfWriter is not None
+
+
+def merge_pdfs(fragments: Iterable[Path], output_path: Path):
+    writer = PdfWriter()
+    for fragment in fragments:
+        writer.append(str(fragment))
+    temp = output_path.with_name(f'{output_path.name}.{os.getpid()}.tmp')
+    with temp.open('wb') as handle:
+        writer.write(handle)
+    os.replace(temp, output_path)
+
+
+def preload_pdf_backend():
+    importlib.import_module('matplotlib.pyplot')
+    importlib.import_module('matplotlib.backends.backend_pdf')
+
+
+def to_jsonable(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):
+        # numpy arrays and scalars
+        return to_jsonable(value.tolist())
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def csv_columns(rows: Iterable[Dict[str, Any]]) -> List[str]:
+    columns: Dict[str, None] = {}
+    for row in rows:
+        for key, value in row.items():
+            if not isinstance(value, (dict, list, tuple, set)):
+                columns.setdefault(key)
+    return list(columns)
+
+
+def write_csv(path: Path, rows: List[Dict[str, Any]]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    columns = csv_columns(rows)
+    with path.open('w', newline='') as handle:
+        writer = csv.DictWriter(handle, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({column: to_jsonable(row.get(column)) for column in columns})
+
+
+def emit_data(output_format: str, data: Dict[str, Any], rows: List[Dict[str, Any]], csv_path: Path) -> Dict[str, Any]:
+    if output_format == 'json':
+        return {'format': 'json', 'data': to_jsonable(data)}
+    write_csv(csv_path, rows)
+    return {
+        'format': 'csv',
+        'path': str(csv_path.resolve()),
+        'publicUrl': f"/reports/{csv_path.name}"
+    }
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Check the query plans of the report fetchers for full scans and filesorts."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import farmer_orders_report_pdf
+import farmer_report_pdf
+from admin_productivity_report_pdf import fetch_inventory_per_product, fetch_product_farms
+from report_db import connect_db, report_backend
+from sales_rollup import fetch_sales_rollup
+
+# Tables that grow with the order history; scanning any of them in full is a finding.
+LARGE_TABLES = ('Orders', 'Inventory', 'Subscription', 'MonthlySalesRollup')
+
+# Partial months at both ends, so the rollup query and both live edges are planned.
+DEFAULT_WINDOW = ('2024-07-10', '2025-10-20')
+
+FILESORT = 'filesort'
+TEMPORARY = 'temporary table'
+
+# Fetcher calls as the reports make them, and the findings each one is expected to have:
+# sorting by a joined name column needs a filesort, and grouping by a computed month a temporary table.
+PLAN_CASES: List[Tuple[str, Callable[..., Any], Tuple[str, ...]]] = [
+    ('sales (all farms)', lambda cursor, window, farm_ids, product_id: fetch_sales_rollup(cursor, *window), (TEMPORARY,)),
+    ('sales (one farm)', lambda cursor, window, farm_ids, product_id: fetch_sales_rollup(cursor, *window, farm_ids=farm_ids), (TEMPORARY,)),
+    ('productivity product farms', lambda cursor, window, farm_ids, product_id: fetch_product_farms(cursor), ()),
+    ('productivity inventory', lambda cursor, window, farm_ids, product_id: fetch_inventory_per_product(cursor, *window), (TEMPORARY,)),
+    ('farmer orders farms', lambda cursor, window, farm_ids, product_id: farmer_orders_report_pdf.fetch_farms(cursor, farm_ids), ()),
+    ('farmer farms (fan-out)', lambda cursor, window, farm_ids, product_id: farmer_report_pdf.fetch_farms(cursor, None), ()),
+    ('farmer offerings', lambda cursor, window, farm_ids, product_id: farmer_report_pdf.fetch_offerings(cursor, farm_ids), (FILESORT,)),
+    ('farmer inventory', lambda cursor, window, farm_ids, product_id: farmer_report_pdf.fetch_inventory(cursor, farm_ids, None), ()),
+    ('farmer inventory (product)', lambda cursor, window, farm_ids, product_id: farmer_report_pdf.fetch_inventory(cursor, farm_ids, product_id), ()),
+    ('farmer subscriptions', lambda cursor, window, farm_ids, product_id: farmer_report_pdf.fetch_subscriptions(cursor, farm_ids, *window, None),
+     (FILESORT,))
+]
+
+ALIAS_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)\s+AS\s+(\w+)', re.I)
+SQLITE_SCAN_PATTERN = re.compile(r'^(SCAN|SEARCH) (?:TABLE )?(\w+)(?: AS (\w+))?(?: USING (?:COVERING |INTEGER PRIMARY KEY)?(?:INDEX (\w+))?)?')
+
+
+class RecordingCursor:
+    """Cursor stand-in that records the statements a fetcher issues and returns no rows."""
+
+    def __init__(self):
+        self.statements: List[Tuple[str, Tuple[Any, ...]]] = []
+
+    def execute(self, operation: str, params: Any = ()):
+        self.statements.append((operation, tuple(params or ())))
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self) -> List[Any]:
+        return []
+
+    def __iter__(self):
+        return iter(())
+
+    def close(self):
+        pass
+
+
+def capture_statements(call: Callable[..., Any], *args: Any) -> List[Tuple[str, Tuple[Any, ...]]]:
+    cursor = RecordingCursor()
+    result = call(cursor, *args)
+    # Streaming fetchers only run their SQL once drained.
+    if not isinstance(result, (dict, list)):
+        for _ in result:
+            pass
+    return cursor.statements
+
+
+def table_aliases(sql: str) -> Dict[str, str]:
+    return {alias: table for table, alias in ALIAS_PATTERN.findall(sql)}
+
+
+def mysql_plan(cursor, sql: str, params: Sequence[Any]) -> Tuple[List[Dict[str, Any]], Set[str]]:
+    cursor.execute(f'EXPLAIN FORMAT=JSON {sql}', params)
+    row = cursor.fetchone()
+    plan = json.loads(next(iter(row.values())) if isinstance(row, dict) else row[0])
+    aliases = table_aliases(sql)
+    tables: List[Dict[str, Any]] = []
+    flags: Set[str] = set()
+
+    def walk(node: Any):
+        if isinstance(node, list):
+            for item in node:
+                walk(item)
+            return
+        if not isinstance(node, dict):
+            return
+        if node.get('using_filesort'):
+            flags.add(FILESORT)
+        if node.get('using_temporary_table'):
+            flags.add(TEMPORARY)
+        table = node.get('table')
+        if isinstance(table, dict) and 'access_type' in table:
+            tables.append({
+                'table': aliases.get(table.get('table_name'), table.get('table_name')),
+                'access': table['access_type'],
+                'key': table.get('key'),
+                'rows': table.get('rows_examined_per_scan'),
+                'partitions': table.get('partitions')
+            })
+        for value in node.values():
+            walk(value)
+
+    walk(plan)
+    for table in tables:
+        # 'index' walks a whole index, which is still every row.
+        if table['access'] in ('ALL', 'index') and table['table'] in LARGE_TABLES:
+            flags.add(f"full scan: {table['table']}")
+    return tables, flags
+
+
+def sqlite_plan(cursor, sql: str, params: Sequence[Any]) -> Tuple[List[Dict[str, Any]], Set[str]]:
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    aliases = table_aliases(sql)
+    tables: List[Dict[str, Any]] = []
+    flags: Set[str] = set()
+    for row in cursor.fetchall():
+        detail = row['detail'] if isinstance(row, dict) else row[-1]
+        if detail.startswith('USE TEMP B-TREE FOR ORDER BY') or detail.startswith('USE TEMP B-TREE FOR RIGHT PART OF ORDER BY'):
+            flags.add(FILESORT)
+        elif detail.startswith('USE TEMP B-TREE'):
+            flags.add(TEMPORARY)
+        match = SQLITE_SCAN_PATTERN.match(detail)
+        if not match:
+            continue
+        name = match.group(3) or match.group(2)
+        table = aliases.get(name, match.group(2))
+        tables.append({'table': table, 'access': match.group(1).lower(), 'key': match.group(4), 'rows': None, 'partitions': None})
+        if match.group(1) == 'SCAN' and table in LARGE_TABLES:
+            flags.add(f'full scan: {table}')
+    return tables, flags
+
+
+def explain_cursor(conn, backend: str):
+    if backend == 'sqlite':
+        return conn.cursor(dictionary=True)
+    # A plain cursor: the pool's dictionary cursors prepare every statement, and EXPLAIN and DDL are run as text.
+    return conn.cursor(dictionary=True, buffered=True)
+
+
+def check_plans(conn, backend: str, window: Tuple[str, str], farm_ids: List[int], product_id: int,
+                only: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    explain = sqlite_plan if backend == 'sqlite' else mysql_plan
+    cursor = explain_cursor(conn, backend)
+    seen: Set[str] = set()
+    queries = []
+    for name, call, expected in PLAN_CASES:
+        if only and name not in only:
+            continue
+        for index, (sql, params) in enumerate(capture_statements(call, window, farm_ids, product_id), start=1):
+            # The live edges share one statement; plan it once.
+            if sql in seen:
+                continue
+            seen.add(sql)
+            tables, flags = explain(cursor, sql, params)
+            unexpected = sorted(flags - set(expected))
+            queries.append({
+                'name': f'{name} #{index}',
+                'tables': tables,
+                'findings': sorted(flags),
+                'unexpected': unexpected
+            })
+    cursor.close()
+    return {
+        'backend': backend,
+        'window': list(window),
+        'farmIds': farm_ids,
+        'regressions': sum(1 for query in queries if query['unexpected']),
+        'queries': queries
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='EXPLAIN every report fetcher with representative parameters. Exits non-zero when a plan '
+                    'has a full scan of a large table, or a filesort or temporary table it is not expected to need.'
+    )
+    parser.add_argument('--from', dest='start_date', default=DEFAULT_WINDOW[0], help='Window start (YYYY-MM-DD).')
+    parser.add_argument('--to', dest='end_date', default=DEFAULT_WINDOW[1], help='Window end (YYYY-MM-DD).')
+    parser.add_argument('--farm-id', dest='farm_ids', type=int, action='append', help='Farm for the single-farm fetchers (default 1).')
+    parser.add_argument('--product-id', type=int, default=1, help='Product for the product-filtered fetchers.')
+    parser.add_argument('--only', choices=[name for name, _, _ in PLAN_CASES], action='append', help='Check only these fetchers.')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    conn = connect_db()
+    try:
+        report = check_plans(conn, report_backend(), (args.start_date, args.end_date), args.farm_ids or [1],
+                             args.product_id, args.only)
+    finally:
+        conn.close()
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report['regressions'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Keep frontend/reports within a byte budget and a maximum age by evicting the least recently served files."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from report_cache import CACHE_DIR
+
+FRONTEND_REPORTS_DIR = Path(__file__).resolve().parents[3] / 'frontend' / 'reports'
+
+# Written by the server's static handler (services/reportAccess.ts): file name -> last served, in epoch ms.
+ACCESS_INDEX = CACHE_DIR / 'report-access.json'
+
+DEFAULT_MAX_BYTES = '512M'
+DEFAULT_MAX_AGE_DAYS = 7.0
+# A file rendered or served this recently is never evicted, so a report cannot vanish between render and download.
+GRACE_SECONDS = 300
+# Resident workers compact at most this often.
+COMPACT_INTERVAL_SECONDS = 300
+
+SIZE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$', re.I)
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+_last_compaction = 0.0
+
+
+def parse_size(value: str) -> int:
+    match = SIZE_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f'Invalid size: {value} (use bytes or a K/M/G suffix)')
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def retention_enabled() -> bool:
+    return os.environ.get('REPORT_RETENTION', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def budget_bytes() -> int:
+    return parse_size(os.environ.get('REPORT_RETENTION_MAX_BYTES') or DEFAULT_MAX_BYTES)
+
+
+def max_age_days() -> float:
+    return float(os.environ.get('REPORT_RETENTION_MAX_AGE_DAYS') or DEFAULT_MAX_AGE_DAYS)
+
+
+def read_access_index(path: Path = ACCESS_INDEX) -> Dict[str, float]:
+    try:
+        served = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    return {name: value / 1000 for name, value in served.items() if isinstance(value, (int, float))}
+
+
+def scan(directory: Path, served: Dict[str, float]) -> List[Dict[str, Any]]:
+    files = []
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return files
+    for entry in entries:
+        if not entry.is_file(follow_symlinks=False):
+            continue
+        stats = entry.stat(follow_symlinks=False)
+        # Never-served files age from when they were written.
+        files.append({
+            'name': entry.name,
+            'path': entry.path,
+            'size': stats.st_size,
+            'lastUsed': max(stats.st_mtime, served.get(entry.name, 0.0))
+        })
+    files.sort(key=lambda item: item['lastUsed'])
+    return files
+
+
+def compact(directory: Path = FRONTEND_REPORTS_DIR, budget: Optional[int] = None, max_age: Optional[float] = None,
+            now: Optional[float] = None, dry_run: bool = False, protect: Iterable[str] = ()) -> Dict[str, Any]:
+    budget = budget_bytes() if budget is None else budget
+    max_age = max_age_days() if max_age is None else max_age
+    now = time.time() if now is None else now
+    protected = {Path(path).name for path in protect}
+    files = scan(directory, read_access_index())
+    total = sum(item['size'] for item in files)
+    age_cutoff = now - max_age * 86400
+    grace_cutoff = now - GRACE_SECONDS
+    evicted = []
+    # Oldest use first: expired files always go, then the least recently used until the budget holds.
+    for item in files:
+        if item['lastUsed'] >= grace_cutoff:
+            break
+        expired = item['lastUsed'] < age_cutoff
+        if not expired and total <= budget:
+            break
+        if item['name'] in protected:
+            continue
+        if not dry_run:
+            try:
+                os.unlink(item['path'])
+            except FileNotFoundError:
+                # Another worker compacted at the same time.
+                pass
+        total -= item['size']
+        evicted.append({
+            'name': item['name'],
+            'bytes': item['size'],
+            'lastUsed': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(item['lastUsed'])),
+            'reason': 'age' if expired else 'size'
+        })
+    return {
+        'directory': str(directory),
+        'budgetBytes': budget,
+        'maxAgeDays': max_age,
+        'files': len(files) - len(evicted),
+        'bytes': total,
+        'overBudget': total > budget,
+        'evicted': evicted,
+        'evictedBytes': sum(item['bytes'] for item in evicted),
+        'dryRun': dry_run
+    }
+
+
+def maybe_compact(protect: Iterable[str] = (), now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    global _last_compaction
+    now = time.time() if now is None else now
+    if not retention_enabled() or now - _last_compaction < COMPACT_INTERVAL_SECONDS:
+        return None
+    _last_compaction = now
+    return compact(now=now, protect=protect)
+
+
+def describe(directory: Path = FRONTEND_REPORTS_DIR, now: Optional[float] = None) -> Dict[str, Any]:
+    now = time.time() if now is None else now
+    files = scan(directory, read_access_index())
+    total = sum(item['size'] for item in files)
+    return {
+        'directory': str(directory),
+        'budgetBytes': budget_bytes(),
+        'maxAgeDays': max_age_days(),
+        'files': len(files),
+        'bytes': total,
+        'overBudget': total > budget_bytes(),
+        'oldestUseDays': round((now - files[0]['lastUsed']) / 86400, 2) if files else None
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Evict generated reports by age and least recent use.')
+    parser.add_argument('--dir', type=Path, default=FRONTEND_REPORTS_DIR, help='Report directory (default frontend/reports).')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('status', help='Show the directory size against the budget.')
+    compact_parser = subparsers.add_parser('compact', help='Evict files now.')
+    compact_parser.add_argument('--max-bytes', type=parse_size, help='Byte budget, e.g. 200M (default REPORT_RETENTION_MAX_BYTES).')
+    compact_parser.add_argument('--max-age-days', type=float, help='Evict files unused for longer (default REPORT_RETENTION_MAX_AGE_DAYS).')
+    compact_parser.add_argument('--dry-run', action='store_true', help='List what would be evicted without deleting it.')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.command == 'status':
+        result = describe(args.dir)
+    else:
+        result = compact(args.dir, args.max_bytes, args.max_age_days, dry_run=args.dry_run)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
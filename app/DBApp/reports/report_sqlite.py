@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""Embedded SQLite backend for the report scripts, and a loader that fills it from generate_dummy.py."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from report_db import REPO_ROOT, sqlite_path, table_statements
+
+# MySQL DATE_FORMAT specifiers as strftime directives; anything else is copied literally, as MySQL does.
+DATE_FORMAT_SPECIFIERS = {
+    'Y': '%Y',
+    'y': '%y',
+    'm': '%m',
+    'd': '%d',
+    'M': '%B',
+    'b': '%b',
+    'H': '%H',
+    'i': '%M',
+    's': '%S',
+    'S': '%S',
+    '%': '%%'
+}
+
+# %s placeholders outside string literals, so DATE_FORMAT patterns are left alone.
+PLACEHOLDER_PATTERN = re.compile(r"('(?:[^']|'')*')|%s")
+
+# Inverse of generate_dummy.py's LOAD DATA escaping.
+TSV_UNESCAPES = {'\\': '\\', 't': '\t', 'n': '\n', 'r': '\r', '0': '\0'}
+TSV_ESCAPE_PATTERN = re.compile(r'\\(.)')
+
+
+def parse_date(value: bytes) -> date:
+    return date.fromisoformat(value.decode('ascii')[:10])
+
+
+# DATE columns come back as datetime.date, as they do from mysql.connector.
+sqlite3.register_converter('DATE', parse_date)
+
+
+@lru_cache(maxsize=None)
+def strftime_pattern(pattern: str) -> str:
+    return re.sub(r'%(.)', lambda match: DATE_FORMAT_SPECIFIERS.get(match.group(1), match.group(1)), pattern)
+
+
+def date_format(value: Any, pattern: Optional[str]) -> Optional[str]:
+    if value is None or pattern is None:
+        return None
+    try:
+        moment = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return moment.strftime(strftime_pattern(pattern))
+
+
+def greatest(*values: Any) -> Any:
+    if any(value is None for value in values):
+        return None
+    return max(values)
+
+
+def least(*values: Any) -> Any:
+    if any(value is None for value in values):
+        return None
+    return min(values)
+
+
+def floor(value: Any) -> Optional[int]:
+    return None if value is None else math.floor(value)
+
+
+def concat_ws(separator: Optional[str], *values: Any) -> Optional[str]:
+    if separator is None:
+        return None
+    return separator.join(str(value) for value in values if value is not None)
+
+
+DIALECT_FUNCTIONS = {
+    'DATE_FORMAT': (2, date_format),
+    'GREATEST': (-1, greatest),
+    'LEAST': (-1, least),
+    'FLOOR': (1, floor),
+    'CONCAT_WS': (-1, concat_ws)
+}
+
+
+@lru_cache(maxsize=256)
+def translate(operation: str) -> str:
+    return PLACEHOLDER_PATTERN.sub(lambda match: match.group(1) or '?', operation)
+
+
+def sqlite_ddl(statement: str) -> List[str]:
+    table = re.match(r'\s*CREATE TABLE (\w+)', statement)
+    indexes: List[str] = []
+
+    def move_index(match) -> str:
+        indexes.append(f'CREATE INDEX {match.group(1)} ON {table.group(1)} ({match.group(2)})')
+        return ''
+
+    if table:
+        statement = re.sub(r',\s*INDEX (\w+) \(([^)]*)\)', move_index, statement)
+    statement = re.sub(r'\bENUM\s*\([^)]*\)', 'TEXT', statement)
+    statement = re.sub(r'\s+(UNSIGNED|AUTO_INCREMENT)\b', '', statement)
+    statement = re.sub(r'\)\s*ENGINE=\w+\s*$', ')', statement)
+    return [statement, *indexes]
+
+
+class SqliteCursor:
+    """mysql.connector-style cursor over sqlite3: %s placeholders and optional dictionary rows."""
+
+    def __init__(self, raw, dictionary: bool):
+        self._cursor = raw
+        self._dictionary = dictionary
+        self._names: List[str] = []
+
+    @property
+    def column_names(self) -> List[str]:
+        return self._names
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    def execute(self, operation: str, params: Any = ()):
+        self._cursor.execute(translate(operation), tuple(params or ()))
+        self._names = [column[0] for column in self._cursor.description or ()]
+
+    def executemany(self, operation: str, seq_params: Iterable[Sequence[Any]]):
+        self._cursor.executemany(translate(operation), seq_params)
+        self._names = []
+
+    def _row(self, row):
+        return dict(zip(self._names, row)) if self._dictionary else row
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return self._row(row) if row is not None else None
+
+    def fetchall(self) -> List[Any]:
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SqliteConnection:
+    """The slice of the mysql.connector connection API that the report scripts use."""
+
+    def __init__(self, raw: sqlite3.Connection):
+        self._raw = raw
+
+    def cursor(self, dictionary: bool = False) -> SqliteCursor:
+        return SqliteCursor(self._raw.cursor(), dictionary)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def connect_sqlite(path: Path, create: bool = False) -> SqliteConnection:
+    if not create and not path.exists():
+        raise SystemExit(f'{path} not found; build it with report_sqlite.py load -o {path}')
+    raw = sqlite3.connect(str(path), detect_types=sqlite3.PARSE_DECLTYPES)
+    for name, (arity, function) in DIALECT_FUNCTIONS.items():
+        raw.create_function(name, arity, function, deterministic=True)
+    return SqliteConnection(raw)
+
+
+def sqlite_value(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float):
+        # Stored the way MySQL's DECIMAL(8,2) columns would hold it.
+        return round(value, 2)
+    return value
+
+
+def tsv_field(field: str) -> Optional[str]:
+    if field == '\\N':
+        return None
+    if '\\' not in field:
+        return field
+    return TSV_ESCAPE_PATTERN.sub(lambda match: TSV_UNESCAPES.get(match.group(1), match.group(1)), field)
+
+
+def tsv_rows(fragments: Iterable[str]) -> Iterator[List[Optional[str]]]:
+    for fragment in fragments:
+        with open(fragment, encoding='utf-8', newline='') as handle:
+            for line in handle:
+                yield [tsv_field(field) for field in line.rstrip('\n').split('\t')]
+
+
+class SqliteWriter:
+    """generate_dummy.py writer that inserts rows straight into the embedded database."""
+
+    def __init__(self, conn: SqliteConnection):
+        self.cursor = conn.cursor()
+        self.counts: Dict[str, int] = {}
+
+    def comment(self, text: str):
+        pass
+
+    def insert(self, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+        count = 0
+
+        def values() -> Iterator[tuple]:
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield tuple(sqlite_value(value) for value in row)
+
+        # executemany drains the generator, so even Orders never sits in memory.
+        self.cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})", values()
+        )
+        self.counts[table] = count
+        return count
+
+    def insert_fragments(self, table: str, columns: Sequence[str], fragments: Sequence[str], count: int) -> int:
+        # Sharded Orders arrive as TSV fragments; column affinity turns the text back into numbers.
+        self.insert(table, columns, tsv_rows(fragments))
+        self.counts[table] = count
+        return count
+
+
+def build_database(path: Path, generator_argv: Sequence[str]) -> Dict[str, Any]:
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.append(str(REPO_ROOT))
+    import generate_dummy
+    from sales_rollup import rebuild
+
+    args = generate_dummy.parse_args([*generator_argv, '-o', str(path)])
+    args.format = 'sqlite'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Built under a temporary name and swapped in, so readers never see a half-loaded file.
+    temp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    temp.unlink(missing_ok=True)
+    started = time.perf_counter()
+    conn = connect_sqlite(temp, create=True)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA journal_mode = OFF')
+        cursor.execute('PRAGMA synchronous = OFF')
+        for statement in table_statements():
+            for ddl in sqlite_ddl(statement):
+                cursor.execute(ddl)
+        counts = generate_dummy.generate_sql(SqliteWriter(conn), args)
+        conn.commit()
+        rollup = rebuild(conn, None, None)
+        cursor.execute('ANALYZE')
+        cursor.close()
+    except BaseException:
+        conn.close()
+        temp.unlink(missing_ok=True)
+        raise
+    conn.close()
+    os.replace(temp, path)
+    return {
+        'path': str(path.resolve()),
+        'tables': counts,
+        'rollupRows': rollup['rows'],
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> Tuple[argparse.Namespace, List[str]]:
+    parser = argparse.ArgumentParser(
+        description='Maintain the embedded SQLite database the reports read with REPORT_DB_BACKEND=sqlite.',
+        epilog='Arguments after the subcommand that are not listed here are passed to generate_dummy.py, '
+               'e.g. load --scale 10 --start 2024-06-01 --end 2025-11-30.'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    load = subparsers.add_parser('load', help='Generate dummy data straight into a new database file, then build the rollup.')
+    load.add_argument('-o', '--output', type=Path, default=None,
+                      help='Database file to (re)create. Defaults to REPORT_SQLITE_PATH or .cache/reports.sqlite.')
+    return parser.parse_known_args(argv)
+
+
+def main():
+    args, generator_argv = parse_args()
+    if args.command == 'load':
+        print(json.dumps(build_database(args.output or sqlite_path(), generator_argv)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Per-phase wall/CPU timing and opt-in profiling for the report scripts."""
+
+from __future__ import annotations
+
+import cProfile
+import hashlib
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+PHASE_ORDER = ('cache', 'fetch', 'build', 'render', 'write')
+
+
+class PhaseTimer:
+    """Wall and CPU seconds per phase plus rows per fetch; time goes to the innermost open phase."""
+
+    def __init__(self):
+        self._totals: Dict[str, List[float]] = {}
+        self._rows: Dict[str, int] = {}
+        self._stack: List[str] = []
+        self._started = self._mark = self._now()
+
+    @staticmethod
+    def _now() -> Tuple[float, float]:
+        return time.perf_counter(), time.process_time()
+
+    def _switch(self):
+        now = self._now()
+        if self._stack:
+            totals = self._totals.setdefault(self._stack[-1], [0.0, 0.0])
+            totals[0] += now[0] - self._mark[0]
+            totals[1] += now[1] - self._mark[1]
+        self._mark = now
+
+    def push(self, name: str):
+        self._switch()
+        self._stack.append(name)
+
+    def pop(self):
+        self._switch()
+        self._stack.pop()
+
+    @contextmanager
+    def phase(self, name: str):
+        self.push(name)
+        try:
+            yield
+        finally:
+            self.pop()
+
+    @contextmanager
+    def render(self, open_pdf: Callable[..., Any], *args: Any):
+        # Opening the document (the first one imports the PDF backend) and drawing pages
+        # count as render; finishing and closing the file counts as write.
+        with self.phase('write'):
+            with self.phase('render'):
+                document = open_pdf(*args)
+            with document as pdf, self.phase('render'):
+                yield pdf
+
+    def fetch(self, fetcher: Callable[..., Any], *args: Any) -> Any:
+        name = fetcher.__name__.replace('fetch_', '', 1)
+        with self.phase('fetch'):
+            result = fetcher(*args)
+        if isinstance(result, Mapping):
+            self._rows[name] = sum(len(value) if isinstance(value, list) else 1 for value in result.values())
+            return result
+        if isinstance(result, list):
+            self._rows[name] = len(result)
+            return result
+        # Streaming fetchers do their work while a builder drains them.
+        return self._drain(name, result)
+
+    def _drain(self, name: str, rows: Iterable[Any]) -> Iterator[Any]:
+        iterator = iter(rows)
+        self._rows[name] = 0
+        while True:
+            self.push('fetch')
+            try:
+                row = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.pop()
+            self._rows[name] += 1
+            yield row
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = self._now()
+        wall = now[0] - self._started[0]
+        cpu = now[1] - self._started[1]
+        names = [name for name in PHASE_ORDER if name in self._totals]
+        names += [name for name in self._totals if name not in PHASE_ORDER]
+        phases = {
+            name: {'wallSeconds': round(self._totals[name][0], 6), 'cpuSeconds': round(self._totals[name][1], 6)}
+            for name in names
+        }
+        phases['other'] = {
+            'wallSeconds': round(max(wall - sum(entry[0] for entry in self._totals.values()), 0.0), 6),
+            'cpuSeconds': round(max(cpu - sum(entry[1] for entry in self._totals.values()), 0.0), 6)
+        }
+        return {
+            'wallSeconds': round(wall, 6),
+            'cpuSeconds': round(cpu, 6),
+            'phases': phases,
+            'rows': dict(self._rows)
+        }
+
+
+class RunProfile:
+    """cProfile plus tracemalloc around one report run (--profile)."""
+
+    def __init__(self):
+        self._owns_tracing = not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop(self) -> int:
+        self._profiler.disable()
+        peak = tracemalloc.get_traced_memory()[1]
+        if self._owns_tracing:
+            tracemalloc.stop()
+        return peak
+
+    def dump(self, path: Path, peak: int) -> Dict[str, Any]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._profiler.dump_stats(str(path))
+        return {'path': str(path.resolve()), 'peakMemoryBytes': peak}
+
+
+def farm_set_label(farm_ids: Optional[Sequence[int]]) -> str:
+    # Names fan-out profile dumps, so runs over one window for different farms do not overwrite each other.
+    if farm_ids is None:
+        return 'all-farms'
+    ids = sorted(farm_ids)
+    if len(ids) <= 4:
+        return 'farms-' + '_'.join(str(farm_id) for farm_id in ids)
+    digest = hashlib.sha1(','.join(str(farm_id) for farm_id in ids).encode('utf-8')).hexdigest()[:10]
+    return f'{len(ids)}-farms-{digest}'
+
+
+def timed_run(generate: Callable[[PhaseTimer], Dict[str, Any]], profile: bool, profile_path: Path) -> Dict[str, Any]:
+    timer = PhaseTimer()
+    run_profile = RunProfile() if profile else None
+    try:
+        result = generate(timer)
+    finally:
+        peak = run_profile.stop() if run_profile else 0
+    # Added after report_cache.finish() so cached entries never replay stale timings.
+    result = {**result, 'timings': timer.to_dict()}
+    if run_profile:
+        # Next to the rendered file when there is one.
+        target = Path(result['path']).with_suffix('.prof') if result.get('path') else profile_path
+        result['profile'] = run_profile.dump(target, peak)
+    return result
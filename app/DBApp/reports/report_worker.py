@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Keep the report scripts resident and serve JSON-lines render requests."""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import socketserver
+import sys
+import traceback
+from typing import Any, Dict, IO, Optional
+
+from report_db import close_pool, reclaim_connections
+from report_output import preload_pdf_backend
+from report_retention import maybe_compact
+
+REPORT_SCRIPTS = (
+    'farmer_report_pdf',
+    'farmer_orders_report_pdf',
+    'admin_loyalty_report_pdf',
+    'admin_productivity_report_pdf',
+    'admin_product_sales_report_pdf'
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Serve report requests from a long-lived interpreter.')
+    parser.add_argument('--socket', help='Listen on this Unix socket instead of stdin/stdout.')
+    return parser.parse_args()
+
+
+class ReportWorker:
+    def __init__(self):
+        self.modules = {name: importlib.import_module(name) for name in REPORT_SCRIPTS}
+        # The scripts import matplotlib lazily; a resident worker pays for it once, up front.
+        preload_pdf_backend()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        request_id = request.get('id')
+        if request.get('op') == 'ping':
+            return {'id': request_id, 'ok': True, 'result': {'pid': os.getpid()}}
+        script = request.get('script')
+        module = self.modules.get(script) if isinstance(script, str) else None
+        if module is None:
+            return {'id': request_id, 'ok': False, 'error': f"Unknown report script: {request.get('script')}"}
+        args = request.get('args') or []
+        if not isinstance(args, list):
+            return {'id': request_id, 'ok': False, 'error': 'Report arguments must be a list.'}
+        args = [str(arg) for arg in args]
+        try:
+            # Scripts print nothing on success, but keep stray output off the protocol stream.
+            with contextlib.redirect_stdout(sys.stderr):
+                result = module.run(args)
+        except SystemExit as exc:
+            message = exc.code if isinstance(exc.code, str) else f'Invalid report arguments: {args}'
+            return {'id': request_id, 'ok': False, 'error': message}
+        except Exception as exc:
+            traceback.print_exc(file=sys.stderr)
+            return {'id': request_id, 'ok': False, 'error': f'{type(exc).__name__}: {exc}'}
+        finally:
+            # Every request reads a fresh snapshot: nothing it checked out keeps its transaction open.
+            leaked = reclaim_connections()
+            if leaked:
+                print(f"{request.get('script')} left {leaked} database connections open; rolled back.", file=sys.stderr)
+        self.compact(result)
+        return {'id': request_id, 'ok': True, 'result': result}
+
+    def compact(self, result: Dict[str, Any]):
+        # A cache hit can hand back an old file; keep it until the client has fetched it.
+        paths = [result.get('path')] + [report.get('path') for report in result.get('reports') or []]
+        try:
+            compaction = maybe_compact(protect=[path for path in paths if path])
+        except OSError:
+            traceback.print_exc(file=sys.stderr)
+            return
+        if compaction and compaction['evicted']:
+            print(f"Evicted {len(compaction['evicted'])} reports ({compaction['evictedBytes']} bytes); "
+                  f"{compaction['bytes']} bytes in {compaction['files']} files remain.", file=sys.stderr)
+
+    def handle_line(self, line: str) -> Optional[str]:
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            request = json.loads(line)
+        except ValueError as exc:
+            return json.dumps({'id': None, 'ok': False, 'error': f'Malformed request: {exc}'})
+        if not isinstance(request, dict):
+            return json.dumps({'id': None, 'ok': False, 'error': 'Malformed request: expected a JSON object.'})
+        return json.dumps(self.handle(request))
+
+    def serve_stream(self, reader: IO[str], writer: IO[str]):
+        for line in reader:
+            response = self.handle_line(line)
+            if response is None:
+                continue
+            writer.write(response + '\n')
+            writer.flush()
+
+
+def serve_socket(worker: ReportWorker, socket_path: str):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                response = worker.handle_line(raw.decode('utf-8'))
+                if response is None:
+                    continue
+                self.wfile.write((response + '\n').encode('utf-8'))
+                self.wfile.flush()
+
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+
+def main():
+    args = parse_args()
+    worker = ReportWorker()
+    try:
+        if args.socket:
+            serve_socket(worker, args.socket)
+        else:
+            worker.serve_stream(sys.stdin, sys.stdout)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_pool()
+
+
+if __name__ == '__main__':
+    main()
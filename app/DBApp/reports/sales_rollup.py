@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Read and rebuild the month x farm x product sales rollup used by the report fetchers."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from report_db import connect_db, in_clause, stream_rows
+
+ROLLUP_COLUMNS = ('total_quantity', 'total_revenue', 'orders_count', 'points_earned', 'points_redeemed')
+
+ROLLUP_SQL = """
+    SELECT DATE_FORMAT(r.month_start, '%Y-%m-01') AS month_start,
+           r.farm_id,
+           r.product_id,
+           rp.product_name,
+           rp.product_type,
+           rp.grade,
+           r.total_quantity,
+           r.total_revenue,
+           r.orders_count,
+           r.points_earned,
+           r.points_redeemed
+    FROM MonthlySalesRollup AS r
+    JOIN RawProduct AS rp ON r.product_id = rp.product_id
+    WHERE r.month_start BETWEEN %s AND %s
+      AND r.orders_count > 0
+"""
+
+LIVE_SQL = """
+    SELECT DATE_FORMAT(o.order_date, '%Y-%m-01') AS month_start,
+           inv.farm_id,
+           inv.product_id,
+           rp.product_name,
+           rp.product_type,
+           rp.grade,
+           SUM(o.quantity) AS total_quantity,
+           SUM(o.quantity * inv.price) AS total_revenue,
+           COUNT(o.order_id) AS orders_count,
+           SUM(GREATEST(FLOOR((inv.price * o.quantity - IFNULL(o.loyalty_points_used, 0)) / 100), 0)) AS points_earned,
+           SUM(IFNULL(o.loyalty_points_used, 0)) AS points_redeemed
+    FROM Orders AS o
+    JOIN Inventory AS inv ON o.batch_id = inv.batch_id
+    JOIN RawProduct AS rp ON inv.product_id = rp.product_id
+    WHERE o.order_date BETWEEN %s AND %s
+"""
+
+LIVE_GROUP_BY = """
+    GROUP BY month_start, inv.farm_id, inv.product_id, rp.product_name, rp.product_type, rp.grade
+"""
+
+REBUILD_SQL = """
+    INSERT INTO MonthlySalesRollup (
+        month_start, farm_id, product_id,
+        total_quantity, total_revenue, orders_count, points_earned, points_redeemed
+    )
+    SELECT DATE_FORMAT(o.order_date, '%Y-%m-01') AS month_start,
+           inv.farm_id,
+           inv.product_id,
+           SUM(o.quantity),
+           SUM(o.quantity * inv.price),
+           COUNT(o.order_id),
+           SUM(GREATEST(FLOOR((inv.price * o.quantity - IFNULL(o.loyalty_points_used, 0)) / 100), 0)),
+           SUM(IFNULL(o.loyalty_points_used, 0))
+    FROM Orders AS o
+    JOIN Inventory AS inv ON o.batch_id = inv.batch_id
+    WHERE o.order_date BETWEEN %s AND %s
+    GROUP BY month_start, inv.farm_id, inv.product_id
+"""
+
+
+def rollup_enabled() -> bool:
+    return os.environ.get('REPORT_USE_ROLLUP', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def next_month(value: date) -> date:
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1, day=1)
+    return value.replace(month=value.month + 1, day=1)
+
+
+# Whole months inside the window come from the rollup; partial months at either edge
+# are aggregated live from Orders so day-level windows stay exact.
+def split_window(start_date: str, end_date: str) -> Tuple[Optional[Tuple[date, date]], List[Tuple[date, date]]]:
+    start = date.fromisoformat(str(start_date)[:10])
+    end = date.fromisoformat(str(end_date)[:10])
+    first_full = start if start.day == 1 else next_month(start)
+    end_exclusive = next_month(end) if next_month(end) - timedelta(days=1) == end else month_start(end)
+    if first_full >= end_exclusive:
+        return None, [(start, end)]
+    edges = []
+    if start < first_full:
+        edges.append((start, first_full - timedelta(days=1)))
+    if end_exclusive <= end:
+        edges.append((end_exclusive, end))
+    return (first_full, end_exclusive - timedelta(days=1)), edges
+
+
+def fetch_sales_rollup(cursor, start_date: str, end_date: str, farm_ids: Optional[Sequence[int]] = None) -> Iterator[Dict[str, Any]]:
+    full_months, edges = split_window(start_date, end_date)
+    if not rollup_enabled():
+        full_months, edges = None, [(date.fromisoformat(str(start_date)[:10]), date.fromisoformat(str(end_date)[:10]))]
+    if full_months:
+        condition, farm_params = in_clause('r.farm_id', farm_ids)
+        yield from stream_rows(cursor, f'{ROLLUP_SQL} AND {condition}',
+                               (full_months[0].isoformat(), full_months[1].isoformat(), *farm_params))
+    condition, farm_params = in_clause('inv.farm_id', farm_ids)
+    live_sql = f'{LIVE_SQL} AND {condition} {LIVE_GROUP_BY}'
+    for edge_start, edge_end in edges:
+        yield from stream_rows(cursor, live_sql, (edge_start.isoformat(), edge_end.isoformat(), *farm_params))
+
+
+SALES_SOURCES = ('db', 'snapshot')
+
+
+def default_sales_source() -> str:
+    return os.environ.get('REPORT_SALES_SOURCE') or 'db'
+
+
+def open_sales_snapshot(source: str):
+    if source != 'snapshot':
+        return None
+    # Imported here so reports reading the database never load numpy for it.
+    from order_facts import open_snapshot
+    return open_snapshot()
+
+
+# source is a cursor, or the order_facts.FactSnapshot returned for --source snapshot.
+def fetch_sales(source, start_date: str, end_date: str, farm_ids: Optional[Sequence[int]] = None) -> Iterator[Dict[str, Any]]:
+    if hasattr(source, 'sales_rows'):
+        return source.sales_rows(start_date, end_date, farm_ids)
+    return fetch_sales_rollup(source, start_date, end_date, farm_ids)
+
+
+def aggregate_rows(rows: Iterable[Dict[str, Any]], keys: Sequence[str], columns: Sequence[str] = ROLLUP_COLUMNS) -> List[Dict[str, Any]]:
+    grouped: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for row in rows:
+        group_key = tuple(row.get(key) for key in keys)
+        entry = grouped.get(group_key)
+        if entry is None:
+            entry = {key: row.get(key) for key in keys}
+            entry.update({column: 0 for column in columns})
+            grouped[group_key] = entry
+        for column in columns:
+            entry[column] += row.get(column) or 0
+    return list(grouped.values())
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Maintain the MonthlySalesRollup table.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    rebuild = subparsers.add_parser('rebuild', help='Recompute rollup months from Orders (backfill).')
+    rebuild.add_argument('--from', dest='start_date', help='First month to rebuild (YYYY-MM-DD). Defaults to the first order.')
+    rebuild.add_argument('--to', dest='end_date', help='Last month to rebuild (YYYY-MM-DD). Defaults to the last order.')
+    return parser.parse_args()
+
+
+def rebuild(conn, start_date: Optional[str], end_date: Optional[str]) -> Dict[str, Any]:
+    cursor = conn.cursor()
+    if not start_date or not end_date:
+        cursor.execute('SELECT MIN(order_date), MAX(order_date) FROM Orders')
+        first_order, last_order = cursor.fetchone()
+        if first_order is None:
+            cursor.execute('DELETE FROM MonthlySalesRollup')
+            conn.commit()
+            return {'months': 0, 'rows': 0}
+        start_date = start_date or str(first_order)
+        end_date = end_date or str(last_order)
+    first = month_start(date.fromisoformat(str(start_date)[:10]))
+    last = next_month(date.fromisoformat(str(end_date)[:10])) - timedelta(days=1)
+    cursor.execute('DELETE FROM MonthlySalesRollup WHERE month_start BETWEEN %s AND %s',
+                   (first.isoformat(), last.isoformat()))
+    cursor.execute(REBUILD_SQL, (first.isoformat(), last.isoformat()))
+    inserted = cursor.rowcount
+    conn.commit()
+    cursor.close()
+    months = (last.year - first.year) * 12 + last.month - first.month + 1
+    return {'from': first.isoformat(), 'to': last.isoformat(), 'months': months, 'rows': inserted}
+
+
+def main():
+    args = parse_args()
+    conn = connect_db()
+    try:
+        if args.command == 'rebuild':
+            print(json.dumps(rebuild(conn, args.start_date, args.end_date)))
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
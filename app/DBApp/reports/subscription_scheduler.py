@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Create orders for the subscriptions that have fallen due and advance their next_due_date."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import heapq
+import json
+import re
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from report_db import connect_db, in_clause
+
+# Index range scan on idx_subscription_due (status, next_due_date): cost follows the due rows only.
+DUE_SQL = """
+    SELECT program_id,
+           client_id,
+           product_id,
+           farm_id,
+           location_id,
+           quantity,
+           order_interval_days,
+           next_due_date
+    FROM Subscription
+    WHERE status = 'ACTIVE'
+      AND next_due_date <= %s
+    ORDER BY next_due_date, program_id
+"""
+
+# Locked so the stock the allocator plans against cannot move before the day commits.
+INVENTORY_SQL = """
+    SELECT batch_id,
+           product_id,
+           farm_id,
+           exp_date,
+           quantity
+    FROM Inventory
+    WHERE quantity > 0
+      AND exp_date >= %s
+"""
+
+# Stock is decremented per row by the orders_update_stock_after_insert trigger.
+INSERT_ORDER_SQL = """
+    INSERT INTO Orders (client_id, batch_id, location_id, order_date, quantity, due_by)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+ADVANCE_SQL = """
+    UPDATE Subscription
+    SET next_due_date = %s
+    WHERE program_id = %s
+"""
+
+LOAD_COLUMNS_PATTERN = re.compile(r'INTO TABLE (\w+)\n.*?\(([^)]*)\);', re.S)
+
+
+class FefoAllocator:
+    """Per (product, farm) min-heaps of batches by expiry that hand out stock first-expired-first-out."""
+
+    def __init__(self):
+        self._heaps: Dict[Tuple[int, int], List[List[Any]]] = {}
+        self._available: Dict[Tuple[int, int], int] = {}
+
+    def add_batches(self, rows: Iterable[Dict[str, Any]]):
+        touched = set()
+        for row in rows:
+            key = (int(row['product_id']), int(row['farm_id']))
+            quantity = int(row['quantity'])
+            # [exp_date, batch_id, remaining]: (exp_date, batch_id) is unique, so the
+            # remaining quantity can be decremented in place without breaking heap order.
+            self._heaps.setdefault(key, []).append([as_date(row['exp_date']), int(row['batch_id']), quantity])
+            self._available[key] = self._available.get(key, 0) + quantity
+            touched.add(key)
+        for key in touched:
+            heapq.heapify(self._heaps[key])
+
+    def allocate(self, product_id: int, farm_id: int, quantity: int, fresh_from: date) -> Optional[List[Tuple[int, int]]]:
+        key = (product_id, farm_id)
+        heap = self._heaps.get(key)
+        if not heap:
+            return None
+        while heap and heap[0][0] < fresh_from:
+            self._available[key] -= heapq.heappop(heap)[2]
+        if self._available[key] < quantity:
+            return None
+        parts = []
+        remaining = quantity
+        while remaining:
+            batch = heap[0]
+            taken = min(remaining, batch[2])
+            batch[2] -= taken
+            remaining -= taken
+            parts.append((batch[1], taken))
+            if batch[2] == 0:
+                heapq.heappop(heap)
+        self._available[key] -= quantity
+        return parts
+
+
+def as_date(value: Any) -> date:
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f'Invalid date: {value}') from exc
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Create orders for subscriptions that are due.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run = subparsers.add_parser('run', help='Process every subscription due on or before --date.')
+    run.add_argument('--date', type=parse_date, default=None, help='Process through this day (YYYY-MM-DD). Defaults to today.')
+    run.add_argument('--dry-run', action='store_true', help='Report what would be created and roll everything back.')
+    replay = subparsers.add_parser('replay', help='Process each day of a date range in turn.')
+    replay.add_argument('--from', dest='start_date', type=parse_date, required=True, help='First day (YYYY-MM-DD).')
+    replay.add_argument('--to', dest='end_date', type=parse_date, required=True, help='Last day (YYYY-MM-DD).')
+    replay.add_argument('--dry-run', action='store_true', help='Run the whole range in one transaction and roll it back.')
+    simulate = subparsers.add_parser('simulate', help='Replay a date range in memory against generate_dummy.py --format tsv output.')
+    simulate.add_argument('--data', type=Path, required=True, help='Directory written by generate_dummy.py --format tsv.')
+    simulate.add_argument('--from', dest='start_date', type=parse_date, required=True, help='First day (YYYY-MM-DD).')
+    simulate.add_argument('--to', dest='end_date', type=parse_date, required=True, help='Last day (YYYY-MM-DD).')
+    simulate.add_argument('--days', action='store_true', help='Include the per-day breakdown in the output.')
+    args = parser.parse_args()
+    if args.command in ('replay', 'simulate') and args.start_date > args.end_date:
+        raise SystemExit('Start date must be on or before end date.')
+    return args
+
+
+def allocate_due(due: List[Dict[str, Any]], day: date, allocator: FefoAllocator, fresh_from: date) -> Dict[str, Any]:
+    order_rows = []
+    advances = []
+    deliveries = 0
+    split = 0
+    unfilled = 0
+    for subscription in due:
+        interval = timedelta(days=subscription['order_interval_days'])
+        scheduled = as_date(subscription['next_due_date'])
+        next_due = scheduled
+        # Catch up on every delivery missed since the last run, oldest first.
+        while next_due <= day:
+            parts = allocator.allocate(subscription['product_id'], subscription['farm_id'], subscription['quantity'], fresh_from)
+            if parts is None:
+                # Leave it due so the next run retries once stock arrives.
+                unfilled += 1
+                break
+            due_by = next_due + interval
+            for batch_id, quantity in parts:
+                order_rows.append((subscription['client_id'], batch_id, subscription['location_id'], next_due, quantity, due_by))
+            deliveries += 1
+            split += len(parts) > 1
+            next_due = due_by
+        if next_due != scheduled:
+            advances.append((next_due, subscription['program_id']))
+    return {
+        'orderRows': order_rows,
+        'advances': advances,
+        'summary': {
+            'date': day.isoformat(),
+            'due': len(due),
+            'deliveries': deliveries,
+            'orderRows': len(order_rows),
+            'split': split,
+            'unfilled': unfilled
+        }
+    }
+
+
+def process_day(conn, day: date) -> Dict[str, Any]:
+    cursor = conn.cursor(dictionary=True)
+    writer = conn.cursor()
+    cursor.execute(DUE_SQL, (day.isoformat(),))
+    due = cursor.fetchall()
+    # The Orders stock trigger rejects batches that expired before today.
+    fresh_from = max(day, date.today())
+    allocator = FefoAllocator()
+    farm_ids = sorted({subscription['farm_id'] for subscription in due})
+    if farm_ids:
+        condition, farm_params = in_clause('farm_id', farm_ids)
+        cursor.execute(f'{INVENTORY_SQL} AND {condition} FOR UPDATE', (fresh_from.isoformat(), *farm_params))
+        allocator.add_batches(cursor.fetchall())
+    result = allocate_due(due, day, allocator, fresh_from)
+    if result['orderRows']:
+        writer.executemany(INSERT_ORDER_SQL, [
+            (client_id, batch_id, location_id, order_date.isoformat(), quantity, due_by.isoformat())
+            for client_id, batch_id, location_id, order_date, quantity, due_by in result['orderRows']
+        ])
+    if result['advances']:
+        writer.executemany(ADVANCE_SQL, [(next_due.isoformat(), program_id) for next_due, program_id in result['advances']])
+    cursor.close()
+    writer.close()
+    return result['summary']
+
+
+def summarize(results: List[Dict[str, Any]], dry_run: bool, include_days: bool = True) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {'dryRun': dry_run}
+    for key in ('deliveries', 'orderRows', 'split', 'unfilled'):
+        summary[key] = sum(result[key] for result in results)
+    if include_days:
+        summary['days'] = results
+    return summary
+
+
+def run_days(conn, days: List[date], dry_run: bool) -> Dict[str, Any]:
+    results = []
+    try:
+        for day in days:
+            results.append(process_day(conn, day))
+            if not dry_run:
+                conn.commit()
+    except BaseException:
+        # Never hand a connection with a half-written day back to the pool; earlier days stay committed.
+        conn.rollback()
+        raise
+    if dry_run:
+        conn.rollback()
+    return summarize(results, dry_run)
+
+
+def read_tsv_tables(directory: Path, tables: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    load_script = directory / 'load.sql'
+    if not load_script.exists():
+        raise SystemExit(f'{load_script} not found; generate it with generate_dummy.py --format tsv.')
+    columns = {
+        table: [column.strip() for column in column_list.split(',')]
+        for table, column_list in LOAD_COLUMNS_PATTERN.findall(load_script.read_text(encoding='utf-8'))
+    }
+    data = {}
+    for table in tables:
+        with (directory / f'{table}.tsv').open(encoding='utf-8', newline='') as handle:
+            reader = csv.reader(handle, delimiter='\t', quoting=csv.QUOTE_NONE)
+            data[table] = [dict(zip(columns[table], row)) for row in reader]
+    return data
+
+
+def first_due_on_or_after(start: date, interval_days: int, day: date) -> date:
+    if start >= day:
+        return start
+    return start + timedelta(days=-(-(day - start).days // interval_days) * interval_days)
+
+
+def simulate(directory: Path, days: List[date], include_days: bool) -> Dict[str, Any]:
+    started = time.perf_counter()
+    tables = read_tsv_tables(directory, ('Inventory', 'Subscription'))
+    allocator = FefoAllocator()
+    allocator.add_batches(row for row in tables['Inventory'] if int(row['quantity']) > 0)
+    # Due queue: the same next_due_date ordering the scheduler reads from idx_subscription_due.
+    queue = []
+    for row in tables['Subscription']:
+        if row['status'] != 'ACTIVE':
+            continue
+        subscription = {
+            'program_id': int(row['program_id']),
+            'client_id': int(row['client_id']),
+            'product_id': int(row['product_id']),
+            'farm_id': int(row['farm_id']),
+            'location_id': int(row['location_id']),
+            'quantity': int(row['quantity']),
+            'order_interval_days': int(row['order_interval_days'])
+        }
+        subscription['next_due_date'] = first_due_on_or_after(
+            as_date(row['start_date']), subscription['order_interval_days'], days[0]
+        )
+        queue.append((subscription['next_due_date'], subscription['program_id'], subscription))
+    heapq.heapify(queue)
+    loaded = time.perf_counter()
+
+    results = []
+    for day in days:
+        due = []
+        while queue and queue[0][0] <= day:
+            due.append(heapq.heappop(queue)[2])
+        result = allocate_due(due, day, allocator, day)
+        advanced = {program_id: next_due for next_due, program_id in result['advances']}
+        for subscription in due:
+            subscription['next_due_date'] = advanced.get(subscription['program_id'], subscription['next_due_date'])
+            heapq.heappush(queue, (subscription['next_due_date'], subscription['program_id'], subscription))
+        results.append(result['summary'])
+
+    summary = summarize(results, True, include_days)
+    summary['subscriptions'] = len(queue)
+    summary['batches'] = len(tables['Inventory'])
+    summary['loadSeconds'] = round(loaded - started, 3)
+    summary['simulateSeconds'] = round(time.perf_counter() - loaded, 3)
+    return summary
+
+
+def day_range(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def main():
+    args = parse_args()
+    if args.command == 'simulate':
+        print(json.dumps(simulate(args.data, day_range(args.start_date, args.end_date), args.days)))
+        return
+    conn = connect_db()
+    try:
+        if args.command == 'run':
+            days = [args.date or date.today()]
+        else:
+            days = day_range(args.start_date, args.end_date)
+        print(json.dumps(run_days(conn, days, args.dry_run)))
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The report scripts import their siblings as top-level modules.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from report_db import load_db_config  # noqa: E402
+from report_sqlite import build_database  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def sqlite_db(tmp_path_factory) -> Path:
+    """A small generated database with the schema, rollup and report indexes, shared by the tests."""
+    path = tmp_path_factory.mktemp('reports') / 'reports.sqlite'
+    build_database(path, ['--scale', '1', '--seed', '7', '--start', '2024-06-01', '--end', '2025-11-30'])
+    return path
+
+
+@pytest.fixture(scope='session')
+def mysql_params():
+    """Connection parameters for the configured MySQL database; skips the test when none is reachable."""
+    connector = pytest.importorskip('mysql.connector')
+    params = load_db_config()
+    try:
+        connector.connect(connection_timeout=2, **params).close()
+    except (connector.Error, OSError):
+        pytest.skip('no MySQL server for the report database')
+    return params
@@ -0,0 +1,66 @@
+"""The order-sales product totals derived from the monthly rows match the per-product query they replaced."""
+
+import pytest
+
+from farmer_orders_report_pdf import fetch_monthly_order_breakdown, summarize_products
+from report_sqlite import connect_sqlite
+
+# The per-product query the report ran before it derived the totals from the monthly rows.
+ORDER_BREAKDOWN_SQL = """
+    SELECT rp.product_id,
+           rp.product_name,
+           rp.product_type,
+           rp.grade,
+           SUM(o.quantity) AS total_quantity,
+           SUM(o.quantity * inv.price) AS total_revenue,
+           COUNT(o.order_id) AS orders_count
+    FROM Orders AS o
+    JOIN Inventory AS inv ON o.batch_id = inv.batch_id
+    JOIN RawProduct AS rp ON inv.product_id = rp.product_id
+    WHERE inv.farm_id = %s
+      AND o.order_date BETWEEN %s AND %s
+    GROUP BY rp.product_id, rp.product_name, rp.product_type, rp.grade
+    ORDER BY total_quantity DESC
+"""
+
+WINDOWS = [
+    ('2025-01-01', '2025-12-31'),
+    ('2025-03-04', '2025-03-19'),
+    ('2024-07-10', '2025-10-20')
+]
+
+
+@pytest.fixture(scope='module')
+def conn(sqlite_db):
+    conn = connect_sqlite(sqlite_db)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('use_rollup', ['1', '0'])
+@pytest.mark.parametrize('start_date,end_date', WINDOWS)
+def test_summarize_products_matches_order_breakdown(conn, monkeypatch, use_rollup, start_date, end_date):
+    monkeypatch.setenv('REPORT_USE_ROLLUP', use_rollup)
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute('SELECT farm_id FROM Farm ORDER BY farm_id')
+    farm_ids = [row['farm_id'] for row in cursor.fetchall()]
+    monthly = fetch_monthly_order_breakdown(cursor, farm_ids, start_date, end_date)
+    compared = 0
+    for farm_id in farm_ids:
+        cursor.execute(ORDER_BREAKDOWN_SQL, (farm_id, start_date, end_date))
+        expected = cursor.fetchall()
+        derived = summarize_products(monthly.get(farm_id, []))
+        # Products tied on units have no defined order in the query, so compare the sort key's sequence.
+        assert [row['total_quantity'] for row in derived] == [row['total_quantity'] for row in expected]
+        derived_by_id = {row['product_id']: row for row in derived}
+        assert set(derived_by_id) == {row['product_id'] for row in expected}
+        for row in expected:
+            product = derived_by_id[row['product_id']]
+            assert (product['product_name'], product['product_type'], product['grade']) == \
+                (row['product_name'], row['product_type'], row['grade'])
+            assert product['total_quantity'] == row['total_quantity']
+            assert float(product['total_revenue']) == pytest.approx(float(row['total_revenue']))
+            assert product['orders_count'] == row['orders_count']
+        compared += len(expected)
+    cursor.close()
+    assert compared, 'the window should contain orders'
@@ -0,0 +1,90 @@
+"""Pooled connections end their transaction on checkin, so a later checkout reads current data."""
+
+import pytest
+
+mysql_connector = pytest.importorskip('mysql.connector')
+
+from report_db import ConnectionPool, DEFAULT_POOL_CONFIG  # noqa: E402
+
+PROBE_TABLE = 'report_pool_probe'
+
+
+class SnapshotConnection:
+    """Stand-in for an InnoDB REPEATABLE READ session: the first read pins a snapshot until the transaction ends."""
+
+    def __init__(self, rows, fail_rollback=False):
+        self.rows = rows
+        self.fail_rollback = fail_rollback
+        self.snapshot = None
+        self.closed = False
+
+    def read(self):
+        if self.snapshot is None:
+            self.snapshot = list(self.rows)
+        return self.snapshot
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise mysql_connector.errors.OperationalError('Lost connection to MySQL server')
+        self.snapshot = None
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+
+def fake_pool(monkeypatch, raw):
+    pool = ConnectionPool({}, dict(DEFAULT_POOL_CONFIG, size=1, healthCheck='none'))
+    monkeypatch.setattr(pool, '_connect', lambda: raw)
+    return pool
+
+
+def test_checkin_ends_the_snapshot(monkeypatch):
+    rows = [1]
+    raw = SnapshotConnection(rows)
+    pool = fake_pool(monkeypatch, raw)
+    with pool.checkout() as conn:
+        assert conn.read() == [1]
+    rows.append(2)
+    with pool.checkout() as conn:
+        assert conn._raw is raw
+        assert conn.read() == [1, 2]
+
+
+def test_failed_rollback_discards_the_connection(monkeypatch):
+    raw = SnapshotConnection([1], fail_rollback=True)
+    pool = fake_pool(monkeypatch, raw)
+    pool.checkout().close()
+    assert raw.closed
+    assert pool._idle == [] and pool._open == 0
+
+
+@pytest.fixture
+def mysql_pool(mysql_params):
+    writer = mysql_connector.connect(autocommit=True, **mysql_params)
+    cursor = writer.cursor()
+    cursor.execute(f'DROP TABLE IF EXISTS {PROBE_TABLE}')
+    cursor.execute(f'CREATE TABLE {PROBE_TABLE} (id INT PRIMARY KEY) ENGINE=InnoDB')
+    pool = ConnectionPool(mysql_params, dict(DEFAULT_POOL_CONFIG, size=1))
+    yield pool, cursor
+    pool.close_all()
+    cursor.execute(f'DROP TABLE IF EXISTS {PROBE_TABLE}')
+    writer.close()
+
+
+def count_probe_rows(pool):
+    with pool.checkout() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f'SELECT COUNT(*) AS n FROM {PROBE_TABLE}')
+        count = cursor.fetchone()['n']
+        cursor.close()
+    return count
+
+
+def test_second_checkout_sees_a_committed_row(mysql_pool):
+    pool, writer = mysql_pool
+    assert count_probe_rows(pool) == 0
+    writer.execute(f'INSERT INTO {PROBE_TABLE} (id) VALUES (1)')
+    assert count_probe_rows(pool) == 1
@@ -0,0 +1,79 @@
+"""With the indexes.sql indexes in place, no report fetcher plans a full scan or an unexpected filesort."""
+
+import re
+import shutil
+
+import pytest
+
+from report_db import index_statements
+from report_plans import DEFAULT_WINDOW, check_plans
+from report_sqlite import connect_sqlite
+
+INDEX_NAMES = [re.match(r'CREATE INDEX (\w+)', statement).group(1) for statement in index_statements()]
+
+
+def first_ids(conn):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute('SELECT MIN(farm_id) AS farm_id FROM Farm')
+    farm_id = cursor.fetchone()['farm_id']
+    cursor.execute('SELECT MIN(product_id) AS product_id FROM RawProduct')
+    product_id = cursor.fetchone()['product_id']
+    cursor.close()
+    return [farm_id], product_id
+
+
+def assert_no_regressions(report):
+    # Filesorts and temporary tables some fetchers need are listed in PLAN_CASES; anything else is a regression.
+    regressions = {query['name']: query['unexpected'] for query in report['queries'] if query['unexpected']}
+    assert not regressions
+    full_scans = {query['name']: query['findings'] for query in report['queries']
+                  if any(finding.startswith('full scan') for finding in query['findings'])}
+    assert not full_scans
+    assert report['queries']
+
+
+def test_sqlite_plans(sqlite_db):
+    conn = connect_sqlite(sqlite_db)
+    try:
+        farm_ids, product_id = first_ids(conn)
+        report = check_plans(conn, 'sqlite', DEFAULT_WINDOW, farm_ids, product_id)
+    finally:
+        conn.close()
+    assert_no_regressions(report)
+
+
+def test_sqlite_plans_regress_without_the_indexes(sqlite_db, tmp_path):
+    path = tmp_path / 'unindexed.sqlite'
+    shutil.copy(sqlite_db, path)
+    conn = connect_sqlite(path)
+    try:
+        cursor = conn.cursor()
+        for name in INDEX_NAMES:
+            cursor.execute(f'DROP INDEX {name}')
+        cursor.close()
+        farm_ids, product_id = first_ids(conn)
+        report = check_plans(conn, 'sqlite', DEFAULT_WINDOW, farm_ids, product_id)
+    finally:
+        conn.close()
+    assert report['regressions']
+
+
+def test_mysql_plans(mysql_params):
+    import mysql.connector
+
+    conn = mysql.connector.connect(**mysql_params)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() '
+            f"AND INDEX_NAME IN ({', '.join(['%s'] * len(INDEX_NAMES))})",
+            tuple(INDEX_NAMES)
+        )
+        missing = set(INDEX_NAMES) - {row[0] for row in cursor.fetchall()}
+        cursor.close()
+        assert not missing, f'apply indexes.sql first; missing {sorted(missing)}'
+        farm_ids, product_id = first_ids(conn)
+        report = check_plans(conn, 'mysql', DEFAULT_WINDOW, farm_ids, product_id)
+    finally:
+        conn.close()
+    assert_no_regressions(report)
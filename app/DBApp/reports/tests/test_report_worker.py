@@ -0,0 +1,55 @@
+"""The resident worker survives malformed requests and ends every request's database transaction."""
+
+import io
+import json
+
+import pytest
+
+import report_db
+from report_worker import ReportWorker
+from test_report_db import SnapshotConnection, fake_pool
+
+
+@pytest.fixture(scope='module')
+def worker():
+    return ReportWorker()
+
+
+@pytest.mark.parametrize('line', ['[1]', '"x"', '3', 'null', '{"script": ["x"]}', '{"script": "farmer_report_pdf", "args": 5}'])
+def test_malformed_request_gets_an_error(worker, line):
+    response = json.loads(worker.handle_line(line))
+    assert response['ok'] is False
+    assert response['error']
+
+
+def test_stream_keeps_serving_after_a_malformed_request(worker):
+    writer = io.StringIO()
+    worker.serve_stream(io.StringIO('[1]\n{"id": 2, "op": "ping"}\n'), writer)
+    responses = [json.loads(line) for line in writer.getvalue().splitlines()]
+    assert [response['ok'] for response in responses] == [False, True]
+    assert responses[1]['id'] == 2
+
+
+class LeakyReport:
+    """A report that checks out a connection, reads through it and never closes it."""
+
+    def __init__(self):
+        self.conn = None
+
+    def run(self, argv):
+        self.conn = report_db.connect_db()
+        return {'rows': self.conn.read(), 'path': None}
+
+
+def test_request_ends_the_transaction_it_left_open(worker, monkeypatch):
+    rows = [1]
+    raw = SnapshotConnection(rows)
+    monkeypatch.setenv('REPORT_DB_BACKEND', 'mysql')
+    monkeypatch.setattr(report_db, '_pool', fake_pool(monkeypatch, raw))
+    monkeypatch.setitem(worker.modules, 'leaky_report', LeakyReport())
+    monkeypatch.setattr('report_worker.maybe_compact', lambda protect: None)
+    request = {'id': 1, 'script': 'leaky_report'}
+    assert worker.handle(request)['result']['rows'] == [1]
+    rows.append(2)
+    assert worker.handle(request)['result']['rows'] == [1, 2]
+    assert report_db._pool._idle == [raw]
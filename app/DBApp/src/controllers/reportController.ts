@@ -15,8 +15,10 @@ import {
   runFarmerOrderSalesReportPdf,
   runAdminLoyaltyReportPdf,
   runAdminProductivityReportPdf,
-  runAdminProductSalesReportPdf
+  runAdminProductSalesReportPdf,
+  runReportData
 } from '../services/reportRunner'
+import { describeReportJob, reportJobQueueWaitMs, reportJobs, type ReportJob } from '../services/reportJobs'
 
 const REPORT_DEFINITIONS = [
   {
@@ -202,59 +204,186 @@ export async function handleAdminSubscriptionReport(request: IncomingMessage, re
   }
 }
 
+const ADMIN_PDF_RUNNERS: Record<string, typeof runAdminLoyaltyReportPdf> = {
+  loyaltyEngagement: runAdminLoyaltyReportPdf,
+  farmProductivity: runAdminProductivityReportPdf,
+  productSales: runAdminProductSalesReportPdf
+}
+
+function submitAdminPdfJob(body: any): { job: ReportJob; coalesced: boolean } {
+  const { startDateFrom, startDateTo } = validateDateRange(body)
+  const reportId = body.reportId
+  if (!isReportFor(reportId, 'admin')) {
+    throw httpError(400, 'Unknown admin report.')
+  }
+  const runner = ADMIN_PDF_RUNNERS[reportId]
+  return reportJobs.submit('admin', reportId, { startDateFrom, startDateTo }, { reportClass: 'admin' }, (options) => runner({ startDateFrom, startDateTo }, options))
+}
+
+function submitFarmerPdfJob(farmId: number, body: any): { job: ReportJob; coalesced: boolean } {
+  const { startDateFrom, startDateTo } = validateDateRange(body)
+  const scope = `farmer:${farmId}`
+  const admission = { reportClass: 'farmer', farmId } as const
+  if (body.reportId === 'orderSales') {
+    return reportJobs.submit(scope, 'orderSales', { startDateFrom, startDateTo }, admission, (options) => runFarmerOrderSalesReportPdf({
+      farmId,
+      startDateFrom,
+      startDateTo
+    }, options))
+  }
+  const productId = normalizeProductId(body.productId)
+  return reportJobs.submit(scope, 'subscriptionClients', { startDateFrom, startDateTo, productId }, admission, (options) => runFarmerReportPdf({
+    farmId,
+    startDateFrom,
+    startDateTo,
+    productId
+  }, options))
+}
+
+function sendJobResult(response: ServerResponse, job: ReportJob): void {
+  if (job.status === 'failed') {
+    sendJson(response, job.errorStatus || 500, { error: job.error })
+    return
+  }
+  sendJson(response, 200, {
+    line: 'PDF report generated.',
+    url: job.url,
+    queueWaitMs: reportJobQueueWaitMs(job)
+  })
+}
+
+function sendJobAccepted(response: ServerResponse, job: ReportJob, coalesced: boolean, statusPath: string): void {
+  sendJson(response, 202, {
+    line: coalesced ? 'This report is already being generated; following that run.' : 'Report queued.',
+    job: describeReportJob(job),
+    statusUrl: `${statusPath}/${job.id}`
+  })
+}
+
+// Waits for the job, so identical concurrent requests still share one render.
 export async function handleAdminReportPdf(request: IncomingMessage, response: ServerResponse) {
   const session = await requireSession(request, response, 'admin')
   if (!session) return
   try {
     const body = await readBody<any>(request)
-    const { startDateFrom, startDateTo } = validateDateRange(body)
-    const reportId = body.reportId
-    if (reportId === 'loyaltyEngagement') {
-      const result = await runAdminLoyaltyReportPdf({
-        startDateFrom,
-        startDateTo
-      })
-      sendJson(response, 200, {
-        line: 'PDF report generated.',
-        url: result.publicUrl
-      })
+    const { job } = submitAdminPdfJob(body)
+    sendJobResult(response, await job.done)
+  } catch (error: any) {
+    if (error.statusCode) {
+      sendJson(response, error.statusCode, { error: error.message })
+      return
+    }
+    console.error('Admin report pdf error', error)
+    sendJson(response, 500, { error: 'Unable to generate the report.' })
+  }
+}
+
+export async function handleFarmerReportPdf(request: IncomingMessage, response: ServerResponse) {
+  const session = await requireSession(request, response, 'farmer')
+  if (!session) return
+  const farmId = Number(session.data.farmId)
+  try {
+    const body = await readBody<any>(request)
+    const { job } = submitFarmerPdfJob(farmId, body)
+    sendJobResult(response, await job.done)
+  } catch (error: any) {
+    if (error.statusCode) {
+      sendJson(response, error.statusCode, { error: error.message })
       return
+    }
+    console.error('Farmer report PDF error', error)
+    sendJson(response, 500, { error: 'Unable to generate the PDF report.' })
+  }
+}
+
+export async function handleAdminReportJobSubmit(request: IncomingMessage, response: ServerResponse) {
+  const session = await requireSession(request, response, 'admin')
+  if (!session) return
+  try {
+    const body = await readBody<any>(request)
+    const { job, coalesced } = submitAdminPdfJob(body)
+    sendJobAccepted(response, job, coalesced, '/api/admin/reports/jobs')
+  } catch (error: any) {
+    if (error.statusCode) {
+      sendJson(response, error.statusCode, { error: error.message })
       return
     }
-    if (reportId === 'farmProductivity') {
-      const result = await runAdminProductivityReportPdf({
-        startDateFrom,
-        startDateTo
-      })
-      sendJson(response, 200, {
-        line: 'PDF report generated.',
-        url: result.publicUrl
-      })
+    console.error('Admin report job error', error)
+    sendJson(response, 500, { error: 'Unable to queue the report.' })
+  }
+}
+
+export async function handleAdminReportJobStatus(request: IncomingMessage, response: ServerResponse, jobId: string) {
+  const session = await requireSession(request, response, 'admin')
+  if (!session) return
+  const job = reportJobs.get(jobId, 'admin')
+  if (!job) {
+    sendJson(response, 404, { error: 'Report job not found.' })
+    return
+  }
+  sendJson(response, 200, { job: describeReportJob(job) })
+}
+
+export async function handleFarmerReportJobSubmit(request: IncomingMessage, response: ServerResponse) {
+  const session = await requireSession(request, response, 'farmer')
+  if (!session) return
+  const farmId = Number(session.data.farmId)
+  try {
+    const body = await readBody<any>(request)
+    const { job, coalesced } = submitFarmerPdfJob(farmId, body)
+    sendJobAccepted(response, job, coalesced, '/api/farmer/reports/jobs')
+  } catch (error: any) {
+    if (error.statusCode) {
+      sendJson(response, error.statusCode, { error: error.message })
       return
     }
-    if (reportId === 'productSales') {
-      const result = await runAdminProductSalesReportPdf({
-        startDateFrom,
-        startDateTo
-      })
-      sendJson(response, 200, {
-        line: 'PDF report generated.',
-        url: result.publicUrl
-      })
+    console.error('Farmer report job error', error)
+    sendJson(response, 500, { error: 'Unable to queue the report.' })
+  }
+}
+
+export async function handleFarmerReportJobStatus(request: IncomingMessage, response: ServerResponse, jobId: string) {
+  const session = await requireSession(request, response, 'farmer')
+  if (!session) return
+  const job = reportJobs.get(jobId, `farmer:${Number(session.data.farmId)}`)
+  if (!job) {
+    sendJson(response, 404, { error: 'Report job not found.' })
+    return
+  }
+  sendJson(response, 200, { job: describeReportJob(job) })
+}
+
+function isReportFor(reportId: unknown, target: 'admin' | 'farmer'): reportId is string {
+  return REPORT_DEFINITIONS.some((report) => report.id === reportId && report.target === target)
+}
+
+export async function handleAdminReportData(request: IncomingMessage, response: ServerResponse) {
+  const session = await requireSession(request, response, 'admin')
+  if (!session) return
+  try {
+    const body = await readBody<any>(request)
+    const { startDateFrom, startDateTo } = validateDateRange(body)
+    if (!isReportFor(body.reportId, 'admin')) {
+      sendJson(response, 400, { error: 'Unknown admin report.' })
       return
     }
-    sendJson(response, 400, { error: 'Unknown admin report.' })
+    const result = await runReportData(body.reportId, { startDateFrom, startDateTo })
+    sendJson(response, 200, {
+      line: 'Report data ready.',
+      data: result ? result.data : null,
+      queueWaitMs: result ? result.queueWaitMs : 0
+    })
   } catch (error: any) {
     if (error.statusCode) {
       sendJson(response, error.statusCode, { error: error.message })
       return
     }
-    console.error('Admin report pdf error', error)
+    console.error('Admin report data error', error)
     sendJson(response, 500, { error: 'Unable to generate the report.' })
   }
 }
 
-export async function handleFarmerReportPdf(request: IncomingMessage, response: ServerResponse) {
+export async function handleFarmerReportData(request: IncomingMessage, response: ServerResponse) {
   const session = await requireSession(request, response, 'farmer')
   if (!session) return
   const farmId = Number(session.data.farmId)
@@ -262,35 +391,27 @@ export async function handleFarmerReportPdf(request: IncomingMessage, response:
     const body = await readBody<any>(request)
     const { startDateFrom, startDateTo } = validateDateRange(body)
     const reportId = body.reportId || 'subscriptionClients'
-    if (reportId === 'orderSales') {
-      const result = await runFarmerOrderSalesReportPdf({
-        farmId,
-        startDateFrom,
-        startDateTo
-      })
-      sendJson(response, 200, {
-        line: 'PDF report generated.',
-        url: result.publicUrl
-      })
+    if (!isReportFor(reportId, 'farmer')) {
+      sendJson(response, 400, { error: 'Unknown farmer report.' })
       return
     }
-    const productId = normalizeProductId(body.productId)
-    const result = await runFarmerReportPdf({
+    const result = await runReportData(reportId, {
       farmId,
       startDateFrom,
       startDateTo,
-      productId
+      productId: normalizeProductId(body.productId)
     })
     sendJson(response, 200, {
-      line: 'PDF report generated.',
-      url: result.publicUrl
+      line: 'Report data ready.',
+      data: result ? result.data : null,
+      queueWaitMs: result ? result.queueWaitMs : 0
     })
   } catch (error: any) {
     if (error.statusCode) {
       sendJson(response, error.statusCode, { error: error.message })
       return
     }
-    console.error('Farmer report PDF error', error)
-    sendJson(response, 500, { error: 'Unable to generate the PDF report.' })
+    console.error('Farmer report data error', error)
+    sendJson(response, 500, { error: 'Unable to generate the report.' })
   }
 }
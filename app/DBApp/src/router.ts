@@ -36,8 +36,14 @@ import {
   handleAdminReportsList,
   handleAdminSubscriptionReport,
   handleAdminReportPdf,
+  handleAdminReportData,
+  handleAdminReportJobSubmit,
+  handleAdminReportJobStatus,
   handleFarmerReportsList,
   handleFarmerReportPdf,
+  handleFarmerReportData,
+  handleFarmerReportJobSubmit,
+  handleFarmerReportJobStatus,
   handleFarmerSubscriptionReport
 } from './controllers/reportController'
 import { serveStatic } from './staticServer'
@@ -50,6 +56,8 @@ export async function routeRequest(request: IncomingMessage, response: ServerRes
   const farmerSubscriptionMatch = pathname.match(/^\/api\/farmer\/subscriptions\/(\d+)$/)
   const farmerOfferingMatch = pathname.match(/^\/api\/farmer\/offerings\/(\d+)$/)
   const customerSubscriptionMatch = pathname.match(/^\/api\/customer\/subscriptions\/(\d+)$/)
+  const adminReportJobMatch = pathname.match(/^\/api\/admin\/reports\/jobs\/([\w-]+)$/)
+  const farmerReportJobMatch = pathname.match(/^\/api\/farmer\/reports\/jobs\/([\w-]+)$/)
   const adminEntityMatch = pathname.match(/^\/api\/admin\/entities\/([^/]+)\/([^/]+)$/)
   const adminEntityName = adminEntityMatch ? decodeURIComponent(adminEntityMatch[1]) : null
   const adminEntityIdentifier = adminEntityMatch ? decodeURIComponent(adminEntityMatch[2]) : null
@@ -138,6 +146,18 @@ export async function routeRequest(request: IncomingMessage, response: ServerRes
       await handleAdminReportPdf(request, response)
       return
     }
+    if (request.method === 'POST' && pathname === '/api/admin/reports/jobs') {
+      await handleAdminReportJobSubmit(request, response)
+      return
+    }
+    if (request.method === 'GET' && adminReportJobMatch) {
+      await handleAdminReportJobStatus(request, response, adminReportJobMatch[1])
+      return
+    }
+    if (request.method === 'POST' && pathname === '/api/admin/reports/data') {
+      await handleAdminReportData(request, response)
+      return
+    }
     if (request.method === 'POST' && pathname === '/api/admin/entities') {
       await handleAdminEntityCreate(request, response)
       return
@@ -166,6 +186,18 @@ export async function routeRequest(request: IncomingMessage, response: ServerRes
       await handleFarmerReportPdf(request, response)
       return
     }
+    if (request.method === 'POST' && pathname === '/api/farmer/reports/jobs') {
+      await handleFarmerReportJobSubmit(request, response)
+      return
+    }
+    if (request.method === 'GET' && farmerReportJobMatch) {
+      await handleFarmerReportJobStatus(request, response, farmerReportJobMatch[1])
+      return
+    }
+    if (request.method === 'POST' && pathname === '/api/farmer/reports/data') {
+      await handleFarmerReportData(request, response)
+      return
+    }
     if (request.method === 'POST' && pathname === '/api/farmer/inventory') {
       await handleFarmerInventoryCreate(request, response)
       return
@@ -0,0 +1,54 @@
+import fs from 'fs'
+import path from 'path'
+
+// Read by app/DBApp/reports/report_retention.py, which evicts the least recently served reports.
+const REPORT_CACHE_DIR = process.env.REPORT_CACHE_DIR || path.resolve(__dirname, '..', '..', 'reports', '.cache')
+const REPORT_ACCESS_INDEX = path.join(REPORT_CACHE_DIR, 'report-access.json')
+const FLUSH_DELAY_MS = 5000
+// Files unused this long are evicted anyway, so their entries can go.
+const MAX_AGE_MS = (Number(process.env.REPORT_RETENTION_MAX_AGE_DAYS) || 7) * 24 * 60 * 60 * 1000
+
+export class ReportAccessIndex {
+  private served: Record<string, number> | null = null
+  private flushTimer: NodeJS.Timeout | null = null
+
+  constructor(private indexPath: string) {}
+
+  // Batched: one index write per few seconds however many downloads happen.
+  record(name: string): void {
+    this.load()[name] = Date.now()
+    if (!this.flushTimer) {
+      this.flushTimer = setTimeout(() => this.flush(), FLUSH_DELAY_MS)
+      this.flushTimer.unref()
+    }
+  }
+
+  private load(): Record<string, number> {
+    if (!this.served) {
+      try {
+        this.served = JSON.parse(fs.readFileSync(this.indexPath, 'utf8'))
+      } catch (error) {
+        this.served = {}
+      }
+    }
+    return this.served as Record<string, number>
+  }
+
+  private flush(): void {
+    this.flushTimer = null
+    const served = this.load()
+    const cutoff = Date.now() - MAX_AGE_MS
+    Object.keys(served).forEach((name) => {
+      if (served[name] < cutoff) {
+        delete served[name]
+      }
+    })
+    const temp = `${this.indexPath}.${process.pid}.tmp`
+    fs.promises.mkdir(path.dirname(this.indexPath), { recursive: true })
+      .then(() => fs.promises.writeFile(temp, JSON.stringify(served)))
+      .then(() => fs.promises.rename(temp, this.indexPath))
+      .catch((error) => console.error('Report access index write error', error))
+  }
+}
+
+export const reportAccess = new ReportAccessIndex(REPORT_ACCESS_INDEX)
@@ -0,0 +1,130 @@
+import crypto from 'crypto'
+import { reportWorker, type RunOptions } from './reportWorker'
+
+export type ReportJobStatus = 'queued' | 'running' | 'succeeded' | 'failed'
+
+export interface ReportJob {
+  id: string
+  reportId: string
+  scope: string
+  status: ReportJobStatus
+  createdAt: number
+  startedAt: number | null
+  finishedAt: number | null
+  url: string | null
+  error: string | null
+  // HTTP status for a failed job: the HttpError's own, or 500.
+  errorStatus: number | null
+  // Submissions served by this job, including the one that started it.
+  requests: number
+  done: Promise<ReportJob>
+}
+
+type ReportJobRunner = (options: RunOptions) => Promise<{ publicUrl: string }>
+
+// Finished jobs stay pollable for this long.
+const REPORT_JOB_TTL_MS = Number(process.env.REPORT_JOB_TTL_MS) || 10 * 60 * 1000
+
+export class ReportJobQueue {
+  private jobs = new Map<string, ReportJob>()
+  private inFlight = new Map<string, ReportJob>()
+
+  // scope keeps jobs private to whoever may see them (all admins, or one farm);
+  // identical requests within a scope share the job until it finishes.
+  // admission names the report class and farm; a new job is refused with a 429 when their queue is full.
+  submit(scope: string, reportId: string, params: Record<string, unknown>, admission: RunOptions, runner: ReportJobRunner): { job: ReportJob; coalesced: boolean } {
+    this.prune()
+    const key = JSON.stringify([scope, reportId, params])
+    const existing = this.inFlight.get(key)
+    if (existing) {
+      existing.requests += 1
+      return { job: existing, coalesced: true }
+    }
+    reportWorker.admit(admission)
+    const job: ReportJob = {
+      id: crypto.randomUUID(),
+      reportId,
+      scope,
+      status: 'queued',
+      createdAt: Date.now(),
+      startedAt: null,
+      finishedAt: null,
+      url: null,
+      error: null,
+      errorStatus: null,
+      requests: 1,
+      done: null as unknown as Promise<ReportJob>
+    }
+    job.done = runner({
+      ...admission,
+      onStart: () => {
+        job.status = 'running'
+        job.startedAt = Date.now()
+      }
+    })
+      .then((result) => {
+        job.status = 'succeeded'
+        job.url = result.publicUrl
+      })
+      .catch((error: any) => {
+        job.status = 'failed'
+        if (error.statusCode) {
+          job.error = error.message
+          job.errorStatus = error.statusCode
+          return
+        }
+        console.error(`Report job ${job.id} (${reportId}) failed`, error)
+        job.error = 'Unable to generate the report.'
+        job.errorStatus = 500
+      })
+      .then(() => {
+        job.finishedAt = Date.now()
+        this.inFlight.delete(key)
+        return job
+      })
+    this.jobs.set(job.id, job)
+    this.inFlight.set(key, job)
+    return { job, coalesced: false }
+  }
+
+  get(id: string, scope: string): ReportJob | null {
+    this.prune()
+    const job = this.jobs.get(id)
+    return job && job.scope === scope ? job : null
+  }
+
+  private prune(): void {
+    const cutoff = Date.now() - REPORT_JOB_TTL_MS
+    this.jobs.forEach((job, id) => {
+      if (job.finishedAt !== null && job.finishedAt < cutoff) {
+        this.jobs.delete(id)
+      }
+    })
+  }
+}
+
+function toISOTime(value: number | null): string | null {
+  return value === null ? null : new Date(value).toISOString()
+}
+
+// Time spent waiting for a report worker, so far if the job is still queued.
+export function reportJobQueueWaitMs(job: ReportJob): number {
+  return (job.startedAt ?? Date.now()) - job.createdAt
+}
+
+export function describeReportJob(job: ReportJob): Record<string, unknown> {
+  return {
+    id: job.id,
+    reportId: job.reportId,
+    status: job.status,
+    createdAt: toISOTime(job.createdAt),
+    startedAt: toISOTime(job.startedAt),
+    finishedAt: toISOTime(job.finishedAt),
+    queueWaitMs: reportJobQueueWaitMs(job),
+    url: job.url,
+    error: job.error,
+    requests: job.requests
+  }
+}
+
+export const reportJobs = new ReportJobQueue()
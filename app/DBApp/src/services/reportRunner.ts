@@ -1,5 +1,4 @@
-import { spawn } from 'child_process'
-import path from 'path'
+import { reportWorker, type RunOptions } from './reportWorker'
 
 interface FarmerReportPdfPayload {
   farmId: number
@@ -9,44 +8,70 @@ interface FarmerReportPdfPayload {
   outputPath?: string
 }
 
-const FARMER_PDF_SCRIPT = path.resolve(__dirname, '..', '..', 'reports', 'farmer_report_pdf.py')
-const FARMER_ORDER_PDF_SCRIPT = path.resolve(__dirname, '..', '..', 'reports', 'farmer_orders_report_pdf.py')
-const ADMIN_LOYALTY_PDF_SCRIPT = path.resolve(__dirname, '..', '..', 'reports', 'admin_loyalty_report_pdf.py')
-const ADMIN_PRODUCTIVITY_PDF_SCRIPT = path.resolve(__dirname, '..', '..', 'reports', 'admin_productivity_report_pdf.py')
-const ADMIN_PRODUCT_SALES_PDF_SCRIPT = path.resolve(__dirname, '..', '..', 'reports', 'admin_product_sales_report_pdf.py')
+export interface ReportFile {
+  filePath: string
+  publicUrl: string
+  // Time the run waited for a report worker before it started.
+  queueWaitMs: number
+}
+
+const FARMER_PDF_SCRIPT = 'farmer_report_pdf'
+const FARMER_ORDER_PDF_SCRIPT = 'farmer_orders_report_pdf'
+const ADMIN_LOYALTY_PDF_SCRIPT = 'admin_loyalty_report_pdf'
+const ADMIN_PRODUCTIVITY_PDF_SCRIPT = 'admin_productivity_report_pdf'
+const ADMIN_PRODUCT_SALES_PDF_SCRIPT = 'admin_product_sales_report_pdf'
+
+const REPORT_DATA_SCRIPTS: Record<string, string> = {
+  subscriptionClients: FARMER_PDF_SCRIPT,
+  orderSales: FARMER_ORDER_PDF_SCRIPT,
+  loyaltyEngagement: ADMIN_LOYALTY_PDF_SCRIPT,
+  farmProductivity: ADMIN_PRODUCTIVITY_PDF_SCRIPT,
+  productSales: ADMIN_PRODUCT_SALES_PDF_SCRIPT
+}
+
+// REPORT_PROFILE=1 makes every run write a cProfile dump next to its output.
+const REPORT_PROFILE = process.env.REPORT_PROFILE === '1'
+const REPORT_SLOW_LOG_MS = Number(process.env.REPORT_SLOW_LOG_MS ?? 5000)
 
-function spawnPythonScript(scriptPath: string, args: string[], input?: string): Promise<string> {
-  const pythonBinary = process.env.PYTHON_BIN || 'python3'
-  return new Promise((resolve, reject) => {
-    const child = spawn(pythonBinary, [scriptPath, ...args], {
-      stdio: ['pipe', 'pipe', 'pipe']
-    })
-    let stdout = ''
-    let stderr = ''
-    child.stdout.on('data', (chunk: Buffer) => {
-      stdout += chunk.toString()
-    })
-    child.stderr.on('data', (chunk: Buffer) => {
-      stderr += chunk.toString()
-    })
-    child.on('error', (error) => {
-      reject(error)
-    })
-    child.on('close', (code) => {
-      if (code !== 0) {
-        reject(new Error(`Report generator failed with code ${code}. ${stderr || ''}`.trim()))
-        return
-      }
-      resolve(stdout)
-    })
-    if (input) {
-      child.stdin.write(input)
+function formatPhases(phases: Record<string, { wallSeconds: number; cpuSeconds: number }>): string {
+  return Object.entries(phases)
+    .map(([name, phase]) => `${name}=${Math.round(phase.wallSeconds * 1000)}ms/${Math.round(phase.cpuSeconds * 1000)}ms cpu`)
+    .join(' ')
+}
+
+async function runTimedReport(script: string, args: string[], options: RunOptions = {}): Promise<Record<string, any>> {
+  let queueWaitMs = 0
+  const output = await reportWorker.run(script, REPORT_PROFILE ? [...args, '--profile'] : args, {
+    ...options,
+    onStart: (waitMs) => {
+      queueWaitMs = waitMs
+      options.onStart?.(waitMs)
     }
-    child.stdin.end()
   })
+  output.queueWaitMs = queueWaitMs
+  const timings = output.timings
+  if (timings && timings.wallSeconds * 1000 >= REPORT_SLOW_LOG_MS) {
+    console.warn(`Slow report ${script} ${args.join(' ')}: ${Math.round(timings.wallSeconds * 1000)}ms ${formatPhases(timings.phases)} rows=${JSON.stringify(timings.rows)} queued=${queueWaitMs}ms`)
+  }
+  if (output.profile) {
+    console.log(`Report profile for ${script}: ${output.profile.path} (peak traced memory ${output.profile.peakMemoryBytes} bytes)`)
+  }
+  return output
 }
 
-export async function runFarmerReportPdf(payload: FarmerReportPdfPayload): Promise<{ filePath: string; publicUrl: string }> {
+async function runReportScript(script: string, args: string[], label: string, options: RunOptions): Promise<ReportFile> {
+  const output = await runTimedReport(script, args, options)
+  if (!output.publicUrl || !output.path) {
+    throw new Error(`Unable to parse ${label} output. Report generator did not return file metadata.`)
+  }
+  return {
+    filePath: String(output.path),
+    publicUrl: String(output.publicUrl),
+    queueWaitMs: output.queueWaitMs
+  }
+}
+
+export async function runFarmerReportPdf(payload: FarmerReportPdfPayload, options: RunOptions = {}): Promise<ReportFile> {
   const args: string[] = [
     '--farm-id',
     payload.farmId.toString(),
@@ -61,22 +86,10 @@ export async function runFarmerReportPdf(payload: FarmerReportPdfPayload): Promi
   if (payload.outputPath) {
     args.push('--output', payload.outputPath)
   }
-  const stdout = await spawnPythonScript(FARMER_PDF_SCRIPT, args)
-  try {
-    const output = stdout ? JSON.parse(stdout) : {}
-    if (!output.publicUrl || !output.path) {
-      throw new Error('Report generator did not return file metadata.')
-    }
-    return {
-      filePath: String(output.path),
-      publicUrl: String(output.publicUrl)
-    }
-  } catch (error) {
-    throw new Error(`Unable to parse PDF report output. ${(error as Error).message}`)
-  }
+  return runReportScript(FARMER_PDF_SCRIPT, args, 'PDF report', { ...options, reportClass: 'farmer', farmId: payload.farmId })
 }
 
-export async function runFarmerOrderSalesReportPdf(payload: { farmId: number; startDateFrom: string; startDateTo: string; outputPath?: string }): Promise<{ filePath: string; publicUrl: string }> {
+export async function runFarmerOrderSalesReportPdf(payload: { farmId: number; startDateFrom: string; startDateTo: string; outputPath?: string }, options: RunOptions = {}): Promise<ReportFile> {
   const args: string[] = [
     '--farm-id',
     payload.farmId.toString(),
@@ -88,77 +101,48 @@ export async function runFarmerOrderSalesReportPdf(payload: { farmId: number; st
   if (payload.outputPath) {
     args.push('--output', payload.outputPath)
   }
-  const stdout = await spawnPythonScript(FARMER_ORDER_PDF_SCRIPT, args)
-  try {
-    const output = stdout ? JSON.parse(stdout) : {}
-    if (!output.publicUrl || !output.path) {
-      throw new Error('Report generator did not return file metadata.')
-    }
-    return {
-      filePath: String(output.path),
-      publicUrl: String(output.publicUrl)
-    }
-  } catch (error) {
-    throw new Error(`Unable to parse order report output. ${(error as Error).message}`)
-  }
+  return runReportScript(FARMER_ORDER_PDF_SCRIPT, args, 'order report', { ...options, reportClass: 'farmer', farmId: payload.farmId })
 }
 
-export async function runAdminLoyaltyReportPdf(payload: { startDateFrom: string; startDateTo: string; outputPath?: string }): Promise<{ filePath: string; publicUrl: string }> {
+export async function runAdminLoyaltyReportPdf(payload: { startDateFrom: string; startDateTo: string; outputPath?: string }, options: RunOptions = {}): Promise<ReportFile> {
   const args = ['--from', payload.startDateFrom, '--to', payload.startDateTo]
   if (payload.outputPath) {
     args.push('--output', payload.outputPath)
   }
-  const stdout = await spawnPythonScript(ADMIN_LOYALTY_PDF_SCRIPT, args)
-  try {
-    const output = stdout ? JSON.parse(stdout) : {}
-    if (!output.publicUrl || !output.path) {
-      throw new Error('Report generator did not return file metadata.')
-    }
-    return {
-      filePath: String(output.path),
-      publicUrl: String(output.publicUrl)
-    }
-  } catch (error) {
-    throw new Error(`Unable to parse admin loyalty report output. ${(error as Error).message}`)
-  }
+  return runReportScript(ADMIN_LOYALTY_PDF_SCRIPT, args, 'admin loyalty report', { ...options, reportClass: 'admin' })
 }
 
-export async function runAdminProductivityReportPdf(payload: { startDateFrom: string; startDateTo: string; outputPath?: string }): Promise<{ filePath: string; publicUrl: string }> {
+export async function runAdminProductivityReportPdf(payload: { startDateFrom: string; startDateTo: string; outputPath?: string }, options: RunOptions = {}): Promise<ReportFile> {
   const args = ['--from', payload.startDateFrom, '--to', payload.startDateTo]
   if (payload.outputPath) {
     args.push('--output', payload.outputPath)
   }
-  const stdout = await spawnPythonScript(ADMIN_PRODUCTIVITY_PDF_SCRIPT, args)
-  try {
-    const output = stdout ? JSON.parse(stdout) : {}
-    if (!output.publicUrl || !output.path) {
-      throw new Error('Report generator did not return file metadata.')
-    }
-    return {
-      filePath: String(output.path),
-      publicUrl: String(output.publicUrl)
-    }
-  } catch (error) {
-    throw new Error(`Unable to parse admin productivity report output. ${(error as Error).message}`)
-  }
+  return runReportScript(ADMIN_PRODUCTIVITY_PDF_SCRIPT, args, 'admin productivity report', { ...options, reportClass: 'admin' })
 }
 
-export async function runAdminProductSalesReportPdf(payload: { startDateFrom: string; startDateTo: string; outputPath?: string }): Promise<{ filePath: string; publicUrl: string }> {
+export async function runAdminProductSalesReportPdf(payload: { startDateFrom: string; startDateTo: string; outputPath?: string }, options: RunOptions = {}): Promise<ReportFile> {
   const args = ['--from', payload.startDateFrom, '--to', payload.startDateTo]
   if (payload.outputPath) {
     args.push('--output', payload.outputPath)
   }
-  const stdout = await spawnPythonScript(ADMIN_PRODUCT_SALES_PDF_SCRIPT, args)
-  try {
-    const output = stdout ? JSON.parse(stdout) : {}
-    if (!output.publicUrl || !output.path) {
-      throw new Error('Report generator did not return file metadata.')
-    }
-    return {
-      filePath: String(output.path),
-      publicUrl: String(output.publicUrl)
-    }
-  } catch (error) {
-    throw new Error(`Unable to parse admin product sales report output. ${(error as Error).message}`)
+  return runReportScript(ADMIN_PRODUCT_SALES_PDF_SCRIPT, args, 'admin product sales report', { ...options, reportClass: 'admin' })
+}
+
+export async function runReportData(reportId: string, payload: { farmId?: number; startDateFrom: string; startDateTo: string; productId?: number | null }): Promise<{ data: Record<string, any>; queueWaitMs: number } | null> {
+  const script = REPORT_DATA_SCRIPTS[reportId]
+  if (!script) {
+    return null
+  }
+  const args: string[] = ['--from', payload.startDateFrom, '--to', payload.startDateTo, '--format', 'json']
+  if (payload.farmId) {
+    args.push('--farm-id', payload.farmId.toString())
+  }
+  if (payload.productId && script === FARMER_PDF_SCRIPT) {
+    args.push('--product-id', payload.productId.toString())
+  }
+  const output = await runTimedReport(script, args, payload.farmId ? { reportClass: 'farmer', farmId: payload.farmId } : { reportClass: 'admin' })
+  if (!output.data) {
+    throw new Error('Report generator did not return report data.')
   }
+  return { data: output.data, queueWaitMs: output.queueWaitMs }
 }
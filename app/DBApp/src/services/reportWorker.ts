@@ -0,0 +1,262 @@
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process'
+import os from 'os'
+import path from 'path'
+import readline from 'readline'
+import { httpError } from '../lib/errors'
+
+const WORKER_SCRIPT = path.resolve(__dirname, '..', '..', 'reports', 'report_worker.py')
+
+function envCount(name: string, fallback: number): number {
+  return Math.max(1, Math.floor(Number(process.env[name]) || fallback))
+}
+
+// Each worker is a resident interpreter with matplotlib loaded, so the pool stays small;
+// requests beyond it wait their turn instead of starting more processes.
+const REPORT_WORKERS = envCount('REPORT_WORKERS', Math.min(2, os.cpus().length))
+// Admin runs leave a worker free when they can, so farmer reports never wait behind a long admin window.
+const REPORT_ADMIN_WORKERS = Math.min(envCount('REPORT_ADMIN_WORKERS', REPORT_WORKERS - 1), REPORT_WORKERS)
+const REPORT_FARMER_WORKERS = Math.min(envCount('REPORT_FARMER_WORKERS', REPORT_WORKERS), REPORT_WORKERS)
+// Waiting runs allowed per class, and per farm within the farmer class; more are rejected with a 429.
+const REPORT_QUEUE_LIMIT = envCount('REPORT_QUEUE_LIMIT', 20)
+const REPORT_FARM_QUEUE_LIMIT = envCount('REPORT_FARM_QUEUE_LIMIT', 2)
+// An admin run that has waited this long takes the next free worker ahead of farmer runs.
+const REPORT_ADMIN_MAX_WAIT_MS = envCount('REPORT_ADMIN_MAX_WAIT_MS', 30000)
+
+interface WorkerResponse {
+  id: number | null
+  ok: boolean
+  result?: Record<string, any>
+  error?: string
+}
+
+interface PendingRequest {
+  resolve: (result: Record<string, any>) => void
+  reject: (error: Error) => void
+}
+
+export type ReportClass = 'admin' | 'farmer'
+
+export interface RunOptions {
+  // Defaults to admin, the batch class.
+  reportClass?: ReportClass
+  // Farmer runs queue per farm, and farms take turns.
+  farmId?: number
+  // Called when a worker picks the request up, with the time it spent queued.
+  onStart?: (queueWaitMs: number) => void
+}
+
+interface QueuedRun extends PendingRequest {
+  script: string
+  args: string[]
+  options: RunOptions
+  enqueuedAt: number
+}
+
+interface ReportLane {
+  limit: number
+  running: number
+  queued: number
+  // One FIFO per farm (admin runs share one); the Map's order is the round-robin order.
+  tenants: Map<string, QueuedRun[]>
+}
+
+export interface ReportPoolLimits {
+  workers: number
+  adminWorkers: number
+  farmerWorkers: number
+  queueLimit: number
+  farmQueueLimit: number
+  adminMaxWaitMs: number
+}
+
+// Farmer reports are short and someone is waiting on them, so a free worker takes one of those first,
+// unless an admin run has waited past adminMaxWaitMs.
+const LANE_ORDER: ReportClass[] = ['farmer', 'admin']
+
+export class ReportWorker {
+  private child: ChildProcessWithoutNullStreams | null = null
+  private pending = new Map<number, PendingRequest>()
+  private nextId = 1
+  private stderrTail = ''
+
+  run(script: string, args: string[]): Promise<Record<string, any>> {
+    const child = this.ensureStarted()
+    const id = this.nextId++
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject })
+      child.stdin.write(`${JSON.stringify({ id, script, args })}\n`)
+    })
+  }
+
+  stop(): void {
+    if (this.child) {
+      this.child.stdin.end()
+      this.child = null
+    }
+  }
+
+  private ensureStarted(): ChildProcessWithoutNullStreams {
+    if (this.child) {
+      return this.child
+    }
+    const pythonBinary = process.env.PYTHON_BIN || 'python3'
+    const child = spawn(pythonBinary, [WORKER_SCRIPT], {
+      stdio: ['pipe', 'pipe', 'pipe']
+    })
+    this.child = child
+    this.stderrTail = ''
+    readline.createInterface({ input: child.stdout }).on('line', (line) => this.handleLine(line))
+    child.stderr.on('data', (chunk: Buffer) => {
+      // Keep only the tail so a chatty worker cannot grow this without bound.
+      this.stderrTail = (this.stderrTail + chunk.toString()).slice(-4000)
+    })
+    child.stdin.on('error', (error) => {
+      // The 'close' handler rejects pending requests; this only keeps EPIPE from crashing the server.
+      console.error('Report worker stdin error', error)
+    })
+    child.on('error', (error) => this.handleExit(child, error))
+    child.on('close', (code) => {
+      this.handleExit(child, new Error(`Report worker exited with code ${code}. ${this.stderrTail}`.trim()))
+    })
+    return child
+  }
+
+  private handleLine(line: string): void {
+    let message: WorkerResponse
+    try {
+      message = JSON.parse(line)
+    } catch (error) {
+      console.error('Report worker sent malformed output', line)
+      return
+    }
+    const pending = message.id === null ? undefined : this.pending.get(message.id)
+    if (!pending) {
+      console.error('Report worker response without a pending request', message)
+      return
+    }
+    this.pending.delete(message.id as number)
+    if (message.ok) {
+      pending.resolve(message.result || {})
+    } else {
+      pending.reject(new Error(`Report generator failed. ${message.error || ''}`.trim()))
+    }
+  }
+
+  private handleExit(child: ChildProcessWithoutNullStreams, error: Error): void {
+    if (this.child !== child) {
+      return
+    }
+    this.child = null
+    const pending = Array.from(this.pending.values())
+    this.pending.clear()
+    pending.forEach((request) => request.reject(error))
+  }
+}
+
+export class ReportWorkerPool {
+  private workers: ReportWorker[]
+  private idle: ReportWorker[]
+  private lanes: Record<ReportClass, ReportLane>
+
+  constructor(private limits: ReportPoolLimits) {
+    this.workers = Array.from({ length: limits.workers }, () => new ReportWorker())
+    this.idle = [...this.workers]
+    this.lanes = {
+      admin: { limit: limits.adminWorkers, running: 0, queued: 0, tenants: new Map() },
+      farmer: { limit: limits.farmerWorkers, running: 0, queued: 0, tenants: new Map() }
+    }
+  }
+
+  get size(): number {
+    return this.workers.length
+  }
+
+  get queued(): number {
+    return this.lanes.admin.queued + this.lanes.farmer.queued
+  }
+
+  // Throws a 429 when the run would have to wait in a queue that is already full.
+  admit(options: RunOptions = {}): void {
+    const lane = this.lanes[options.reportClass || 'admin']
+    if (lane.queued >= this.limits.queueLimit) {
+      throw httpError(429, 'Too many reports are waiting to run. Try again in a minute.')
+    }
+    const waiting = lane.tenants.get(tenantKey(options))
+    if (options.farmId !== undefined && waiting && waiting.length >= this.limits.farmQueueLimit) {
+      throw httpError(429, 'Your farm already has reports waiting to run. Try again once they finish.')
+    }
+  }
+
+  run(script: string, args: string[], options: RunOptions = {}): Promise<Record<string, any>> {
+    return new Promise((resolve, reject) => {
+      this.admit(options)
+      const lane = this.lanes[options.reportClass || 'admin']
+      const key = tenantKey(options)
+      const request: QueuedRun = { script, args, options, enqueuedAt: Date.now(), resolve, reject }
+      const queue = lane.tenants.get(key)
+      if (queue) {
+        queue.push(request)
+      } else {
+        lane.tenants.set(key, [request])
+      }
+      lane.queued += 1
+      this.dispatch()
+    })
+  }
+
+  stop(): void {
+    this.workers.forEach((worker) => worker.stop())
+  }
+
+  private dispatch(): void {
+    while (this.idle.length > 0) {
+      const ready = LANE_ORDER.map((name) => this.lanes[name])
+        .filter((candidate) => candidate.queued > 0 && candidate.running < candidate.limit)
+      const admin = this.lanes.admin
+      const lane = ready.includes(admin) && this.oldestWaitMs(admin) >= this.limits.adminMaxWaitMs ? admin : ready[0]
+      if (!lane) {
+        return
+      }
+      const [key, queue] = lane.tenants.entries().next().value as [string, QueuedRun[]]
+      const request = queue.shift() as QueuedRun
+      // Re-inserting moves the farm behind every other waiting farm.
+      lane.tenants.delete(key)
+      if (queue.length > 0) {
+        lane.tenants.set(key, queue)
+      }
+      lane.queued -= 1
+      lane.running += 1
+      // Most recently used first: a light load keeps reusing one warm interpreter.
+      const worker = this.idle.pop() as ReportWorker
+      request.options.onStart?.(Date.now() - request.enqueuedAt)
+      worker.run(request.script, request.args)
+        .then(request.resolve, request.reject)
+        .finally(() => {
+          lane.running -= 1
+          this.idle.push(worker)
+          this.dispatch()
+        })
+    }
+  }
+
+  private oldestWaitMs(lane: ReportLane): number {
+    let oldest = Infinity
+    lane.tenants.forEach((queue) => {
+      oldest = Math.min(oldest, queue[0].enqueuedAt)
+    })
+    return Date.now() - oldest
+  }
+}
+
+function tenantKey(options: RunOptions): string {
+  return options.farmId === undefined ? '' : String(options.farmId)
+}
+
+export const reportWorker = new ReportWorkerPool({
+  workers: REPORT_WORKERS,
+  adminWorkers: REPORT_ADMIN_WORKERS,
+  farmerWorkers: REPORT_FARMER_WORKERS,
+  queueLimit: REPORT_QUEUE_LIMIT,
+  farmQueueLimit: REPORT_FARM_QUEUE_LIMIT,
+  adminMaxWaitMs: REPORT_ADMIN_MAX_WAIT_MS
+})
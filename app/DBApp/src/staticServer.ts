@@ -2,6 +2,7 @@ import { ServerResponse } from 'http'
 import path from 'path'
 import fs from 'fs/promises'
 import { FRONTEND_DIR, MIME_TYPES } from './config'
+import { reportAccess } from './services/reportAccess'
 
 export async function serveStatic(pathname: string, response: ServerResponse): Promise<void> {
   let relativePath = pathname
@@ -32,6 +33,9 @@ export async function serveStatic(pathname: string, response: ServerResponse): P
       'Content-Length': data.length
     })
     response.end(data)
+    if (path.dirname(safePath) === 'reports') {
+      reportAccess.record(path.basename(safePath))
+    }
   } catch (error: any) {
     if (error.code === 'ENOENT') {
       response.writeHead(404, { 'Content-Type': 'text/plain; charset=UTF-8' })
@@ -1,7 +1,8 @@
 const OVERVIEW_ENDPOINT = '/api/admin/overview'
 const ENTITY_ENDPOINT = '/api/admin/entities'
 const ADMIN_REPORTS_ENDPOINT = '/api/admin/reports'
-const ADMIN_REPORT_PDF_ENDPOINT = '/api/admin/reports/pdf'
+const ADMIN_REPORT_JOBS_ENDPOINT = '/api/admin/reports/jobs'
+const REPORT_JOB_POLL_MS = 1000
 const LOGIN_REDIRECT = '/login.html#admin'
 
 const selectors = {
@@ -306,13 +307,22 @@ async function submitReportForm(event) {
     startDateTo: toValue
   }
   try {
-    setReportAlert('Generating report…', true)
-    const data = await fetchJson(ADMIN_REPORT_PDF_ENDPOINT, {
+    setReportAlert('Queuing report…', true)
+    const data = await fetchJson(ADMIN_REPORT_JOBS_ENDPOINT, {
       method: 'POST',
       body: JSON.stringify(payload)
     })
-    if (data?.url) {
-      window.location.href = data.url
+    if (!data) return
+    const job = await waitForReportJob(data.job, (current) => {
+      setReportAlert(current.status === 'queued' ? 'Waiting for a free report worker…' : 'Generating report…', true)
+    })
+    if (!job) return
+    if (job.status === 'failed') {
+      setReportAlert(job.error || 'Unable to generate the report.', false)
+      return
+    }
+    if (job.url) {
+      window.location.href = job.url
       return
     }
     setReportAlert('Report generated but no download link received.', false)
@@ -322,6 +332,19 @@ async function submitReportForm(event) {
   }
 }
 
+// Polls until the job finishes; resolves null if the session expired meanwhile.
+async function waitForReportJob(job, onProgress) {
+  let current = job
+  while (current.status === 'queued' || current.status === 'running') {
+    onProgress(current)
+    await new Promise((resolve) => setTimeout(resolve, REPORT_JOB_POLL_MS))
+    const data = await fetchJson(`${ADMIN_REPORT_JOBS_ENDPOINT}/${encodeURIComponent(current.id)}`)
+    if (!data) return null
+    current = data.job
+  }
+  return current
+}
+
 function setEntityStatus(entity, message, isSuccess = false, { persist = true } = {}) {
   const el = document.querySelector(`[data-entity-status="${entity}"]`)
   if (!el) return
@@ -3,7 +3,8 @@ const INVENTORY_ENDPOINT = '/api/farmer/inventory'
 const FULFILLMENT_ENDPOINT = '/api/farmer/fulfillments'
 const OFFERINGS_ENDPOINT = '/api/farmer/offerings'
 const REPORT_CATALOG_ENDPOINT = '/api/farmer/reports'
-const REPORT_PDF_ENDPOINT = '/api/farmer/reports/pdf'
+const REPORT_JOBS_ENDPOINT = '/api/farmer/reports/jobs'
+const REPORT_JOB_POLL_MS = 1000
 const LOGIN_FALLBACK = '/login.html#farmer'
 
 const selectors = {
@@ -241,14 +242,23 @@ async function submitReportForm(event) {
     startDateTo: toValue
   }
   try {
-    setFeedback('reports', 'Generating report…', true)
-    const data = await fetchJson(REPORT_PDF_ENDPOINT, {
+    setFeedback('reports', 'Queuing report…', true)
+    const data = await fetchJson(REPORT_JOBS_ENDPOINT, {
       method: 'POST',
       body: JSON.stringify(payload)
     })
-    if (data?.url) {
+    if (!data) return
+    const job = await waitForReportJob(data.job, (current) => {
+      setFeedback('reports', current.status === 'queued' ? 'Waiting for a free report worker…' : 'Generating report…', true)
+    })
+    if (!job) return
+    if (job.status === 'failed') {
+      setFeedback('reports', job.error || 'Unable to generate the report.', false)
+      return
+    }
+    if (job.url) {
       setFeedback('reports', 'Opening PDF…', true)
-      window.location.href = data.url
+      window.location.href = job.url
       return
     }
     setFeedback('reports', 'Report generated but no download link provided.', false)
@@ -258,6 +268,19 @@ async function submitReportForm(event) {
   }
 }
 
+// Polls until the job finishes; resolves null if the session expired meanwhile.
+async function waitForReportJob(job, onProgress) {
+  let current = job
+  while (current.status === 'queued' || current.status === 'running') {
+    onProgress(current)
+    await new Promise((resolve) => setTimeout(resolve, REPORT_JOB_POLL_MS))
+    const data = await fetchJson(`${REPORT_JOBS_ENDPOINT}/${encodeURIComponent(current.id)}`)
+    if (!data) return null
+    current = data.job
+  }
+  return current
+}
+
 function hasUsableOptions(select) {
   if (!select) return false
   return Array.from(select.options || []).some((option) => option.value)
@@ -1,420 +1,578 @@
-from datetime import date, timedelta
+"""Generate dummy data for kungfoodpanda_db as batched INSERT statements.
+
+Rows are streamed straight to the output, so large scale factors (millions of
+Orders rows for report load tests) run in constant memory:
+
+    python3 generate_dummy.py > dummy.sql
+    python3 generate_dummy.py --scale 1000 --batch-size 5000 -o load.sql.gz
+
+With --format tsv the output is a directory holding one tab-separated file per
+table and a load.sql that bulk-loads them with LOAD DATA LOCAL INFILE:
+
+    python3 generate_dummy.py --scale 1000 --format tsv -o /tmp/kfp-load
+    mysql --local-infile=1 -u <user> -p < /tmp/kfp-load/load.sql
+
+--shards N splits Orders generation into N contiguous runs of subscriptions,
+each with its own seed derived from --seed and a pre-assigned order_id range,
+rendered by --jobs worker processes. Output is reproducible for a given seed
+and shard count; --shards 1 (the default) keeps the single global sequence.
+"""
+
+import argparse
+import gzip
+import os
 import random
-from collections import Counter
-
-
-def generate_sql():
-    random.seed(42)
-
-    start_date = date(2025, 5, 24)
-    end_date = date(2025, 11, 24)
-
-    def sql_value(val):
-        if val is None:
-            return "NULL"
-        if isinstance(val, str):
-            return "'" + val.replace("'", "''") + "'"
-        if isinstance(val, date):
-            return "'" + val.isoformat() + "'"
-        if isinstance(val, float):
-            return f"{val:.2f}"
-        return str(val)
-
-    lines = []
-    lines.append("-- Dummy data for kungfoodpanda_db")
-    lines.append("USE kungfoodpanda_db;")
-    lines.append("")
-
-    def insert_block(table, columns, rows):
-        if not rows:
-            return
-        lines.append(f"INSERT INTO {table} ({', '.join(columns)}) VALUES")
-        row_strs = []
-        for row in rows:
-            vals = [sql_value(row[col]) for col in columns]
-            row_strs.append("  (" + ", ".join(vals) + ")")
-        lines.append(",\n".join(row_strs) + ";")
-        lines.append("")
-
-    # ---------- Location ----------
-    locations = []
-    for loc_id in range(1, 11):
-        locations.append(
-            {
-                "location_id": loc_id,
-                "continent": "Asia",
-                "country": "Philippines",
-                "state": "Metro Manila",
-                "city": f"City {loc_id}",
-                "street": f"{loc_id} Taft Avenue",
-            }
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+
+PRODUCT_NAMES = [
+    ("Huitla", "Fungus", "crops"),
+    ("Moss", "Seaweed", "algal beds"),
+    ("F.Limes", "Fruit", "trees"),
+    ("Chapul", "Insect", "colonies"),
+    ("Doenjang", "Fermented", "vats"),
+    ("Bottarga", "Animal Product", "fish"),
+    ("Oca", "Root Vegetable", "fields"),
+    ("Onit", "Floral", "vines"),
+]
+GRADES = ["SSR", "SR", "R", "UC", "C"]
+
+# (company_name, first_name, last_name, honorific, email domain)
+CLIENTS = [
+    ("Foodies Inc.", "Alice", "Smith", "Ms.", "foodies.com"),
+    ("Gourmet Delights", "Bob", "Johnson", "Mr.", "gourmet.com"),
+    ("Delicious Eats", "Charlie", "Williams", "Mrs.", "delicious.com"),
+    ("Tasty Treats", "Diana", "Brown", "Ms.", "tasty.com"),
+    ("Yummy Bites", "Ethan", "Jones", "Mr.", "yummy.com"),
+    ("Savory Snacks", "Fiona", "Garcia", "Mrs.", "savory.com"),
+    ("Culinary Creations", "George", "Miller", "Mr.", "culinary.com"),
+    ("Epicurean Delights", "Hannah", "Davis", "Ms.", "epicurean.com"),
+    ("Flavorful Foods", "Ian", "Rodriguez", "Mr.", "flavorful.com"),
+    ("Delectable Dishes", "Julia", "Martinez", "Mrs.", "delectable.com"),
+]
+
+FARM_NAMES = [
+    "Green Valley Farms",
+    "Sunnybrook Agriculture",
+    "Riverbend Produce",
+    "Golden Harvest Farms",
+    "Meadowview Organics",
+    "Hilltop Gardens",
+    "Cedarwood Farms",
+    "Willow Creek Produce",
+    "Maple Leaf Agriculture",
+    "Pine Hill Farms",
+]
+
+LOCATION_COLUMNS = ["location_id", "continent", "country", "state", "city", "street"]
+RAW_PRODUCT_COLUMNS = [
+    "product_id",
+    "product_name",
+    "product_type",
+    "grade",
+    "start_season",
+    "end_season",
+]
+CLIENT_COLUMNS = [
+    "client_id",
+    "company_name",
+    "first_name",
+    "last_name",
+    "honorific",
+    "email",
+    "location_id",
+    "loyalty_points",
+]
+FARM_COLUMNS = ["farm_id", "name", "location_id"]
+FARM_PRODUCT_COLUMNS = ["product_id", "farm_id", "population", "population_unit"]
+INVENTORY_COLUMNS = [
+    "batch_id",
+    "product_id",
+    "farm_id",
+    "price",
+    "weight",
+    "notes",
+    "exp_date",
+    "quantity",
+]
+SUBSCRIPTION_COLUMNS = [
+    "program_id",
+    "product_id",
+    "farm_id",
+    "client_id",
+    "order_interval_days",
+    "start_date",
+    "quantity",
+    "location_id",
+    "price",
+    "status",
+]
+ORDER_COLUMNS = [
+    "order_id",
+    "client_id",
+    "batch_id",
+    "location_id",
+    "order_date",
+    "quantity",
+    "shipped_date",
+    "due_by",
+    "loyalty_points_used",
+]
+
+ORDER_INTERVAL_DAYS = 7
+
+
+def sql_value(val):
+    if val is None:
+        return "NULL"
+    if isinstance(val, str):
+        return "'" + val.replace("'", "''") + "'"
+    if isinstance(val, date):
+        return "'" + val.isoformat() + "'"
+    if isinstance(val, float):
+        return f"{val:.2f}"
+    return str(val)
+
+
+# MySQL's default LOAD DATA escaping: backslash escapes, \N for NULL.
+TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+
+
+def tsv_value(val):
+    if val is None:
+        return "\\N"
+    if isinstance(val, str):
+        return val.translate(TSV_ESCAPES)
+    if isinstance(val, date):
+        return val.isoformat()
+    if isinstance(val, float):
+        return f"{val:.2f}"
+    return str(val)
+
+
+def sql_string(val):
+    return "'" + val.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def cycled(templates, index):
+    """Template for a 1-based id, plus a suffix that keeps repeats unique."""
+    template = templates[(index - 1) % len(templates)]
+    round_no = (index - 1) // len(templates)
+    return template, "" if round_no == 0 else str(round_no + 1)
+
+
+def write_insert_rows(handle, table, columns, rows, batch_size):
+    head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES\n"
+    write = handle.write
+    count = 0
+    for row in rows:
+        if count % batch_size == 0:
+            if count:
+                write(";\n\n")
+            write(head)
+        else:
+            write(",\n")
+        write("  (" + ", ".join(map(sql_value, row)) + ")")
+        count += 1
+    if count:
+        write(";\n\n")
+    return count
+
+
+def write_tsv_rows(handle, rows):
+    write = handle.write
+    count = 0
+    for row in rows:
+        write("\t".join(map(tsv_value, row)) + "\n")
+        count += 1
+    return count
+
+
+def copy_fragments(handle, fragments):
+    for fragment in fragments:
+        with open(fragment, encoding="utf-8", newline="") as source:
+            shutil.copyfileobj(source, handle, 1 << 20)
+
+
+class InsertWriter:
+    """Writes row tuples as multi-row INSERT statements of at most batch_size rows."""
+
+    def __init__(self, handle, batch_size):
+        self.handle = handle
+        self.batch_size = batch_size
+        self.counts = {}
+
+    def comment(self, text):
+        self.handle.write(text + "\n")
+
+    def insert(self, table, columns, rows):
+        count = write_insert_rows(self.handle, table, columns, rows, self.batch_size)
+        self.counts[table] = count
+        return count
+
+    def insert_fragments(self, table, columns, fragments, count):
+        copy_fragments(self.handle, fragments)
+        self.counts[table] = count
+        return count
+
+
+class TsvWriter:
+    """Writes one <Table>.tsv per table and a load.sql that loads them in the same (FK-safe) order."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory).resolve()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.counts = {}
+        self.comments = []
+        self.loads = []
+
+    def comment(self, text):
+        self.comments.append(text)
+
+    def insert(self, table, columns, rows):
+        with self.table_file(table).open("w", encoding="utf-8", newline="\n", buffering=1 << 20) as handle:
+            count = write_tsv_rows(handle, rows)
+        return self.add_load(table, columns, count)
+
+    def insert_fragments(self, table, columns, fragments, count):
+        with self.table_file(table).open("w", encoding="utf-8", newline="\n") as handle:
+            copy_fragments(handle, fragments)
+        return self.add_load(table, columns, count)
+
+    def table_file(self, table):
+        return self.directory / f"{table}.tsv"
+
+    def add_load(self, table, columns, count):
+        path = self.table_file(table)
+        self.loads.append(
+            f"LOAD DATA LOCAL INFILE {sql_string(str(path))}\n"
+            f"INTO TABLE {table}\n"
+            "CHARACTER SET utf8mb4\n"
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'\n"
+            "LINES TERMINATED BY '\\n'\n"
+            f"({', '.join(columns)});\n"
         )
+        self.counts[table] = count
+        return count
 
-    insert_block(
-        "Location",
-        ["location_id", "continent", "country", "state", "city", "street"],
-        locations,
-    )
+    def close(self):
+        script = "\n".join(self.comments) + "\n" + "\n".join(self.loads)
+        (self.directory / "load.sql").write_text(script, encoding="utf-8")
+
+
+def open_output(path):
+    if path == "-":
+        return sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    return open(path, "w", encoding="utf-8", buffering=1 << 20)
 
-    # ---------- RawProduct ----------
-    product_names = [
-        ("Huitla", "Fungus", "crops"),
-        ("Moss", "Seaweed", "algal beds"),
-        ("F.Limes", "Fruit", "trees"),
-        ("Chapul", "Insect", "colonies"),
-        ("Doenjang", "Fermented", "vats"),
-        ("Bottarga", "Animal Product", "fish"),
-        ("Oca", "Root Vegetable", "fields"),
-        ("Onit", "Floral", "vines"),
-    ]
-    grades = ["SSR", "SR", "R", "UC", "C"]
-
-    raw_products = []
-    for pid, (name, ptype, _) in enumerate(product_names, start=1):
-        raw_products.append(
-            {
-                "product_id": pid,
-                "product_name": name,
-                "product_type": ptype,
-                "grade": grades[(pid - 1) % len(grades)],
-                "start_season": date(2025, 1, 1),
-                "end_season": date(2025, 12, 31),
-            }
+
+def generate_locations(count):
+    for loc_id in range(1, count + 1):
+        yield (loc_id, "Asia", "Philippines", "Metro Manila", f"City {loc_id}", f"{loc_id} Taft Avenue")
+
+
+def generate_raw_products(count, season_year):
+    for pid in range(1, count + 1):
+        (name, ptype, _), suffix = cycled(PRODUCT_NAMES, pid)
+        yield (
+            pid,
+            f"{name} {suffix}".strip(),
+            ptype,
+            GRADES[(pid - 1) % len(GRADES)],
+            date(season_year, 1, 1),
+            date(season_year, 12, 31),
         )
 
-    insert_block(
-        "RawProduct",
-        [
-            "product_id",
-            "product_name",
-            "product_type",
-            "grade",
-            "start_season",
-            "end_season",
-        ],
-        raw_products,
-    )
 
-    # ---------- Client ----------
-    clients = [
-        {
-            "company_name": "Foodies Inc.",
-            "first_name": "Alice",
-            "last_name": "Smith",
-            "honorific": "Ms.",
-            "email": "alice.smith@foodies.com",
-            "loyalty_points": random.randint(0, 500),
-        },
-        {
-            "company_name": "Gourmet Delights",
-            "first_name": "Bob",
-            "last_name": "Johnson",
-            "honorific": "Mr.",
-            "email": "bob.johnson@gourmet.com",
-            "loyalty_points": random.randint(0, 500),
-        },
-        {
-            "company_name": "Delicious Eats",
-            "first_name": "Charlie",
-            "last_name": "Williams",
-            "honorific": "Mrs.",
-            "email": "charlie.williams@delicious.com",
-            "loyalty_points": random.randint(0, 500),
-        },
-        {
-            "company_name": "Tasty Treats",
-            "first_name": "Diana",
-            "last_name": "Brown",
-            "honorific": "Ms.",
-            "email": "diana.brown@tasty.com",
-            "loyalty_points": random.randint(0, 500),
-        },
-        {
-            "company_name": "Yummy Bites",
-            "first_name": "Ethan",
-            "last_name": "Jones",
-            "honorific": "Mr.",
-            "email": "ethan.jones@yummy.com",
-            "loyalty_points": random.randint(0, 500),
-        },
-        {
-            "company_name": "Savory Snacks",
-            "first_name": "Fiona",
-            "last_name": "Garcia",
-            "honorific": "Mrs.",
-            "email": "fiona.garcia@savory.com",
-            "loyalty_points": random.randint(0, 500),
-        },
-        {
-            "company_name": "Culinary Creations",
-            "first_name": "George",
-            "last_name": "Miller",
-            "honorific": "Mr.",
-            "email": "george.miller@culinary.com",
-            "loyalty_points": random.randint(0, 500),
-        },
-        {
-            "company_name": "Epicurean Delights",
-            "first_name": "Hannah",
-            "last_name": "Davis",
-            "honorific": "Ms.",
-            "email": "hannah.davis@epicurean.com",
-            "loyalty_points": random.randint(0, 500),
-        },
-        {
-            "company_name": "Flavorful Foods",
-            "first_name": "Ian",
-            "last_name": "Rodriguez",
-            "honorific": "Mr.",
-            "email": "ian.rodriguez@flavorful.com",
-            "loyalty_points": random.randint(0, 500),
-        },
-        {
-            "company_name": "Delectable Dishes",
-            "first_name": "Julia",
-            "last_name": "Martinez",
-            "honorific": "Mrs.",
-            "email": "julia.martinez@delectable.com",
-            "loyalty_points": random.randint(0, 500),
-        },
-    ]
-
-    for cid in range(1, 11):
-        clients[cid - 1]["client_id"] = cid
-        clients[cid - 1]["location_id"] = cid
-
-    insert_block(
-        "Client",
-        [
-            "client_id",
-            "company_name",
-            "first_name",
-            "last_name",
-            "honorific",
-            "email",
-            "location_id",
-            "loyalty_points",
-        ],
-        clients,
-    )
+def generate_clients(count):
+    for cid in range(1, count + 1):
+        (company, first, last, honorific, domain), suffix = cycled(CLIENTS, cid)
+        yield (
+            cid,
+            f"{company} {suffix}".strip(),
+            first,
+            last,
+            honorific,
+            f"{first.lower()}.{last.lower()}{suffix}@{domain}",
+            cid,
+            random.randint(0, 500),
+        )
 
-    # ---------- Farm ----------
-    farms = [
-        {"name": "Green Valley Farms"},
-        {"name": "Sunnybrook Agriculture"},
-        {"name": "Riverbend Produce"},
-        {"name": "Golden Harvest Farms"},
-        {"name": "Meadowview Organics"},
-        {"name": "Hilltop Gardens"},
-        {"name": "Cedarwood Farms"},
-        {"name": "Willow Creek Produce"},
-        {"name": "Maple Leaf Agriculture"},
-        {"name": "Pine Hill Farms"},
-    ]
-    for fid in range(1, 11):
-        farms[fid - 1]["farm_id"] = fid
-        farms[fid - 1]["location_id"] = fid
-
-    insert_block(
-        "Farm",
-        ["farm_id", "name", "location_id"],
-        farms,
-    )
 
-    # ---------- FarmProduct ----------
-    farm_products = []
-    farm_to_products = {fid: [] for fid in range(1, 11)}
-    num_raw = len(raw_products)
+def generate_farms(count):
+    for fid in range(1, count + 1):
+        name, suffix = cycled(FARM_NAMES, fid)
+        yield (fid, f"{name} {suffix}".strip(), fid)
+
 
-    for fid in range(1, 11):
-        available_pids = list(range(1, num_raw + 1))
+def generate_farm_products(farm_count, product_count, per_farm, farm_to_products):
+    for fid in range(1, farm_count + 1):
+        available_pids = list(range(1, product_count + 1))
         random.shuffle(available_pids)
-        chosen = available_pids[:3]  # 3 products per farm
-        for pid in chosen:
-            farm_products.append(
-                {
-                    "product_id": pid,
-                    "farm_id": fid,
-                    "population": random.randint(50, 100),
-                    "population_unit": product_names[pid - 1][2],
-                }
-            )
-            farm_to_products[fid].append(pid)
+        for pid in available_pids[:per_farm]:
+            (_, _, unit), _ = cycled(PRODUCT_NAMES, pid)
+            farm_to_products.setdefault(fid, []).append(pid)
+            yield (pid, fid, random.randint(50, 100), unit)
 
-    insert_block(
-        "FarmProduct",
-        ["product_id", "farm_id", "population", "population_unit"],
-        farm_products,
-    )
 
-    # ---------- Inventory ----------
-    inventory_rows = []
-    fp_to_batches = {}  # (farm_id, product_id) -> [batch_ids]
+def generate_inventory(farm_to_products, batches_per_farm, exp_base, fp_to_batches):
     next_batch_id = 1
 
     def random_exp_date():
-        base = date(2025, 6, 1)
-        delta_days = random.randint(60, 300)  # roughly Aug 2025–Mar 2026
-        return base + timedelta(days=delta_days)
+        return exp_base + timedelta(days=random.randint(60, 300))
 
     # at least 1 batch per farm-product
-    for fp in farm_products:
-        fid = fp["farm_id"]
-        pid = fp["product_id"]
-        inv = {
-            "batch_id": next_batch_id,
-            "product_id": pid,
-            "farm_id": fid,
-            "price": round(random.uniform(50, 200), 2),
-            "weight": round(random.uniform(5, 50), 2),
-            "notes": f"Initial batch of product {pid} from farm {fid}",
-            "exp_date": random_exp_date(),
-            "quantity": random.randint(100, 500),
-        }
-        inventory_rows.append(inv)
-        fp_to_batches.setdefault((fid, pid), []).append(next_batch_id)
-        next_batch_id += 1
-
-    # pad to 25 inventory rows per farm
-    count_per_farm = Counter(inv["farm_id"] for inv in inventory_rows)
-
-    for fid in range(1, 11):
-        while count_per_farm[fid] < 25:
-            pid = random.choice(farm_to_products[fid])
-            inv = {
-                "batch_id": next_batch_id,
-                "product_id": pid,
-                "farm_id": fid,
-                "price": round(random.uniform(50, 200), 2),
-                "weight": round(random.uniform(5, 50), 2),
-                "notes": None,
-                "exp_date": random_exp_date(),
-                "quantity": random.randint(50, 300),
-            }
-            inventory_rows.append(inv)
+    for fid, pids in farm_to_products.items():
+        for pid in pids:
+            row = (
+                next_batch_id,
+                pid,
+                fid,
+                round(random.uniform(50, 200), 2),
+                round(random.uniform(5, 50), 2),
+                f"Initial batch of product {pid} from farm {fid}",
+                random_exp_date(),
+                random.randint(100, 500),
+            )
             fp_to_batches.setdefault((fid, pid), []).append(next_batch_id)
             next_batch_id += 1
-            count_per_farm[fid] += 1
+            yield row
+
+    # pad to batches_per_farm inventory rows per farm
+    for fid, pids in farm_to_products.items():
+        for _ in range(batches_per_farm - len(pids)):
+            pid = random.choice(pids)
+            row = (
+                next_batch_id,
+                pid,
+                fid,
+                round(random.uniform(50, 200), 2),
+                round(random.uniform(5, 50), 2),
+                None,
+                random_exp_date(),
+                random.randint(50, 300),
+            )
+            fp_to_batches[(fid, pid)].append(next_batch_id)
+            next_batch_id += 1
+            yield row
 
-    insert_block(
-        "Inventory",
-        [
-            "batch_id",
-            "product_id",
-            "farm_id",
-            "price",
-            "weight",
-            "notes",
-            "exp_date",
-            "quantity",
-        ],
-        inventory_rows,
-    )
 
-    # ---------- Subscription ----------
-    subscriptions = []
+def generate_subscriptions(client_count, per_client, farm_to_products, start_date, subscriptions):
     next_program_id = 1
+    farm_ids = list(farm_to_products)
 
-    for client in clients:
-        cid = client["client_id"]
-        fid = ((cid - 1) % len(farms)) + 1  # client i → farm i
-        for fid in random.choices(range(1, 11), k=10): # 10 subscriptions per client
+    for cid in range(1, client_count + 1):
+        for fid in random.choices(farm_ids, k=per_client):
             pid = random.choice(farm_to_products[fid])
-            sub = {
-                "program_id": next_program_id,
-                "product_id": pid,
-                "farm_id": fid,
-                "client_id": cid,
-                "order_interval_days": 7,
-                "start_date": start_date,
-                "quantity": random.randint(1, 5),
-                "location_id": client["location_id"],
-                "price": round(random.uniform(80, 250), 2),
-                "status": random.choice(["ACTIVE", "AWAITING_QUOTE", "CANCELLED"]),
-            }
-            subscriptions.append(sub)
+            quantity = random.randint(1, 5)
+            price = round(random.uniform(80, 250), 2)
+            status = random.choice(["ACTIVE", "AWAITING_QUOTE", "CANCELLED"])
+            # Orders only need these fields; keeping tuples keeps large scales cheap.
+            subscriptions.append((cid, fid, pid, quantity, cid))
+            yield (
+                next_program_id,
+                pid,
+                fid,
+                cid,
+                ORDER_INTERVAL_DAYS,
+                start_date,
+                quantity,
+                cid,
+                price,
+                status,
+            )
             next_program_id += 1
 
-    insert_block(
-        "Subscription",
-        [
-            "program_id",
-            "product_id",
-            "farm_id",
-            "client_id",
-            "order_interval_days",
-            "start_date",
-            "quantity",
-            "location_id",
-            "price",
-            "status",
-        ],
-        subscriptions,
-    )
 
-    # ---------- Orders ----------
-    orders = []
-    next_order_id = 1
+def generate_orders(subscriptions, fp_to_batches, start_date, end_date, rng=random, first_order_id=1):
+    next_order_id = first_order_id
+    interval = timedelta(days=ORDER_INTERVAL_DAYS)
 
-    for sub in subscriptions:
-        cid = sub["client_id"]
-        fid = sub["farm_id"]
-        pid = sub["product_id"]
-        interval = sub["order_interval_days"]
-        qty = sub["quantity"]
-        loc_id = sub["location_id"]
-
-        cur_date = sub["start_date"]
+    for cid, fid, pid, qty, loc_id in subscriptions:
+        batches = fp_to_batches[(fid, pid)]
+        cur_date = start_date
         while cur_date <= end_date:
-            batches = fp_to_batches[(fid, pid)]
-            batch_id = random.choice(batches)
+            batch_id = rng.choice(batches)
 
-            due_by = cur_date + timedelta(days=random.randint(3, 7))
+            due_by = cur_date + timedelta(days=rng.randint(3, 7))
 
-            if random.random() < 0.9:
-                ship_delay = random.randint(1, 5)
+            if rng.random() < 0.9:
+                ship_delay = rng.randint(1, 5)
                 shipped_date = cur_date + timedelta(days=ship_delay)
             else:
                 shipped_date = None
 
-            orders.append(
-                {
-                    "order_id": next_order_id,
-                    "client_id": cid,
-                    "batch_id": batch_id,
-                    "location_id": loc_id,
-                    "order_date": cur_date,
-                    "quantity": qty,
-                    "shipped_date": shipped_date,
-                    "due_by": due_by,
-                    "loyalty_points_used": random.choice([0, 0, 0, 10, 20, 30]),
-                }
+            yield (
+                next_order_id,
+                cid,
+                batch_id,
+                loc_id,
+                cur_date,
+                qty,
+                shipped_date,
+                due_by,
+                rng.choice([0, 0, 0, 10, 20, 30]),
             )
             next_order_id += 1
-            cur_date = cur_date + timedelta(days=interval)
-
-    # sanity: ≥25 orders per client
-    per_client = Counter(o["client_id"] for o in orders)
-    assert all(per_client[c["client_id"]] >= 25 for c in clients)
-
-    insert_block(
-        "Orders",
-        [
-            "order_id",
-            "client_id",
-            "batch_id",
-            "location_id",
-            "order_date",
-            "quantity",
-            "shipped_date",
-            "due_by",
-            "loyalty_points_used",
-        ],
-        orders,
+            cur_date = cur_date + interval
+
+
+def orders_per_subscription(start_date, end_date):
+    return (end_date - start_date).days // ORDER_INTERVAL_DAYS + 1
+
+
+def shard_bounds(total, shards):
+    return [(total * shard // shards, total * (shard + 1) // shards) for shard in range(shards)]
+
+
+def render_order_shard(task):
+    shard, subscriptions, fp_to_batches, args, first_order_id, path = task
+    # String seeds hash with sha512, so shard streams do not depend on PYTHONHASHSEED.
+    rng = random.Random(f"{args.seed}:orders:{shard}")
+    rows = generate_orders(subscriptions, fp_to_batches, args.start, args.end, rng, first_order_id)
+    with open(path, "w", encoding="utf-8", newline="\n", buffering=1 << 20) as handle:
+        # Only InsertWriter copies SQL text; every other writer reads TSV fragments.
+        if args.format == "sql":
+            return write_insert_rows(handle, "Orders", ORDER_COLUMNS, rows, args.batch_size)
+        return write_tsv_rows(handle, rows)
+
+
+def insert_sharded_orders(writer, args, subscriptions, fp_to_batches):
+    per_subscription = orders_per_subscription(args.start, args.end)
+    if args.format == "tsv":
+        fragment_dir = args.output
+    else:
+        fragment_dir = None if args.output == "-" else os.path.dirname(os.path.abspath(args.output))
+    with tempfile.TemporaryDirectory(prefix="kfp-dummy-", dir=fragment_dir) as temp_dir:
+        tasks = []
+        for shard, (first, last) in enumerate(shard_bounds(len(subscriptions), args.shards)):
+            # Every subscription yields the same number of orders, so id ranges are known up front.
+            first_order_id = first * per_subscription + 1
+            needed = {(fid, pid) for _, fid, pid, _, _ in subscriptions[first:last]}
+            tasks.append((
+                shard,
+                subscriptions[first:last],
+                {key: fp_to_batches[key] for key in needed},
+                args,
+                first_order_id,
+                os.path.join(temp_dir, f"orders-{shard:04d}"),
+            ))
+        with ProcessPoolExecutor(max_workers=min(args.jobs, args.shards)) as pool:
+            count = sum(pool.map(render_order_shard, tasks))
+        writer.insert_fragments("Orders", ORDER_COLUMNS, [task[-1] for task in tasks], count)
+
+
+def generate_sql(writer, args):
+    random.seed(args.seed)
+
+    farm_count = args.farms * args.scale
+    client_count = args.clients * args.scale
+    start_date = args.start
+    end_date = args.end
+    exp_base = (start_date.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+    writer.comment("-- Dummy data for kungfoodpanda_db")
+    writer.comment("USE kungfoodpanda_db;")
+    writer.comment("")
+
+    writer.insert("Location", LOCATION_COLUMNS, generate_locations(max(farm_count, client_count)))
+    writer.insert("RawProduct", RAW_PRODUCT_COLUMNS, generate_raw_products(args.products, start_date.year))
+    writer.insert("Client", CLIENT_COLUMNS, generate_clients(client_count))
+    writer.insert("Farm", FARM_COLUMNS, generate_farms(farm_count))
+
+    farm_to_products = {}
+    writer.insert(
+        "FarmProduct",
+        FARM_PRODUCT_COLUMNS,
+        generate_farm_products(
+            farm_count, args.products, min(args.products_per_farm, args.products), farm_to_products
+        ),
+    )
+
+    fp_to_batches = {}  # (farm_id, product_id) -> [batch_ids]
+    writer.insert(
+        "Inventory",
+        INVENTORY_COLUMNS,
+        generate_inventory(farm_to_products, args.batches_per_farm, exp_base, fp_to_batches),
+    )
+
+    subscriptions = []
+    writer.insert(
+        "Subscription",
+        SUBSCRIPTION_COLUMNS,
+        generate_subscriptions(
+            client_count, args.subscriptions_per_client, farm_to_products, start_date, subscriptions
+        ),
     )
 
-    return "\n".join(lines)
+    if args.shards > 1:
+        insert_sharded_orders(writer, args, subscriptions, fp_to_batches)
+    else:
+        writer.insert("Orders", ORDER_COLUMNS, generate_orders(subscriptions, fp_to_batches, start_date, end_date))
+    return writer.counts
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return number
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate dummy data for kungfoodpanda_db.")
+    parser.add_argument("-o", "--output", default="-",
+                        help="Output file, '-' for stdout. A .gz suffix writes gzip. With --format tsv, a directory.")
+    parser.add_argument("--format", choices=("sql", "tsv"), default="sql",
+                        help="sql: INSERT statements. tsv: per-table files plus a LOAD DATA script.")
+    parser.add_argument("--scale", type=positive_int, default=1, help="Multiplies --farms and --clients.")
+    parser.add_argument("--farms", type=positive_int, default=10)
+    parser.add_argument("--clients", type=positive_int, default=10)
+    parser.add_argument("--products", type=positive_int, default=len(PRODUCT_NAMES))
+    parser.add_argument("--products-per-farm", type=positive_int, default=3)
+    parser.add_argument("--batches-per-farm", type=positive_int, default=25, help="Inventory rows per farm.")
+    parser.add_argument("--subscriptions-per-client", type=positive_int, default=10)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2025, 5, 24), help="First order date (YYYY-MM-DD).")
+    parser.add_argument("--end", type=date.fromisoformat, default=date(2025, 11, 24), help="Last order date (YYYY-MM-DD).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=positive_int, default=1000, help="Rows per INSERT statement.")
+    parser.add_argument("--shards", type=positive_int, default=1,
+                        help="Split Orders into this many independently seeded shards (part of the output's identity).")
+    parser.add_argument("--jobs", type=positive_int, default=os.cpu_count() or 1,
+                        help="Worker processes for --shards (does not change the output).")
+    args = parser.parse_args(argv)
+    if args.end < args.start:
+        parser.error("--end must not be before --start")
+    if args.format == "tsv" and args.output == "-":
+        parser.error("--format tsv needs -o DIRECTORY")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.format == "tsv":
+        writer = TsvWriter(args.output)
+        counts = generate_sql(writer, args)
+        writer.close()
+        print(", ".join(f"{table}: {count}" for table, count in counts.items()), file=sys.stderr)
+        print(f"Load with: mysql --local-infile=1 -u <user> -p < {writer.directory / 'load.sql'}", file=sys.stderr)
+        return
+    handle = open_output(args.output)
+    try:
+        counts = generate_sql(InsertWriter(handle, args.batch_size), args)
+    finally:
+        if handle is not sys.stdout:
+            handle.close()
+    if args.output != "-":
+        print(", ".join(f"{table}: {count}" for table, count in counts.items()), file=sys.stderr)
 
 
 if __name__ == "__main__":
-    print(generate_sql())
+    main()
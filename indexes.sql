@@ -0,0 +1,50 @@
+USE kungfoodpanda_db;
+
+-- Composite indexes behind the report fetchers. Check their plans with
+--   python3 app/DBApp/reports/report_plans.py
+-- which fails when a fetcher falls back to a full scan or an unexpected filesort.
+-- Safe to re-run on an existing database.
+
+DROP PROCEDURE IF EXISTS add_report_indexes;
+
+DELIMITER $$
+
+CREATE PROCEDURE add_report_indexes()
+BEGIN
+    -- Live sales edges: order_date range, joined to Inventory on batch_id, summed without touching the rows.
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Orders' AND INDEX_NAME = 'idx_orders_date_batch'
+    ) THEN
+        ALTER TABLE Orders ADD INDEX idx_orders_date_batch (order_date, batch_id, quantity, loyalty_points_used);
+    END IF;
+
+    -- Farmer reports filter Inventory by farm before product.
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Inventory' AND INDEX_NAME = 'idx_inventory_farm'
+    ) THEN
+        ALTER TABLE Inventory ADD INDEX idx_inventory_farm (farm_id, product_id, exp_date);
+    END IF;
+
+    -- Productivity report: stock expiring in the window, per product and farm.
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Inventory' AND INDEX_NAME = 'idx_inventory_exp'
+    ) THEN
+        ALTER TABLE Inventory ADD INDEX idx_inventory_exp (exp_date, product_id, farm_id, quantity);
+    END IF;
+
+    -- Farmer report subscriptions: one farm's programs started in the window.
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Subscription' AND INDEX_NAME = 'idx_subscription_farm_start'
+    ) THEN
+        ALTER TABLE Subscription ADD INDEX idx_subscription_farm_start (farm_id, start_date);
+    END IF;
+END$$
+
+DELIMITER ;
+
+CALL add_report_indexes();
+DROP PROCEDURE add_report_indexes;
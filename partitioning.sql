@@ -0,0 +1,77 @@
+USE kungfoodpanda_db;
+
+-- Range-partitions Orders by month of order_date, so date-window report queries only read the
+-- months they ask for. Run it after loading data: the partitions span the first order's month to
+-- three months past today, and older rows all land in the first partition.
+-- Then keep partitions ahead of the calendar and move old months out with
+--   python3 app/DBApp/reports/orders_partitions.py extend
+--   python3 app/DBApp/reports/orders_partitions.py archive --before YYYY-MM-DD
+-- and confirm the report queries prune with `orders_partitions.py check`.
+--
+-- InnoDB partitioned tables cannot have foreign keys, so those of Orders are dropped (their
+-- indexes stay). The stock trigger still rejects orders for unknown batches; client_id and
+-- location_id are no longer checked by the database. Every unique key must contain the
+-- partitioning column, so the primary key becomes (order_id, order_date).
+-- Safe to re-run: an already partitioned Orders is left alone.
+
+DROP PROCEDURE IF EXISTS partition_orders;
+
+DELIMITER $$
+
+CREATE PROCEDURE partition_orders()
+BEGIN
+    DECLARE foreign_key VARCHAR(64);
+    DECLARE partition_month DATE;
+    DECLARE last_month DATE;
+    DECLARE partition_list TEXT DEFAULT '';
+
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Orders' AND PARTITION_NAME IS NOT NULL
+    ) THEN
+        SET foreign_key = (
+            SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+            WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'Orders' LIMIT 1
+        );
+        WHILE foreign_key IS NOT NULL DO
+            SET @ddl = CONCAT('ALTER TABLE Orders DROP FOREIGN KEY `', foreign_key, '`');
+            PREPARE statement FROM @ddl;
+            EXECUTE statement;
+            DEALLOCATE PREPARE statement;
+            SET foreign_key = (
+                SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+                WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'Orders' LIMIT 1
+            );
+        END WHILE;
+
+        ALTER TABLE Orders DROP PRIMARY KEY, ADD PRIMARY KEY (order_id, order_date);
+
+        SELECT DATE_FORMAT(IFNULL(MIN(order_date), CURDATE()), '%Y-%m-01'),
+               DATE_FORMAT(DATE_ADD(GREATEST(IFNULL(MAX(order_date), CURDATE()), CURDATE()), INTERVAL 3 MONTH), '%Y-%m-01')
+        INTO partition_month, last_month
+        FROM Orders;
+
+        -- One partition per month, named pYYYYMM, plus pmax for anything past the last one.
+        WHILE partition_month <= last_month DO
+            SET partition_list = CONCAT(
+                partition_list,
+                'PARTITION p', DATE_FORMAT(partition_month, '%Y%m'),
+                ' VALUES LESS THAN (''', DATE_ADD(partition_month, INTERVAL 1 MONTH), '''), '
+            );
+            SET partition_month = DATE_ADD(partition_month, INTERVAL 1 MONTH);
+        END WHILE;
+
+        SET @ddl = CONCAT(
+            'ALTER TABLE Orders PARTITION BY RANGE COLUMNS (order_date) (',
+            partition_list, 'PARTITION pmax VALUES LESS THAN (MAXVALUE))'
+        );
+        PREPARE statement FROM @ddl;
+        EXECUTE statement;
+        DEALLOCATE PREPARE statement;
+    END IF;
+END$$
+
+DELIMITER ;
+
+CALL partition_orders();
+DROP PROCEDURE partition_orders;
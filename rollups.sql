@@ -0,0 +1,301 @@
+USE kungfoodpanda_db;
+
+-- Month x farm x product sales totals read by the report scripts.
+-- Kept current by the triggers below; backfill or repair with
+--   python3 app/DBApp/reports/sales_rollup.py rebuild [--from YYYY-MM-DD --to YYYY-MM-DD]
+
+DROP TRIGGER IF EXISTS orders_rollup_after_insert;
+DROP TRIGGER IF EXISTS orders_rollup_after_update;
+DROP TRIGGER IF EXISTS orders_rollup_after_delete;
+DROP TRIGGER IF EXISTS inventory_rollup_after_update;
+DROP TRIGGER IF EXISTS orders_version_after_update;
+DROP TRIGGER IF EXISTS orders_version_after_delete;
+DROP TRIGGER IF EXISTS inventory_version_after_update;
+DROP TRIGGER IF EXISTS inventory_version_after_delete;
+DROP TRIGGER IF EXISTS subscription_version_after_update;
+DROP TRIGGER IF EXISTS subscription_version_after_delete;
+DROP TRIGGER IF EXISTS farmproduct_version_after_update;
+DROP TRIGGER IF EXISTS farmproduct_version_after_delete;
+DROP PROCEDURE IF EXISTS bump_report_version;
+DROP TABLE IF EXISTS MonthlySalesRollup;
+
+CREATE TABLE MonthlySalesRollup (
+    month_start DATE NOT NULL,
+    farm_id INT UNSIGNED NOT NULL,
+    product_id INT UNSIGNED NOT NULL,
+    total_quantity BIGINT NOT NULL DEFAULT 0,
+    total_revenue DECIMAL(16,2) NOT NULL DEFAULT 0,
+    orders_count BIGINT NOT NULL DEFAULT 0,
+    points_earned BIGINT NOT NULL DEFAULT 0,
+    points_redeemed BIGINT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (month_start, farm_id, product_id),
+    INDEX idx_rollup_farm_month (farm_id, month_start)
+) ENGINE=InnoDB;
+
+-- Counts in-place changes to the tables the reports read, for the report cache watermark
+-- (app/DBApp/reports/report_cache.py): inserts already move COUNT(*) and MAX(pk), but updates
+-- and deletes would otherwise need a full-table scan to notice. A table's version is the SUM
+-- over its slots. Orders slots are months (YYYYMM), which the order snapshot reads per month;
+-- the other tables spread their key over 16 slots so concurrent writers rarely share a row.
+-- Never dropped: a version that went back to zero could make a stale cache entry look current.
+CREATE TABLE IF NOT EXISTS ReportDataVersion (
+    table_name VARCHAR(64) NOT NULL,
+    slot INT UNSIGNED NOT NULL,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (table_name, slot)
+) ENGINE=InnoDB;
+
+DELIMITER $$
+
+CREATE TRIGGER orders_rollup_after_insert
+AFTER INSERT ON Orders
+FOR EACH ROW
+BEGIN
+    INSERT INTO MonthlySalesRollup (
+        month_start, farm_id, product_id,
+        total_quantity, total_revenue, orders_count, points_earned, points_redeemed
+    )
+    SELECT DATE_FORMAT(NEW.order_date, '%Y-%m-01'),
+           inv.farm_id,
+           inv.product_id,
+           NEW.quantity,
+           NEW.quantity * inv.price,
+           1,
+           GREATEST(FLOOR((inv.price * NEW.quantity - IFNULL(NEW.loyalty_points_used, 0)) / 100), 0),
+           IFNULL(NEW.loyalty_points_used, 0)
+    FROM Inventory AS inv
+    WHERE inv.batch_id = NEW.batch_id
+    ON DUPLICATE KEY UPDATE
+        total_quantity = total_quantity + VALUES(total_quantity),
+        total_revenue = total_revenue + VALUES(total_revenue),
+        orders_count = orders_count + VALUES(orders_count),
+        points_earned = points_earned + VALUES(points_earned),
+        points_redeemed = points_redeemed + VALUES(points_redeemed);
+END$$
+
+CREATE TRIGGER orders_rollup_after_update
+AFTER UPDATE ON Orders
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.order_date <=> OLD.order_date
+        AND NEW.batch_id <=> OLD.batch_id
+        AND NEW.quantity <=> OLD.quantity
+        AND NEW.loyalty_points_used <=> OLD.loyalty_points_used) THEN
+        INSERT INTO MonthlySalesRollup (
+            month_start, farm_id, product_id,
+            total_quantity, total_revenue, orders_count, points_earned, points_redeemed
+        )
+        SELECT DATE_FORMAT(OLD.order_date, '%Y-%m-01'),
+               inv.farm_id,
+               inv.product_id,
+               -CAST(OLD.quantity AS SIGNED),
+               -(OLD.quantity * inv.price),
+               -1,
+               -GREATEST(FLOOR((inv.price * OLD.quantity - IFNULL(OLD.loyalty_points_used, 0)) / 100), 0),
+               -CAST(IFNULL(OLD.loyalty_points_used, 0) AS SIGNED)
+        FROM Inventory AS inv
+        WHERE inv.batch_id = OLD.batch_id
+        ON DUPLICATE KEY UPDATE
+            total_quantity = total_quantity + VALUES(total_quantity),
+            total_revenue = total_revenue + VALUES(total_revenue),
+            orders_count = orders_count + VALUES(orders_count),
+            points_earned = points_earned + VALUES(points_earned),
+            points_redeemed = points_redeemed + VALUES(points_redeemed);
+
+        INSERT INTO MonthlySalesRollup (
+            month_start, farm_id, product_id,
+            total_quantity, total_revenue, orders_count, points_earned, points_redeemed
+        )
+        SELECT DATE_FORMAT(NEW.order_date, '%Y-%m-01'),
+               inv.farm_id,
+               inv.product_id,
+               NEW.quantity,
+               NEW.quantity * inv.price,
+               1,
+               GREATEST(FLOOR((inv.price * NEW.quantity - IFNULL(NEW.loyalty_points_used, 0)) / 100), 0),
+               IFNULL(NEW.loyalty_points_used, 0)
+        FROM Inventory AS inv
+        WHERE inv.batch_id = NEW.batch_id
+        ON DUPLICATE KEY UPDATE
+            total_quantity = total_quantity + VALUES(total_quantity),
+            total_revenue = total_revenue + VALUES(total_revenue),
+            orders_count = orders_count + VALUES(orders_count),
+            points_earned = points_earned + VALUES(points_earned),
+            points_redeemed = points_redeemed + VALUES(points_redeemed);
+    END IF;
+END$$
+
+CREATE TRIGGER orders_rollup_after_delete
+AFTER DELETE ON Orders
+FOR EACH ROW
+BEGIN
+    INSERT INTO MonthlySalesRollup (
+        month_start, farm_id, product_id,
+        total_quantity, total_revenue, orders_count, points_earned, points_redeemed
+    )
+    SELECT DATE_FORMAT(OLD.order_date, '%Y-%m-01'),
+           inv.farm_id,
+           inv.product_id,
+           -CAST(OLD.quantity AS SIGNED),
+           -(OLD.quantity * inv.price),
+           -1,
+           -GREATEST(FLOOR((inv.price * OLD.quantity - IFNULL(OLD.loyalty_points_used, 0)) / 100), 0),
+           -CAST(IFNULL(OLD.loyalty_points_used, 0) AS SIGNED)
+    FROM Inventory AS inv
+    WHERE inv.batch_id = OLD.batch_id
+    ON DUPLICATE KEY UPDATE
+        total_quantity = total_quantity + VALUES(total_quantity),
+        total_revenue = total_revenue + VALUES(total_revenue),
+        orders_count = orders_count + VALUES(orders_count),
+        points_earned = points_earned + VALUES(points_earned),
+        points_redeemed = points_redeemed + VALUES(points_redeemed);
+END$$
+
+-- Revenue and points are priced from the batch, so re-price its orders when the batch changes.
+-- Quantity-only updates (stock decrements from triggers.sql) skip this entirely.
+CREATE TRIGGER inventory_rollup_after_update
+AFTER UPDATE ON Inventory
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.price <=> OLD.price
+        AND NEW.farm_id <=> OLD.farm_id
+        AND NEW.product_id <=> OLD.product_id) THEN
+        INSERT INTO MonthlySalesRollup (
+            month_start, farm_id, product_id,
+            total_quantity, total_revenue, orders_count, points_earned, points_redeemed
+        )
+        SELECT DATE_FORMAT(o.order_date, '%Y-%m-01') AS order_month,
+               OLD.farm_id,
+               OLD.product_id,
+               -SUM(o.quantity),
+               -SUM(o.quantity * OLD.price),
+               -COUNT(*),
+               -SUM(GREATEST(FLOOR((OLD.price * o.quantity - IFNULL(o.loyalty_points_used, 0)) / 100), 0)),
+               -SUM(IFNULL(o.loyalty_points_used, 0))
+        FROM Orders AS o
+        WHERE o.batch_id = OLD.batch_id
+        GROUP BY order_month
+        ON DUPLICATE KEY UPDATE
+            total_quantity = total_quantity + VALUES(total_quantity),
+            total_revenue = total_revenue + VALUES(total_revenue),
+            orders_count = orders_count + VALUES(orders_count),
+            points_earned = points_earned + VALUES(points_earned),
+            points_redeemed = points_redeemed + VALUES(points_redeemed);
+
+        INSERT INTO MonthlySalesRollup (
+            month_start, farm_id, product_id,
+            total_quantity, total_revenue, orders_count, points_earned, points_redeemed
+        )
+        SELECT DATE_FORMAT(o.order_date, '%Y-%m-01') AS order_month,
+               NEW.farm_id,
+               NEW.product_id,
+               SUM(o.quantity),
+               SUM(o.quantity * NEW.price),
+               COUNT(*),
+               SUM(GREATEST(FLOOR((NEW.price * o.quantity - IFNULL(o.loyalty_points_used, 0)) / 100), 0)),
+               SUM(IFNULL(o.loyalty_points_used, 0))
+        FROM Orders AS o
+        WHERE o.batch_id = NEW.batch_id
+        GROUP BY order_month
+        ON DUPLICATE KEY UPDATE
+            total_quantity = total_quantity + VALUES(total_quantity),
+            total_revenue = total_revenue + VALUES(total_revenue),
+            orders_count = orders_count + VALUES(orders_count),
+            points_earned = points_earned + VALUES(points_earned),
+            points_redeemed = points_redeemed + VALUES(points_redeemed);
+    END IF;
+END$$
+
+CREATE PROCEDURE bump_report_version(IN changed_table VARCHAR(64), IN changed_slot INT UNSIGNED)
+BEGIN
+    INSERT INTO ReportDataVersion (table_name, slot, version)
+    VALUES (changed_table, changed_slot, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+END$$
+
+-- Only columns the reports read; shipping updates leave cached reports valid.
+CREATE TRIGGER orders_version_after_update
+AFTER UPDATE ON Orders
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.order_date <=> OLD.order_date
+        AND NEW.batch_id <=> OLD.batch_id
+        AND NEW.client_id <=> OLD.client_id
+        AND NEW.quantity <=> OLD.quantity
+        AND NEW.loyalty_points_used <=> OLD.loyalty_points_used) THEN
+        CALL bump_report_version('Orders', EXTRACT(YEAR_MONTH FROM OLD.order_date));
+        IF EXTRACT(YEAR_MONTH FROM NEW.order_date) <> EXTRACT(YEAR_MONTH FROM OLD.order_date) THEN
+            CALL bump_report_version('Orders', EXTRACT(YEAR_MONTH FROM NEW.order_date));
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER orders_version_after_delete
+AFTER DELETE ON Orders
+FOR EACH ROW
+BEGIN
+    CALL bump_report_version('Orders', EXTRACT(YEAR_MONTH FROM OLD.order_date));
+END$$
+
+CREATE TRIGGER inventory_version_after_update
+AFTER UPDATE ON Inventory
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.product_id <=> OLD.product_id
+        AND NEW.farm_id <=> OLD.farm_id
+        AND NEW.price <=> OLD.price
+        AND NEW.weight <=> OLD.weight
+        AND NEW.exp_date <=> OLD.exp_date
+        AND NEW.quantity <=> OLD.quantity) THEN
+        CALL bump_report_version('Inventory', OLD.batch_id % 16);
+    END IF;
+END$$
+
+CREATE TRIGGER inventory_version_after_delete
+AFTER DELETE ON Inventory
+FOR EACH ROW
+BEGIN
+    CALL bump_report_version('Inventory', OLD.batch_id % 16);
+END$$
+
+-- next_due_date is left out: the scheduler advances it on every run.
+CREATE TRIGGER subscription_version_after_update
+AFTER UPDATE ON Subscription
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.product_id <=> OLD.product_id
+        AND NEW.farm_id <=> OLD.farm_id
+        AND NEW.client_id <=> OLD.client_id
+        AND NEW.order_interval_days <=> OLD.order_interval_days
+        AND NEW.start_date <=> OLD.start_date
+        AND NEW.quantity <=> OLD.quantity
+        AND NEW.price <=> OLD.price
+        AND NEW.status <=> OLD.status) THEN
+        CALL bump_report_version('Subscription', OLD.program_id % 16);
+    END IF;
+END$$
+
+CREATE TRIGGER subscription_version_after_delete
+AFTER DELETE ON Subscription
+FOR EACH ROW
+BEGIN
+    CALL bump_report_version('Subscription', OLD.program_id % 16);
+END$$
+
+CREATE TRIGGER farmproduct_version_after_update
+AFTER UPDATE ON FarmProduct
+FOR EACH ROW
+BEGIN
+    CALL bump_report_version('FarmProduct', OLD.farm_id % 16);
+END$$
+
+CREATE TRIGGER farmproduct_version_after_delete
+AFTER DELETE ON FarmProduct
+FOR EACH ROW
+BEGIN
+    CALL bump_report_version('FarmProduct', OLD.farm_id % 16);
+END$$
+
+DELIMITER ;
@@ -0,0 +1,80 @@
+USE kungfoodpanda_db;
+
+-- Subscription orders are created by
+--   python3 app/DBApp/reports/subscription_scheduler.py run
+-- which reads only the subscriptions whose next_due_date has arrived and advances them.
+-- This replaces the create_subscription_orders event that used to scan every subscription daily.
+-- Safe to re-run on an existing database.
+
+DROP EVENT IF EXISTS create_subscription_orders;
+DROP TRIGGER IF EXISTS subscription_schedule_before_insert;
+DROP TRIGGER IF EXISTS subscription_schedule_before_update;
+DROP FUNCTION IF EXISTS subscription_next_due;
+DROP PROCEDURE IF EXISTS add_subscription_schedule;
+
+DELIMITER $$
+
+CREATE PROCEDURE add_subscription_schedule()
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Subscription' AND COLUMN_NAME = 'next_due_date'
+    ) THEN
+        ALTER TABLE Subscription
+            ADD COLUMN next_due_date DATE DEFAULT NULL,
+            ADD INDEX idx_subscription_due (status, next_due_date);
+    END IF;
+
+    -- Earliest-expiring batch of a farm's product with stock left.
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Inventory' AND INDEX_NAME = 'idx_inventory_fefo'
+    ) THEN
+        ALTER TABLE Inventory ADD INDEX idx_inventory_fefo (product_id, farm_id, exp_date, batch_id);
+    END IF;
+END$$
+
+DELIMITER ;
+
+CALL add_subscription_schedule();
+DROP PROCEDURE add_subscription_schedule;
+
+DELIMITER $$
+
+-- First delivery on or after from_date: start_date itself, or the next start_date + k * interval.
+CREATE FUNCTION subscription_next_due(start_date DATE, interval_days INT UNSIGNED, from_date DATE)
+RETURNS DATE
+DETERMINISTIC
+BEGIN
+    IF start_date >= from_date THEN
+        RETURN start_date;
+    END IF;
+    RETURN DATE_ADD(start_date, INTERVAL CEIL(DATEDIFF(from_date, start_date) / interval_days) * interval_days DAY);
+END$$
+
+CREATE TRIGGER subscription_schedule_before_insert
+BEFORE INSERT ON Subscription
+FOR EACH ROW
+BEGIN
+    IF NEW.next_due_date IS NULL THEN
+        SET NEW.next_due_date = subscription_next_due(NEW.start_date, NEW.order_interval_days, CURDATE());
+    END IF;
+END$$
+
+-- Re-anchor when the schedule changes, or when a subscription (re)activates so it does not
+-- catch up on deliveries from while it was inactive. The scheduler's own advances change neither.
+CREATE TRIGGER subscription_schedule_before_update
+BEFORE UPDATE ON Subscription
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.start_date <=> OLD.start_date AND NEW.order_interval_days <=> OLD.order_interval_days)
+        OR (NEW.status = 'ACTIVE' AND OLD.status <> 'ACTIVE') THEN
+        SET NEW.next_due_date = subscription_next_due(NEW.start_date, NEW.order_interval_days, CURDATE());
+    END IF;
+END$$
+
+DELIMITER ;
+
+UPDATE Subscription
+SET next_due_date = subscription_next_due(start_date, order_interval_days, CURDATE())
+WHERE next_due_date IS NULL;